@@ -1,23 +1,38 @@
 import gradio as gr
 from dotenv import load_dotenv
-from research_manager import ResearchManager
+from research_jobs import research_jobs
 
 load_dotenv(override=True)
 
 
 async def run(query: str):
-    async for chunk in ResearchManager().run(query):
+    job_id = research_jobs.submit(query)
+    async for chunk in research_jobs.stream(job_id):
+        yield job_id, chunk
+
+
+async def reattach(job_id: str):
+    async for chunk in research_jobs.stream(job_id.strip()):
         yield chunk
 
 
+async def cancel(job_id: str):
+    await research_jobs.cancel(job_id.strip())
+
+
 with gr.Blocks(theme=gr.themes.Default(primary_hue="sky")) as ui:
     gr.Markdown("# Deep Research")
     query_textbox = gr.Textbox(label="What topic would you like to research?")
     run_button = gr.Button("Run", variant="primary")
+    with gr.Row():
+        job_textbox = gr.Textbox(label="Research job id", scale=3)
+        reattach_button = gr.Button("Reattach")
+        cancel_button = gr.Button("Cancel")
     report = gr.Markdown(label="Report")
-    
-    run_button.click(fn=run, inputs=query_textbox, outputs=report)
-    query_textbox.submit(fn=run, inputs=query_textbox, outputs=report)
 
-ui.launch(inbrowser=True)
+    run_button.click(fn=run, inputs=query_textbox, outputs=[job_textbox, report])
+    query_textbox.submit(fn=run, inputs=query_textbox, outputs=[job_textbox, report])
+    reattach_button.click(fn=reattach, inputs=job_textbox, outputs=report)
+    cancel_button.click(fn=cancel, inputs=job_textbox, outputs=None)
 
+ui.launch(inbrowser=True)
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+from typing import AsyncIterator
+from planner_agent import WebSearchPlan
+from research_manager import ResearchManager
+
+JOBS_DB = os.getenv("RESEARCH_JOBS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "research_jobs.db"))
+RESEARCH_WORKERS = int(os.getenv("RESEARCH_WORKERS", "2"))
+
+
+class ResearchJob:
+    """The live state of a job in this process: its latest update, and a condition to wait for the next"""
+
+    def __init__(self, job_id: str, query: str):
+        self.id = job_id
+        self.query = query
+        self.latest = "Queued, waiting for a research worker..."
+        self.version = 0
+        self.finished = False
+        self.task: asyncio.Task | None = None
+        self.changed = asyncio.Condition()
+
+
+class ResearchJobService:
+    """
+    Queues research jobs and runs them on a bounded pool of workers. Each job's status, search plan,
+    completed search summaries and final report are stored as they are produced, so any client can
+    reattach to a job's progress, and jobs interrupted by a restart resume without redoing finished searches.
+    The database is opened on first use.
+    """
+
+    def __init__(self, path: str = JOBS_DB, workers: int = RESEARCH_WORKERS):
+        self.num_workers = workers
+        self.jobs: dict[str, ResearchJob] = {}
+        self.queue: asyncio.Queue | None = None
+        self.workers: list[asyncio.Task] = []
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self.connect()
+        return self._conn
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    query TEXT,
+                    status TEXT,
+                    created REAL,
+                    updated REAL,
+                    plan TEXT,
+                    report TEXT,
+                    error TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_searches (
+                    job_id TEXT,
+                    query TEXT,
+                    summary TEXT,
+                    PRIMARY KEY (job_id, query)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created)')
+        return conn
+
+    def ensure_started(self) -> None:
+        """Start the workers on the running event loop, requeueing any jobs left unfinished by a previous process"""
+        if self.workers:
+            return
+        self.queue = asyncio.Queue()
+        rows = self.conn.execute(
+            "SELECT id, query FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+        ).fetchall()
+        for job_id, query in rows:
+            self.jobs[job_id] = ResearchJob(job_id, query)
+            self.queue.put_nowait(job_id)
+        if rows:
+            print(f"Resuming {len(rows)} unfinished research jobs")
+        self.workers = [asyncio.create_task(self.work()) for _ in range(self.num_workers)]
+
+    def submit(self, query: str) -> str:
+        self.ensure_started()
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (id, query, status, created, updated) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, query, now, now),
+            )
+        self.jobs[job_id] = ResearchJob(job_id, query)
+        self.queue.put_nowait(job_id)
+        return job_id
+
+    async def cancel(self, job_id: str) -> None:
+        job = self.jobs.get(job_id)
+        if not job or job.finished:
+            return
+        if job.task:
+            job.task.cancel()
+        else:
+            await self.finish(job, "cancelled", "Cancelled before it started")
+
+    async def work(self) -> None:
+        while True:
+            job = self.jobs[await self.queue.get()]
+            if job.finished:
+                continue
+            job.task = asyncio.create_task(self.run_job(job))
+            await asyncio.wait([job.task])
+
+    async def run_job(self, job: ResearchJob) -> None:
+        # Everything, including the setup, runs inside the try, so the job always finishes and its streams end
+        try:
+            self.set_status(job.id, "running")
+            row = self.conn.execute("SELECT plan FROM jobs WHERE id = ?", (job.id,)).fetchone()
+            saved_plan = WebSearchPlan.model_validate_json(row[0]) if row and row[0] else None
+            saved_searches = dict(
+                self.conn.execute("SELECT query, summary FROM job_searches WHERE job_id = ?", (job.id,)).fetchall()
+            )
+            manager = ResearchManager(
+                saved_plan=saved_plan,
+                saved_searches=saved_searches,
+                on_plan=lambda plan: self.save_plan(job.id, plan),
+                on_search_result=lambda query, summary: self.save_search(job.id, query, summary),
+            )
+            async for update in manager.run(job.query):
+                await self.publish(job, update)
+            await self.finish(job, "done", job.latest)
+        except asyncio.CancelledError:
+            await self.finish(job, "cancelled", job.latest + "\n\n*Research cancelled.*")
+        except Exception as e:
+            await self.finish(job, "failed", f"Research failed: {e!r}", error=repr(e))
+
+    async def publish(self, job: ResearchJob, update: str) -> None:
+        async with job.changed:
+            job.latest = update
+            job.version += 1
+            job.changed.notify_all()
+
+    async def finish(self, job: ResearchJob, status: str, final: str, error: str | None = None) -> None:
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE jobs SET status = ?, report = ?, error = ?, updated = ? WHERE id = ?",
+                    (status, final, error, time.time(), job.id),
+                )
+        finally:
+            # Release the job's streams even if its outcome could not be stored
+            async with job.changed:
+                job.latest = final
+                job.version += 1
+                job.finished = True
+                job.changed.notify_all()
+
+    def set_status(self, job_id: str, status: str) -> None:
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (status, time.time(), job_id))
+
+    def save_plan(self, job_id: str, plan: WebSearchPlan) -> None:
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET plan = ?, updated = ? WHERE id = ?", (plan.model_dump_json(), time.time(), job_id))
+
+    def save_search(self, job_id: str, query: str, summary: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO job_searches (job_id, query, summary) VALUES (?, ?, ?)",
+                (job_id, query, summary),
+            )
+
+    async def stream(self, job_id: str) -> AsyncIterator[str]:
+        """Yield the job's latest progress now and on every change until it finishes; safe to call any number of times"""
+        self.ensure_started()
+        job = self.jobs.get(job_id)
+        if job is None:
+            row = self.conn.execute("SELECT status, report FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            yield (row[1] or f"Job {job_id} is {row[0]}") if row else f"No research job with id {job_id}"
+            return
+        seen = -1
+        while True:
+            async with job.changed:
+                await job.changed.wait_for(lambda: job.version != seen)
+                seen, latest, finished = job.version, job.latest, job.finished
+            yield latest
+            if finished:
+                return
+
+    def list_jobs(self, limit: int = 20) -> list[tuple[str, str, str]]:
+        return self.conn.execute(
+            "SELECT id, status, query FROM jobs ORDER BY created DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+
+research_jobs = ResearchJobService()
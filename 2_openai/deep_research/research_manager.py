@@ -1,29 +1,66 @@
 from agents import Runner, trace, gen_trace_id
-from search_agent import search_agent
+from openai.types.responses import ResponseTextDeltaEvent
+from search_agent import search_agent, stub_search, SEARCH_BACKEND
+from search_cache import search_cache
+from search_limiter import search_limiter
 from planner_agent import planner_agent, WebSearchItem, WebSearchPlan
-from writer_agent import writer_agent, ReportData
+from writer_agent import writer_agent, section_writer_agent
 from email_agent import email_agent
+from typing import AsyncIterator, Callable
 import asyncio
+import time
+
+# Searches still running this long after the plan is made are dropped, so one slow search can't hold up the report
+SEARCH_DEADLINE_SECONDS = 90
 
 class ResearchManager:
 
+    def __init__(
+        self,
+        saved_plan: WebSearchPlan | None = None,
+        saved_searches: dict[str, str] | None = None,
+        on_plan: Callable[[WebSearchPlan], None] | None = None,
+        on_search_result: Callable[[str, str], None] | None = None,
+    ):
+        """ Optionally resume from a saved plan and completed searches, and be told of new ones as they happen """
+        self.saved_plan = saved_plan
+        self.saved_searches = saved_searches or {}
+        self.on_plan = on_plan
+        self.on_search_result = on_search_result
+        self.started = None
+        self.time_to_first_report_token = None
+
     async def run(self, query: str):
-        """ Run the deep research process, yielding the status updates and the final report"""
+        """ Run the deep research process, yielding the status updates, then the report as it is written"""
         trace_id = gen_trace_id()
+        self.started = time.monotonic()
         with trace("Research trace", trace_id=trace_id):
             print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
             yield f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}"
             print("Starting research...")
-            search_plan = await self.plan_searches(query)
-            yield "Searches planned, starting to search..."     
-            search_results = await self.perform_searches(search_plan)
+            search_plan = self.saved_plan or await self.plan_searches(query)
+            if self.on_plan and not self.saved_plan:
+                self.on_plan(search_plan)
+            yield "Searches planned, starting to search..."
+            drafts = []
+            async for search_result in self.perform_searches(search_plan):
+                drafts.append(asyncio.create_task(self.draft_section(query, search_result)))
+                yield f"Searching... {len(drafts)}/{len(search_plan.searches)} completed, drafting sections as results arrive..."
+            sections = await asyncio.gather(*drafts)
             yield "Searches complete, writing report..."
-            report = await self.write_report(query, search_results)
-            yield "Report written, sending email..."
+            report = ""
+            async for report in self.write_report(query, sections):
+                yield report
+            yield report + "\n\n*Report written, sending email...*"
             await self.send_email(report)
-            yield "Email sent, research complete"
-            yield report.markdown_report
-        
+            stats = (
+                f"First report token after {self.time_to_first_report_token or 0:.1f}s, "
+                f"using {len(sections)}/{len(search_plan.searches)} searches; "
+                f"search cache hit rate {search_cache.metrics()['hit_rate']:.0%}"
+            )
+            print(stats)
+            yield report + f"\n\n*Email sent, research complete. {stats}.*"
+
 
     async def plan_searches(self, query: str) -> WebSearchPlan:
         """ Plan the searches to perform for the query """
@@ -35,50 +72,87 @@ class ResearchManager:
         print(f"Will perform {len(result.final_output.searches)} searches")
         return result.final_output_as(WebSearchPlan)
 
-    async def perform_searches(self, search_plan: WebSearchPlan) -> list[str]:
-        """ Perform the searches to perform for the query """
+    async def perform_searches(self, search_plan: WebSearchPlan) -> AsyncIterator[str]:
+        """ Perform the searches, yielding each summary as soon as it completes and dropping any past the deadline """
         print("Searching...")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SEARCH_DEADLINE_SECONDS
         num_completed = 0
-        tasks = [asyncio.create_task(self.search(item)) for item in search_plan.searches]
-        results = []
-        for task in asyncio.as_completed(tasks):
-            result = await task
-            if result is not None:
-                results.append(result)
-            num_completed += 1
-            print(f"Searching... {num_completed}/{len(tasks)} completed")
+        for item in search_plan.searches:
+            if item.query in self.saved_searches:
+                num_completed += 1
+                yield self.saved_searches[item.query]
+        items = {
+            asyncio.create_task(self.search(item)): item
+            for item in search_plan.searches
+            if item.query not in self.saved_searches
+        }
+        pending = set(items)
+        try:
+            while pending and loop.time() < deadline:
+                done, pending = await asyncio.wait(
+                    pending, timeout=deadline - loop.time(), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    num_completed += 1
+                    print(f"Searching... {num_completed}/{len(search_plan.searches)} completed")
+                    if task.result() is not None:
+                        if self.on_search_result:
+                            self.on_search_result(items[task].query, task.result())
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                print(f"Dropped {len(pending)} searches still running after {SEARCH_DEADLINE_SECONDS}s")
         print("Finished searching")
-        return results
 
     async def search(self, item: WebSearchItem) -> str | None:
-        """ Perform a search for the query """
+        """ Perform a search for the query, reusing a cached summary of the same query if there is one """
+        return await search_cache.get_or_search(item.query, lambda: self.run_search(item))
+
+    async def run_search(self, item: WebSearchItem) -> str | None:
+        """ Run the search within the process-wide rate limits, retrying rate limits and transient errors """
+        if SEARCH_BACKEND == "stub":
+            return await search_limiter.run(item.query, lambda: stub_search(item.query))
         input = f"Search term: {item.query}\nReason for searching: {item.reason}"
+        result = await search_limiter.run(item.query, lambda: Runner.run(search_agent, input))
+        return str(result.final_output) if result else None
+
+    async def draft_section(self, query: str, search_result: str) -> str:
+        """ Draft a report section from one search summary, falling back to the summary itself """
+        input = f"Original query: {query}\nSearch summary: {search_result}"
         try:
             result = await Runner.run(
-                search_agent,
+                section_writer_agent,
                 input,
             )
             return str(result.final_output)
         except Exception:
-            return None
+            return search_result
 
-    async def write_report(self, query: str, search_results: list[str]) -> ReportData:
-        """ Write the report for the query """
+    async def write_report(self, query: str, sections: list[str]) -> AsyncIterator[str]:
+        """ Write the report for the query, yielding the report so far as each token arrives """
         print("Thinking about report...")
-        input = f"Original query: {query}\nSummarized search results: {search_results}"
-        result = await Runner.run(
+        input = f"Original query: {query}\nDraft sections:\n\n" + "\n\n".join(sections)
+        result = Runner.run_streamed(
             writer_agent,
             input,
         )
-
+        report = ""
+        async for event in result.stream_events():
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                if self.time_to_first_report_token is None:
+                    self.time_to_first_report_token = time.monotonic() - self.started
+                report += event.data.delta
+                yield report
         print("Finished writing report")
-        return result.final_output_as(ReportData)
-    
-    async def send_email(self, report: ReportData) -> None:
+
+    async def send_email(self, report: str) -> None:
         print("Writing email...")
         result = await Runner.run(
             email_agent,
-            report.markdown_report,
+            report,
         )
         print("Email sent")
-        return report
\ No newline at end of file
+        return report
@@ -1,4 +1,8 @@
 from agents import Agent, WebSearchTool, ModelSettings
+import os
+
+# Set SEARCH_BACKEND=stub to answer searches with stub_search instead of the web search agent
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "web")
 
 INSTRUCTIONS = (
     "You are a research assistant. Given a search term, you search the web for that term and "
@@ -14,4 +18,9 @@ search_agent = Agent(
     tools=[WebSearchTool(search_context_size="low")],
     model="gpt-4o-mini",
     model_settings=ModelSettings(tool_choice="required"),
-)
\ No newline at end of file
+)
+
+
+async def stub_search(query: str) -> str:
+    """A canned stand-in for search_agent, for working without network access or API spend"""
+    return f"Stub search summary for '{query}'. No web search was performed."
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Awaitable, Callable
+import numpy as np
+from openai import AsyncOpenAI
+
+CACHE_DB = os.getenv("SEARCH_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.db"))
+CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+USE_EMBEDDINGS = os.getenv("SEARCH_CACHE_EMBEDDINGS", "false").strip().lower() == "true"
+EMBEDDING_MODEL = "text-embedding-3-small"
+SIMILARITY_THRESHOLD = 0.92
+# Only the most recently used embeddings are compared with a new query's
+SIMILARITY_SCAN_LIMIT = 2000
+
+
+def normalize(query: str) -> str:
+    """Lowercase and collapse whitespace, keeping word order, as 'python vs rust' is not 'rust vs python'"""
+    return " ".join(query.lower().split())
+
+
+def cache_key(query: str) -> str:
+    return hashlib.sha256(normalize(query).encode()).hexdigest()
+
+
+def most_similar(embedding: list[float], candidates: list[bytes]) -> tuple[int, float]:
+    """The index of the float32 candidate embedding most cosine-similar to embedding, and its similarity"""
+    matrix = np.frombuffer(b"".join(candidates), dtype=np.float32).reshape(len(candidates), -1)
+    vector = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+    scores = np.divide(matrix @ vector, norms, out=np.zeros(len(candidates), dtype=np.float32), where=norms > 0)
+    best = int(np.argmax(scores))
+    return best, float(scores[best])
+
+
+async def openai_embedding(text: str) -> list[float]:
+    response = await AsyncOpenAI().embeddings.create(model=EMBEDDING_MODEL, input=text)
+    return response.data[0].embedding
+
+
+class SearchCache:
+    """
+    A persistent cache of search summaries keyed by a hash of the normalized query, shared by every
+    ResearchManager in the process. Entries expire after ttl seconds and the least recently used are
+    evicted beyond max_entries. If embed is given, a query that misses on its key can still be served
+    by a fresh entry whose query embedding is at least SIMILARITY_THRESHOLD similar.
+    Concurrent requests for the same key share a single search. The database is opened on first use.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_DB,
+        ttl: int = CACHE_TTL_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        embed: Callable[[str], Awaitable[list[float]]] | None = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embed = embed
+        self.in_flight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.near_hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self.connect()
+        return self._conn
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS searches (
+                    key TEXT PRIMARY KEY,
+                    query TEXT,
+                    summary TEXT,
+                    embedding BLOB,
+                    created REAL,
+                    last_used REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_searches_last_used ON searches (last_used)')
+        return conn
+
+    def lookup(self, key: str) -> str | None:
+        now = time.time()
+        row = self.conn.execute(
+            'SELECT summary FROM searches WHERE key = ? AND created > ?', (key, now - self.ttl)
+        ).fetchone()
+        if row:
+            with self.conn:
+                self.conn.execute('UPDATE searches SET last_used = ? WHERE key = ?', (now, key))
+        return row[0] if row else None
+
+    async def lookup_similar(self, embedding: list[float]) -> str | None:
+        now = time.time()
+        rows = self.conn.execute('''
+            SELECT key, summary, embedding FROM searches
+            WHERE embedding IS NOT NULL AND created > ?
+            ORDER BY last_used DESC LIMIT ?
+        ''', (now - self.ttl, SIMILARITY_SCAN_LIMIT)).fetchall()
+        # Skip embeddings from another model, or stored as JSON by earlier versions
+        rows = [row for row in rows if isinstance(row[2], bytes) and len(row[2]) == 4 * len(embedding)]
+        if not rows:
+            return None
+        # Scoring is CPU bound, so it runs in a thread rather than holding up the event loop
+        index, score = await asyncio.to_thread(most_similar, embedding, [row[2] for row in rows])
+        if score < SIMILARITY_THRESHOLD:
+            return None
+        key, summary, _ = rows[index]
+        with self.conn:
+            self.conn.execute('UPDATE searches SET last_used = ? WHERE key = ?', (now, key))
+        return summary
+
+    def store(self, key: str, query: str, summary: str, embedding: list[float] | None) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO searches (key, query, summary, embedding, created, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, query, summary, np.asarray(embedding, dtype=np.float32).tobytes() if embedding else None, now, now))
+            self.conn.execute('DELETE FROM searches WHERE created <= ?', (now - self.ttl,))
+            self.conn.execute('''
+                DELETE FROM searches WHERE key IN (
+                    SELECT key FROM searches ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    async def embedding(self, query: str) -> list[float] | None:
+        if not self.embed:
+            return None
+        try:
+            return await self.embed(query)
+        except Exception as e:
+            print(f"Could not embed search query ({e}); matching exact queries only")
+            return None
+
+    async def get_or_search(self, query: str, search: Callable[[], Awaitable[str | None]]) -> str | None:
+        """Return a cached summary for the query, or run search() once and cache its result"""
+        key = cache_key(query)
+        summary = self.lookup(key)
+        if summary is not None:
+            self.hits += 1
+            return summary
+        if key in self.in_flight:
+            self.shared += 1
+            return await asyncio.shield(self.in_flight[key])
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        summary = None
+        try:
+            embedding = await self.embedding(query)
+            summary = await self.lookup_similar(embedding) if embedding else None
+            if summary is not None:
+                self.near_hits += 1
+            else:
+                self.misses += 1
+                summary = await search()
+                if summary is not None:
+                    self.store(key, query, summary, embedding)
+            return summary
+        finally:
+            # Anyone waiting on this search sees the same outcome; a failure reads as None, like a failed search
+            future.set_result(summary)
+            del self.in_flight[key]
+
+    def metrics(self) -> dict:
+        requests = self.hits + self.near_hits + self.shared + self.misses
+        return {
+            "requests": requests,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "shared": self.shared,
+            "misses": self.misses,
+            "hit_rate": (requests - self.misses) / requests if requests else 0.0,
+        }
+
+
+search_cache = SearchCache(embed=openai_embedding if USE_EMBEDDINGS else None)
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+MAX_CONCURRENT_SEARCHES = int(os.getenv("SEARCH_MAX_CONCURRENCY", "5"))
+SEARCHES_PER_MINUTE = float(os.getenv("SEARCH_RATE_PER_MINUTE", "60"))
+MAX_ATTEMPTS = int(os.getenv("SEARCH_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """The server's requested wait from Retry-After (or OpenAI's retry-after-ms) headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return type(error).__name__ in {"APIConnectionError", "APITimeoutError", "TimeoutError"}
+
+
+class TokenBucket:
+    """Allows rate_per_second acquisitions on average, with bursts of up to capacity"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.not_before = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Take a token, waiting for one (and for any pause to end) if necessary; returns the seconds spent waiting"""
+        started = time.monotonic()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.not_before:
+                    # A pause may be extended while we sleep, so look again afterwards
+                    await asyncio.sleep(self.not_before - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - started
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every caller for at least this long, as when the provider has told us to slow down.
+        Concurrent pauses overlap rather than add up, and the bucket restarts near empty so that
+        callers don't all burst out together when the pause ends.
+        """
+        self.not_before = max(self.not_before, time.monotonic() + seconds)
+        self.tokens = min(self.tokens, 1.0)
+        self.updated = max(self.updated, self.not_before)
+
+
+@dataclass
+class SearchRecord:
+    label: str
+    outcome: str
+    attempts: int
+    seconds: float
+    queued_seconds: float
+    error: str | None = None
+
+
+class SearchLimiter:
+    """
+    Shared by every ResearchManager in the process: caps concurrent searches, spreads them out with a
+    token bucket, retries rate limits and transient errors with exponential backoff (honoring Retry-After),
+    and records the latency and outcome of every search.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_SEARCHES,
+        per_minute: float = SEARCHES_PER_MINUTE,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.bucket = TokenBucket(per_minute / 60, capacity=max_concurrent)
+        self.max_attempts = max_attempts
+        self.records: deque[SearchRecord] = deque(maxlen=1000)
+        self.outcomes = Counter()
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def run(self, label: str, search: Callable[[], Awaitable[T]]) -> T | None:
+        """Run search() within the limits, retrying retryable failures; returns None if it ultimately fails"""
+        started = time.monotonic()
+        queued = 0.0
+        error = None
+        attempt = 0
+        while attempt < self.max_attempts:
+            attempt += 1
+            async with self.semaphore:
+                queued += await self.bucket.acquire()
+                try:
+                    result = await search()
+                    self.record(label, "retried" if attempt > 1 else "ok", attempt, started, queued)
+                    return result
+                except Exception as e:
+                    error = e
+            if not is_retryable(error) or attempt == self.max_attempts:
+                break
+            delay = self.backoff(attempt, error)
+            if getattr(error, "status_code", None) == 429:
+                self.bucket.pause(delay)
+            print(f"Search '{label}' attempt {attempt} failed ({error!r}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        self.record(label, "failed", attempt, started, queued, repr(error))
+        return None
+
+    def record(self, label: str, outcome: str, attempts: int, started: float, queued: float, error: str | None = None):
+        record = SearchRecord(label, outcome, attempts, time.monotonic() - started, queued, error)
+        self.records.append(record)
+        self.outcomes[outcome] += 1
+        detail = f": {error}" if error else ""
+        print(f"Search '{label}' {outcome} after {attempts} attempt(s) in {record.seconds:.1f}s{detail}")
+
+    def metrics(self) -> dict:
+        latencies = sorted(record.seconds for record in self.records)
+        return {
+            **self.outcomes,
+            "searches": len(latencies),
+            "p50_seconds": latencies[len(latencies) // 2] if latencies else 0.0,
+            "p95_seconds": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        }
+
+
+search_limiter = SearchLimiter()
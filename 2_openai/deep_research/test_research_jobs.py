@@ -0,0 +1,140 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+scratch = tempfile.mkdtemp(prefix="test_deep_research_")
+os.environ.setdefault("SEARCH_CACHE_DB", os.path.join(scratch, "search_cache.db"))
+os.environ.setdefault("RESEARCH_JOBS_DB", os.path.join(scratch, "research_jobs.db"))
+
+import research_jobs
+from planner_agent import WebSearchItem, WebSearchPlan
+
+PLAN = WebSearchPlan(searches=[WebSearchItem(reason="test", query=query) for query in ("first", "second")])
+
+
+class FakeManager:
+    """Stands in for ResearchManager: plans, searches whatever wasn't saved, then reports"""
+
+    instances = []
+    running = 0
+    most_running = 0
+    release: asyncio.Event | None = None
+
+    def __init__(self, saved_plan=None, saved_searches=None, on_plan=None, on_search_result=None):
+        self.saved_plan = saved_plan
+        self.saved_searches = saved_searches or {}
+        self.on_plan = on_plan
+        self.on_search_result = on_search_result
+        self.searched = []
+        FakeManager.instances.append(self)
+
+    async def run(self, query):
+        FakeManager.running += 1
+        FakeManager.most_running = max(FakeManager.most_running, FakeManager.running)
+        try:
+            if not self.saved_plan:
+                self.on_plan(PLAN)
+            yield "Searching..."
+            for item in PLAN.searches:
+                if item.query not in self.saved_searches:
+                    await FakeManager.release.wait()
+                    self.searched.append(item.query)
+                    self.on_search_result(item.query, f"summary of {item.query}")
+            yield f"Report on {query}"
+        finally:
+            FakeManager.running -= 1
+
+
+class TestResearchJobService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        FakeManager.instances = []
+        FakeManager.running = FakeManager.most_running = 0
+        FakeManager.release = asyncio.Event()
+        self.path = os.path.join(tempfile.mkdtemp(prefix="test_deep_research_"), "research_jobs.db")
+        patch = mock.patch.object(research_jobs, "ResearchManager", FakeManager)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.services = []
+
+    async def asyncTearDown(self):
+        for service in self.services:
+            for worker in service.workers:
+                worker.cancel()
+
+    def service(self, workers=2):
+        service = research_jobs.ResearchJobService(self.path, workers)
+        self.services.append(service)
+        return service
+
+    async def test_jobs_run_on_a_bounded_pool_and_any_client_can_reattach(self):
+        service = self.service(workers=2)
+        job_ids = [service.submit(f"query {n}") for n in range(3)]
+        await asyncio.sleep(0.01)
+        self.assertEqual(FakeManager.running, 2)
+        FakeManager.release.set()
+        first = [update async for update in service.stream(job_ids[2])]
+        self.assertEqual(first[-1], "Report on query 2")
+        again = [update async for update in service.stream(job_ids[2])]
+        self.assertEqual(again, ["Report on query 2"])
+        self.assertEqual(FakeManager.most_running, 2)
+        self.assertEqual({status for _, status, _ in service.list_jobs()}, {"done"})
+
+    async def test_interrupted_jobs_resume_without_redoing_finished_searches(self):
+        service = self.service()
+        job_id = service.submit("resume me")
+        while not FakeManager.instances or not service.conn.execute("SELECT plan FROM jobs").fetchone()[0]:
+            await asyncio.sleep(0.01)
+        service.save_search(job_id, "first", "summary of first")
+        for worker in service.workers:
+            worker.cancel()
+        service.jobs[job_id].task.cancel()
+        await asyncio.sleep(0.01)
+        # A cancelled run is recorded as such; put it back as a restart would find it
+        service.set_status(job_id, "running")
+
+        restarted = self.service()
+        FakeManager.release.set()
+        updates = [update async for update in restarted.stream(job_id)]
+        self.assertEqual(updates[-1], "Report on resume me")
+        resumed = FakeManager.instances[-1]
+        self.assertEqual(resumed.saved_plan, PLAN)
+        self.assertEqual(resumed.saved_searches, {"first": "summary of first"})
+        self.assertEqual(resumed.searched, ["second"])
+
+    async def test_cancel_a_queued_job(self):
+        service = self.service(workers=1)
+        running = service.submit("running")
+        queued = service.submit("queued")
+        await service.cancel(queued)
+        self.assertEqual([update async for update in service.stream(queued)], ["Cancelled before it started"])
+        FakeManager.release.set()
+        self.assertEqual([update async for update in service.stream(running)][-1], "Report on running")
+        self.assertEqual(len(FakeManager.instances), 1)
+
+    async def test_a_job_whose_setup_fails_still_finishes(self):
+        service = self.service()
+        job_id = service.submit("doomed")
+        with mock.patch.object(service, "set_status", side_effect=RuntimeError("disk full")):
+            updates = await asyncio.wait_for(self.collect(service.stream(job_id)), 1)
+        self.assertEqual(updates[-1], "Research failed: RuntimeError('disk full')")
+        self.assertEqual(service.list_jobs(), [(job_id, "failed", "doomed")])
+
+    async def collect(self, stream):
+        return [update async for update in stream]
+
+    def test_the_database_is_only_created_when_first_used(self):
+        self.assertFalse(os.path.exists(research_jobs.JOBS_DB))
+        service = self.service()
+        self.assertFalse(os.path.exists(self.path))
+        service.list_jobs()
+        self.assertTrue(os.path.exists(self.path))
+
+    async def test_unknown_job(self):
+        service = self.service()
+        self.assertEqual([update async for update in service.stream("nope")], ["No research job with id nope"])
+
+
+if __name__ == "__main__":
+    unittest.main()
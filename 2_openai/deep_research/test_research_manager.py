@@ -0,0 +1,113 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault("SEARCH_CACHE_DB", os.path.join(tempfile.mkdtemp(prefix="test_deep_research_"), "search_cache.db"))
+
+from agents import set_tracing_disabled
+from openai.types.responses import ResponseTextDeltaEvent
+import research_manager
+from planner_agent import planner_agent, WebSearchItem, WebSearchPlan
+from writer_agent import section_writer_agent
+
+set_tracing_disabled(True)
+
+SEARCH_SECONDS = {"fast": 0.01, "medium": 0.05, "slow": 0.3}
+PLAN = WebSearchPlan(searches=[WebSearchItem(reason="test", query=query) for query in SEARCH_SECONDS])
+
+
+class FakeStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    async def stream_events(self):
+        for token in self.tokens:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(type="raw_response_event", data=ResponseTextDeltaEvent.model_construct(delta=token))
+
+
+class FakeRunner:
+    """Answers for every agent the manager runs, recording when each section draft started"""
+
+    def __init__(self):
+        self.drafted_at = {}
+        self.writer_input = None
+
+    async def run(self, agent, input):
+        if agent is planner_agent:
+            return SimpleNamespace(final_output=PLAN, final_output_as=lambda _: PLAN)
+        if agent is section_writer_agent:
+            summary = input.split("Search summary: ")[1]
+            self.drafted_at[summary] = time.monotonic()
+            return SimpleNamespace(final_output=f"Section on {summary}")
+        return SimpleNamespace(final_output="sent")
+
+    def run_streamed(self, agent, input):
+        self.writer_input = input
+        return FakeStream(["# Report", " on", " everything"])
+
+
+class Manager(research_manager.ResearchManager):
+    """Searches by sleeping for the query's SEARCH_SECONDS and summarizing it as the query itself"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.searched = []
+
+    async def search(self, item):
+        await asyncio.sleep(SEARCH_SECONDS[item.query])
+        self.searched.append(item.query)
+        return item.query
+
+
+class TestResearchManager(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.runner = FakeRunner()
+        patch = mock.patch.object(research_manager, "Runner", self.runner)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def run_manager(self, manager):
+        return [update async for update in manager.run("everything")]
+
+    async def test_sections_are_drafted_as_searches_land_and_the_report_streams(self):
+        manager = Manager()
+        updates = await self.run_manager(manager)
+        finished = time.monotonic()
+        self.assertEqual(manager.searched, ["fast", "medium", "slow"])
+        # The fast search's section was drafted while the slow search was still running
+        self.assertLess(self.runner.drafted_at["fast"], finished - 0.2)
+        self.assertIn("Section on fast", self.runner.writer_input)
+
+        reports = [update for update in updates if update.startswith("# Report")]
+        self.assertEqual(reports[:3], ["# Report", "# Report on", "# Report on everything"])
+        self.assertIn("using 3/3 searches", reports[-1])
+        self.assertIsNotNone(manager.time_to_first_report_token)
+
+    async def test_searches_past_the_deadline_are_dropped(self):
+        with mock.patch.object(research_manager, "SEARCH_DEADLINE_SECONDS", 0.15):
+            manager = Manager()
+            updates = await self.run_manager(manager)
+        self.assertEqual(manager.searched, ["fast", "medium"])
+        self.assertNotIn("Section on slow", self.runner.writer_input)
+        self.assertIn("using 2/3 searches", updates[-1])
+
+    async def test_resumes_from_a_saved_plan_and_searches(self):
+        results = {}
+        manager = Manager(
+            saved_plan=PLAN,
+            saved_searches={"slow": "saved slow"},
+            on_search_result=lambda query, result: results.__setitem__(query, result),
+        )
+        await self.run_manager(manager)
+        self.assertEqual(manager.searched, ["fast", "medium"])
+        self.assertEqual(results, {"fast": "fast", "medium": "medium"})
+        self.assertIn("Section on saved slow", self.runner.writer_input)
+
+
+if __name__ == "__main__":
+    unittest.main()
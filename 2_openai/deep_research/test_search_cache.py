@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import numpy as np
+
+os.environ.setdefault("SEARCH_CACHE_DB", os.path.join(tempfile.mkdtemp(prefix="test_deep_research_"), "search_cache.db"))
+
+import search_cache
+from search_cache import SearchCache
+
+
+def fake_embedding(query: str) -> list[float]:
+    """Embeds by which of a few topics the query mentions, so near-identical queries embed alike"""
+    topics = ["python", "rust", "speed", "weather"]
+    return [float(topic in query.lower()) for topic in topics]
+
+
+class TestSearchCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(prefix="test_deep_research_"), "search_cache.db")
+        self.searches = []
+
+    def search(self, query):
+        async def run():
+            self.searches.append(query)
+            await asyncio.sleep(0.01)
+            return f"summary of {query}"
+
+        return run
+
+    async def test_case_and_whitespace_share_a_key_but_word_order_does_not(self):
+        self.assertEqual(search_cache.cache_key("Python  vs Rust"), search_cache.cache_key(" python vs rust"))
+        self.assertNotEqual(search_cache.cache_key("python vs rust"), search_cache.cache_key("rust vs python"))
+        cache = SearchCache(self.path)
+        await cache.get_or_search("python vs rust", self.search("python vs rust"))
+        self.assertEqual(await cache.get_or_search("PYTHON vs  rust", self.search("other")), "summary of python vs rust")
+        self.assertEqual(await cache.get_or_search("rust vs python", self.search("rust vs python")), "summary of rust vs python")
+        self.assertEqual(self.searches, ["python vs rust", "rust vs python"])
+
+    async def test_the_database_is_only_created_when_first_used(self):
+        self.assertFalse(os.path.exists(search_cache.CACHE_DB))
+        cache = SearchCache(self.path)
+        self.assertFalse(os.path.exists(self.path))
+        await cache.get_or_search("weather", self.search("weather"))
+        self.assertTrue(os.path.exists(self.path))
+
+    async def test_concurrent_requests_share_one_search(self):
+        cache = SearchCache(self.path)
+        results = await asyncio.gather(*(cache.get_or_search("weather", self.search("weather")) for _ in range(5)))
+        self.assertEqual(set(results), {"summary of weather"})
+        self.assertEqual(self.searches, ["weather"])
+        self.assertEqual(cache.metrics()["shared"], 4)
+
+    async def test_similar_queries_are_served_by_embedding(self):
+        async def embed(query):
+            return fake_embedding(query)
+
+        cache = SearchCache(self.path, embed=embed)
+        await cache.get_or_search("python speed", self.search("python speed"))
+        self.assertEqual(await cache.get_or_search("speed of python", self.search("other")), "summary of python speed")
+        self.assertEqual(await cache.get_or_search("rust", self.search("rust")), "summary of rust")
+        self.assertEqual(self.searches, ["python speed", "rust"])
+        self.assertEqual(cache.metrics()["near_hits"], 1)
+
+    def test_most_similar(self):
+        candidates = [np.asarray(vector, dtype="float32").tobytes() for vector in ([1, 0], [0, 0], [1, 1])]
+        index, score = search_cache.most_similar([1.0, 1.0], candidates)
+        self.assertEqual(index, 2)
+        self.assertAlmostEqual(score, 1.0, places=6)
+
+    async def test_expired_entries_are_searched_again(self):
+        cache = SearchCache(self.path, ttl=0)
+        await cache.get_or_search("weather", self.search("weather"))
+        await cache.get_or_search("weather", self.search("weather"))
+        self.assertEqual(self.searches, ["weather", "weather"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import search_limiter
+from search_limiter import SearchLimiter, TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    async def test_spreads_acquisitions_at_the_rate_after_a_burst(self):
+        bucket = TokenBucket(rate_per_second=50, capacity=2)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        # Two from the burst, then four at 50 a second
+        self.assertAlmostEqual(time.monotonic() - started, 4 / 50, delta=0.04)
+
+    async def test_concurrent_pauses_overlap_rather_than_compound(self):
+        bucket = TokenBucket(rate_per_second=1000, capacity=5)
+        for _ in range(5):
+            bucket.pause(0.2)
+        started = time.monotonic()
+        await bucket.acquire()
+        self.assertAlmostEqual(time.monotonic() - started, 0.2, delta=0.05)
+
+    async def test_a_pause_extended_while_waiting_is_honored(self):
+        bucket = TokenBucket(rate_per_second=1000, capacity=5)
+        bucket.pause(0.1)
+        started = time.monotonic()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0.05)
+        bucket.pause(0.15)
+        await waiter
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+
+class TestSearchLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_rate_limits_hold_back_searches_once(self):
+        limiter = SearchLimiter(max_concurrent=5, per_minute=60_000, max_attempts=3)
+        failed = set()
+
+        async def search(label):
+            # All five are in flight together when the provider starts turning them away
+            await asyncio.sleep(0.01)
+            if label not in failed:
+                failed.add(label)
+                raise RateLimited(0.2)
+            return label
+
+        started = time.monotonic()
+        with mock.patch("builtins.print"):
+            results = await asyncio.gather(*(limiter.run(str(n), lambda n=n: search(str(n))) for n in range(5)))
+        self.assertEqual(results, [str(n) for n in range(5)])
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(limiter.metrics()["retried"], 5)
+
+    async def test_gives_up_on_errors_that_are_not_retryable(self):
+        limiter = SearchLimiter(max_attempts=3)
+        attempts = []
+
+        async def search():
+            attempts.append(1)
+            raise ValueError("bad query")
+
+        with mock.patch("builtins.print"):
+            self.assertIsNone(await limiter.run("bad", search))
+        self.assertEqual(len(attempts), 1)
+        self.assertEqual(limiter.metrics()["failed"], 1)
+
+    def test_retry_after_headers(self):
+        self.assertEqual(search_limiter.retry_after_seconds(RateLimited(2)), 2.0)
+        error = SimpleNamespace(response=SimpleNamespace(headers={"retry-after-ms": "1500"}))
+        self.assertEqual(search_limiter.retry_after_seconds(error), 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
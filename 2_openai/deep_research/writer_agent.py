@@ -1,27 +1,33 @@
-from pydantic import BaseModel, Field
 from agents import Agent
 
+SECTION_INSTRUCTIONS = (
+    "You are a research assistant drafting one section of a larger report for a research query. "
+    "You will be provided with the original query and the summary of a single web search. "
+    "Write a markdown section with a short heading that sets out what this search contributes to "
+    "answering the query. Keep the key facts, figures and sources; aim for 200-400 words. "
+    "Output only the section."
+)
+
 INSTRUCTIONS = (
     "You are a senior researcher tasked with writing a cohesive report for a research query. "
-    "You will be provided with the original query, and some initial research done by a research assistant.\n"
+    "You will be provided with the original query, and draft sections written from initial research "
+    "done by a research assistant.\n"
     "You should first come up with an outline for the report that describes the structure and "
-    "flow of the report. Then, generate the report and return that as your final output.\n"
-    "The final output should be in markdown format, and it should be lengthy and detailed. Aim "
-    "for 5-10 pages of content, at least 1000 words."
+    "flow of the report, reorganizing and merging the draft sections as needed. Then, generate the report.\n"
+    "Output only the report, in markdown format, and it should be lengthy and detailed. Aim "
+    "for 5-10 pages of content, at least 1000 words. Start with a short 2-3 sentence summary of the "
+    "findings and finish with a list of suggested topics to research further."
 )
 
 
-class ReportData(BaseModel):
-    short_summary: str = Field(description="A short 2-3 sentence summary of the findings.")
-
-    markdown_report: str = Field(description="The final report")
-
-    follow_up_questions: list[str] = Field(description="Suggested topics to research further")
-
+section_writer_agent = Agent(
+    name="SectionWriterAgent",
+    instructions=SECTION_INSTRUCTIONS,
+    model="gpt-4o-mini",
+)
 
 writer_agent = Agent(
     name="WriterAgent",
     instructions=INSTRUCTIONS,
     model="gpt-4o-mini",
-    output_type=ReportData,
-)
\ No newline at end of file
+)
@@ -5,18 +5,26 @@ from sidekick import Sidekick
 async def setup():
     sidekick = Sidekick()
     await sidekick.setup()
-    return sidekick
+    return sidekick, sidekick.sidekick_id
 
 
 async def process_message(sidekick, message, success_criteria, history):
-    results = await sidekick.run_superstep(message, success_criteria, history)
-    return results, sidekick
+    async for results in sidekick.run_superstep(message, success_criteria, history):
+        yield results, sidekick
 
 
-async def reset():
+async def reset(sidekick):
+    free_resources(sidekick)
     new_sidekick = Sidekick()
     await new_sidekick.setup()
-    return "", "", None, new_sidekick
+    return "", "", None, new_sidekick, new_sidekick.sidekick_id
+
+
+async def resume(sidekick, session_id):
+    free_resources(sidekick)
+    resumed = Sidekick(session_id.strip() or None)
+    await resumed.setup()
+    return await resumed.history(), resumed, resumed.sidekick_id
 
 
 def free_resources(sidekick):
@@ -44,8 +52,11 @@ with gr.Blocks(title="Sidekick", theme=gr.themes.Default(primary_hue="emerald"))
     with gr.Row():
         reset_button = gr.Button("Reset", variant="stop")
         go_button = gr.Button("Go!", variant="primary")
+    with gr.Row():
+        session_id = gr.Textbox(label="Session id", scale=3)
+        resume_button = gr.Button("Resume session")
 
-    ui.load(setup, [], [sidekick])
+    ui.load(setup, [], [sidekick, session_id])
     message.submit(
         process_message, [sidekick, message, success_criteria, chatbot], [chatbot, sidekick]
     )
@@ -55,7 +66,8 @@ with gr.Blocks(title="Sidekick", theme=gr.themes.Default(primary_hue="emerald"))
     go_button.click(
         process_message, [sidekick, message, success_criteria, chatbot], [chatbot, sidekick]
     )
-    reset_button.click(reset, [], [message, success_criteria, chatbot, sidekick])
+    reset_button.click(reset, [sidekick], [message, success_criteria, chatbot, sidekick, session_id])
+    resume_button.click(resume, [sidekick, session_id], [chatbot, sidekick, session_id])
 
 
 ui.launch(inbrowser=True)
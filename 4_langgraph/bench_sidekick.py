@@ -0,0 +1,58 @@
+"""
+Measures how many Sidekick sessions one event loop can serve at once. The worker and evaluator LLMs
+are replaced with fakes that take LATENCY_SECONDS per call, either awaiting (as the async nodes do)
+or blocking the thread (as the synchronous invoke calls used to).
+
+Run with: uv run bench_sidekick.py
+"""
+
+import os
+
+for key in ("OPENAI_API_KEY", "SERPER_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+import asyncio
+import time
+from langchain_core.messages import AIMessage
+from sidekick import Sidekick, EvaluatorOutput
+
+LATENCY_SECONDS = 0.5
+SESSIONS = [1, 8, 32, 64]
+
+
+class FakeLLM:
+    def __init__(self, reply, blocking: bool):
+        self.reply = reply
+        self.blocking = blocking
+
+    async def ainvoke(self, messages):
+        if self.blocking:
+            time.sleep(LATENCY_SECONDS)
+        else:
+            await asyncio.sleep(LATENCY_SECONDS)
+        return self.reply
+
+
+async def session(blocking: bool) -> None:
+    sidekick = Sidekick()
+    sidekick.tools = []
+    sidekick.worker_llm_with_tools = FakeLLM(AIMessage(content="Done"), blocking)
+    evaluation = EvaluatorOutput(feedback="Good", success_criteria_met=True, user_input_needed=False)
+    sidekick.evaluator_llm_with_output = FakeLLM(evaluation, blocking)
+    await sidekick.build_graph()
+    async for _ in sidekick.run_superstep("Hello", "", []):
+        pass
+
+
+async def main() -> None:
+    print(f"Each session makes a worker and an evaluator call of {LATENCY_SECONDS}s")
+    for sessions in SESSIONS:
+        for blocking in (True, False):
+            started = time.perf_counter()
+            await asyncio.gather(*(session(blocking) for _ in range(sessions)))
+            label = "blocking" if blocking else "async"
+            print(f"{sessions:3d} concurrent sessions, {label:8s} {time.perf_counter() - started:6.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,13 +3,15 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
-from langgraph.prebuilt import ToolNode
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from typing import List, Any, Optional, Dict
 from pydantic import BaseModel, Field
-from sidekick_tools import playwright_tools, other_tools
+from sidekick_tools import playwright_tools, other_tools, browser_pool
+from sidekick_sandbox import sandbox_pool
+from sidekick_context import ContextWindow
+from sidekick_memory import get_checkpointer
+from sidekick_executor import ToolExecutor
 import uuid
 import asyncio
 from datetime import datetime
@@ -34,27 +36,28 @@ class EvaluatorOutput(BaseModel):
 
 
 class Sidekick:
-    def __init__(self):
+    def __init__(self, sidekick_id: Optional[str] = None):
         self.worker_llm_with_tools = None
         self.evaluator_llm_with_output = None
         self.tools = None
         self.llm_with_tools = None
         self.graph = None
-        self.sidekick_id = str(uuid.uuid4())
-        self.memory = MemorySaver()
+        self.sidekick_id = sidekick_id or str(uuid.uuid4())
+        self.memory = None
         self.browser = None
-        self.playwright = None
+        self.context = ContextWindow()
 
     async def setup(self):
-        self.tools, self.browser, self.playwright = await playwright_tools()
-        self.tools += await other_tools()
+        self.memory = await get_checkpointer()
+        self.tools, self.browser = await playwright_tools()
+        self.tools += await other_tools(self.sidekick_id)
         worker_llm = ChatOpenAI(model="gpt-4o-mini")
         self.worker_llm_with_tools = worker_llm.bind_tools(self.tools)
         evaluator_llm = ChatOpenAI(model="gpt-4o-mini")
         self.evaluator_llm_with_output = evaluator_llm.with_structured_output(EvaluatorOutput)
         await self.build_graph()
 
-    def worker(self, state: State) -> Dict[str, Any]:
+    async def worker(self, state: State) -> Dict[str, Any]:
         system_message = f"""You are a helpful assistant that can use tools to complete tasks.
     You keep working on a task until either you have a question or clarification for the user, or the success criteria is met.
     You have many tools to help you, including tools to browse the internet, navigating and retrieving web pages.
@@ -78,20 +81,11 @@ class Sidekick:
     {state["feedback_on_work"]}
     With this feedback, please continue the assignment, ensuring that you meet the success criteria or have a question for the user."""
 
-        # Add in the system message
-
-        found_system_message = False
-        messages = state["messages"]
-        for message in messages:
-            if isinstance(message, SystemMessage):
-                message.content = system_message
-                found_system_message = True
-
-        if not found_system_message:
-            messages = [SystemMessage(content=system_message)] + messages
+        # Add in the system message, keeping the conversation within the context budget
+        messages = self.context.worker_messages(system_message, state["messages"])
 
         # Invoke the LLM with tools
-        response = self.worker_llm_with_tools.invoke(messages)
+        response = await self.worker_llm_with_tools.ainvoke(messages)
 
         # Return updated state
         return {
@@ -107,16 +101,9 @@ class Sidekick:
             return "evaluator"
 
     def format_conversation(self, messages: List[Any]) -> str:
-        conversation = "Conversation history:\n\n"
-        for message in messages:
-            if isinstance(message, HumanMessage):
-                conversation += f"User: {message.content}\n"
-            elif isinstance(message, AIMessage):
-                text = message.content or "[Tools use]"
-                conversation += f"Assistant: {text}\n"
-        return conversation
+        return self.context.transcript(messages)
 
-    def evaluator(self, state: State) -> State:
+    async def evaluator(self, state: State) -> State:
         last_response = state["messages"][-1].content
 
         system_message = """You are an evaluator that determines if a task has been completed successfully by an Assistant.
@@ -150,7 +137,8 @@ class Sidekick:
             HumanMessage(content=user_message),
         ]
 
-        eval_result = self.evaluator_llm_with_output.invoke(evaluator_messages)
+        self.context.record("evaluator", evaluator_messages)
+        eval_result = await self.evaluator_llm_with_output.ainvoke(evaluator_messages)
         new_state = {
             "messages": [
                 {
@@ -176,7 +164,7 @@ class Sidekick:
 
         # Add nodes
         graph_builder.add_node("worker", self.worker)
-        graph_builder.add_node("tools", ToolNode(tools=self.tools))
+        graph_builder.add_node("tools", ToolExecutor(self.tools))
         graph_builder.add_node("evaluator", self.evaluator)
 
         # Add edges
@@ -193,6 +181,7 @@ class Sidekick:
         self.graph = graph_builder.compile(checkpointer=self.memory)
 
     async def run_superstep(self, message, success_criteria, history):
+        """Run the graph on the message, yielding the chat history as the worker's reply streams in"""
         config = {"configurable": {"thread_id": self.sidekick_id}}
 
         state = {
@@ -202,21 +191,40 @@ class Sidekick:
             "success_criteria_met": False,
             "user_input_needed": False,
         }
-        result = await self.graph.ainvoke(state, config=config)
         user = {"role": "user", "content": message}
+        result = None
+        reply_id = None
+        reply = ""
+        async for mode, chunk in self.graph.astream(state, config=config, stream_mode=["messages", "values"]):
+            if mode == "values":
+                result = chunk
+                continue
+            token, metadata = chunk
+            if metadata.get("langgraph_node") != "worker" or not token.content:
+                continue
+            # Each worker turn is a new message; show only the one being written now
+            if token.id != reply_id:
+                reply_id, reply = token.id, ""
+            reply += token.content
+            yield history + [user, {"role": "assistant", "content": reply}]
         reply = {"role": "assistant", "content": result["messages"][-2].content}
         feedback = {"role": "assistant", "content": result["messages"][-1].content}
-        return history + [user, reply, feedback]
+        yield history + [user, reply, feedback]
+
+    async def history(self) -> List[Dict[str, str]]:
+        """The chat history of this Sidekick's thread, as saved by the checkpointer, for resuming a session"""
+        config = {"configurable": {"thread_id": self.sidekick_id}}
+        snapshot = await self.graph.aget_state(config)
+        history = []
+        for message in snapshot.values.get("messages", []):
+            if isinstance(message, HumanMessage):
+                history.append({"role": "user", "content": message.content})
+            elif isinstance(message, AIMessage) and message.content and not message.tool_calls:
+                history.append({"role": "assistant", "content": message.content})
+        return history
 
     def cleanup(self):
+        sandbox_pool.release(self.sidekick_id)
         if self.browser:
-            try:
-                loop = asyncio.get_running_loop()
-                loop.create_task(self.browser.close())
-                if self.playwright:
-                    loop.create_task(self.playwright.stop())
-            except RuntimeError:
-                # If no loop is running, do a direct run
-                asyncio.run(self.browser.close())
-                if self.playwright:
-                    asyncio.run(self.playwright.stop())
+            browser_pool.release_soon(self.browser)
+            self.browser = None
@@ -0,0 +1,172 @@
+import os
+from typing import Any, Dict, List
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+WORKER_CONTEXT_TOKENS = int(os.getenv("SIDEKICK_CONTEXT_TOKENS", "12000"))
+EVALUATOR_TRANSCRIPT_TOKENS = int(os.getenv("SIDEKICK_TRANSCRIPT_TOKENS", "4000"))
+OLD_TOOL_OUTPUT_TOKENS = 300
+CHARS_PER_TOKEN = 4
+
+
+def load_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model("gpt-4o-mini")
+    except Exception as e:
+        print(f"No tokenizer available ({type(e).__name__}); estimating tokens from characters")
+        return None
+
+
+encoding = load_encoding()
+
+
+def count_tokens(text: str) -> int:
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate(text: str, tokens: int) -> str:
+    if count_tokens(text) <= tokens:
+        return text
+    if encoding:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:tokens]) + " ...[truncated]"
+    return text[: tokens * CHARS_PER_TOKEN] + " ...[truncated]"
+
+
+class ContextWindow:
+    """
+    Keeps what each Sidekick sends to its models under a token budget, however long the session runs.
+    The worker sees the system message, the user's first request and as many of the latest turns as fit,
+    with older tool outputs truncated; the evaluator sees a transcript that is formatted incrementally,
+    one new message at a time, and cut to its own budget. Every call's prompt size is recorded in usage.
+    """
+
+    def __init__(
+        self,
+        worker_tokens: int = WORKER_CONTEXT_TOKENS,
+        transcript_tokens: int = EVALUATOR_TRANSCRIPT_TOKENS,
+    ):
+        self.worker_tokens = worker_tokens
+        self.transcript_tokens = transcript_tokens
+        self.token_counts: Dict[str, int] = {}
+        self.transcript_ids: List[str] = []
+        self.transcript_lines: List[str] = []
+        self.transcript_line_tokens: List[int] = []
+        self.usage: List[Dict[str, Any]] = []
+
+    def message_tokens(self, message: Any) -> int:
+        key = getattr(message, "id", None)
+        if key and key in self.token_counts:
+            return self.token_counts[key]
+        text = str(message.content) + str(getattr(message, "tool_calls", "") or "")
+        tokens = count_tokens(text) + 4
+        if key:
+            self.token_counts[key] = tokens
+        return tokens
+
+    def turns(self, messages: List[Any]) -> List[List[Any]]:
+        """Group messages so that tool results are never separated from the tool calls they answer"""
+        groups = []
+        for message in messages:
+            if isinstance(message, SystemMessage):
+                continue
+            if isinstance(message, ToolMessage) and groups:
+                groups[-1].append(message)
+            else:
+                groups.append([message])
+        return groups
+
+    def worker_messages(self, system_message: str, messages: List[Any]) -> List[Any]:
+        """The messages to send the worker: a fresh system message, the first request, and the latest turns that fit"""
+        system = SystemMessage(content=system_message)
+        groups = self.turns(messages)
+        first = groups[0] if groups and isinstance(groups[0][0], HumanMessage) else []
+        rest = groups[1:] if first else groups
+        budget = self.worker_tokens - count_tokens(system_message) - sum(self.message_tokens(m) for m in first)
+        kept = []
+        for index, group in enumerate(reversed(rest)):
+            if index > 0:
+                group = [self.shorten(message) for message in group]
+            tokens = sum(self.message_tokens(message) for message in group)
+            if tokens > budget and kept:
+                break
+            kept.insert(0, group)
+            budget -= tokens
+        omitted = len(rest) - len(kept)
+        note = [HumanMessage(content=f"[{omitted} earlier turns omitted to save space]")] if omitted else []
+        window = [system] + first + note + [message for group in kept for message in group]
+        self.record("worker", window)
+        return window
+
+    def shorten(self, message: Any) -> Any:
+        """Older tool outputs are cut down; the latest round is always sent in full"""
+        if not isinstance(message, ToolMessage) or self.message_tokens(message) <= OLD_TOOL_OUTPUT_TOKENS:
+            return message
+        content = truncate(str(message.content), OLD_TOOL_OUTPUT_TOKENS)
+        return message.model_copy(update={"content": content, "id": f"{message.id}:short"})
+
+    def format_message(self, message: Any) -> str | None:
+        if isinstance(message, HumanMessage):
+            return f"User: {message.content}\n"
+        if isinstance(message, AIMessage):
+            text = message.content or "[Tools use]"
+            return f"Assistant: {text}\n"
+        return None
+
+    def transcript(self, messages: List[Any]) -> str:
+        """The conversation as text for the evaluator, formatting only the messages added since the last call"""
+        ids = [getattr(message, "id", None) for message in messages]
+        if ids[: len(self.transcript_ids)] != self.transcript_ids or None in ids:
+            self.transcript_ids, self.transcript_lines, self.transcript_line_tokens = [], [], []
+        for message in messages[len(self.transcript_ids):]:
+            self.transcript_ids.append(getattr(message, "id", None))
+            line = self.format_message(message)
+            if line:
+                self.transcript_lines.append(line)
+                self.transcript_line_tokens.append(count_tokens(line))
+        lines = self.transcript_lines
+        budget = self.transcript_tokens - (self.transcript_line_tokens[0] if lines else 0)
+        start = len(lines)
+        while start > 1 and self.transcript_line_tokens[start - 1] <= budget:
+            start -= 1
+            budget -= self.transcript_line_tokens[start]
+        if start > 1:
+            lines = lines[:1] + ["[earlier conversation omitted]\n"] + lines[start:]
+        return "Conversation history:\n\n" + "".join(lines)
+
+    def record(self, call: str, messages: List[Any]) -> int:
+        tokens = sum(self.message_tokens(message) for message in messages)
+        self.usage.append({"call": call, "prompt_tokens": tokens})
+        return tokens
+
+
+def simulate(rounds: int = 30, tool_output_tokens: int = 2000) -> None:
+    """Compare prompt tokens with and without windowing over a long, tool-heavy session"""
+    window = ContextWindow()
+    messages: List[Any] = [HumanMessage(content="Research the history of the transistor in detail", id="h0")]
+    output = "lorem ipsum dolor sit amet " * (tool_output_tokens // 5)
+    full_total = windowed_total = 0
+    print(f"{'round':>5} {'full':>8} {'windowed':>9} {'transcript':>11}")
+    for turn in range(1, rounds + 1):
+        system = "You are a helpful assistant that can use tools to complete tasks."
+        full = count_tokens(system) + sum(window.message_tokens(message) for message in messages)
+        window.worker_messages(system, messages)
+        windowed = window.usage[-1]["prompt_tokens"]
+        transcript = count_tokens(window.transcript(messages))
+        full_total += full
+        windowed_total += windowed
+        if turn % 5 == 0 or turn == 1:
+            print(f"{turn:>5} {full:>8} {windowed:>9} {transcript:>11}")
+        call = {"name": "search", "args": {"query": f"transistor part {turn}"}, "id": f"call{turn}"}
+        messages.append(AIMessage(content="", tool_calls=[call], id=f"a{turn}"))
+        messages.append(ToolMessage(content=output, tool_call_id=f"call{turn}", id=f"t{turn}"))
+        if turn % 3 == 0:
+            messages.append(AIMessage(content=f"Interim answer {turn}", id=f"r{turn}"))
+            messages.append(AIMessage(content=f"Evaluator Feedback on this answer: keep going {turn}", id=f"e{turn}"))
+    print(f"Total worker prompt tokens: {full_total} full, {windowed_total} windowed")
+
+
+if __name__ == "__main__":
+    simulate()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+TOOL_TIMEOUT_SECONDS = float(os.getenv("SIDEKICK_TOOL_TIMEOUT_SECONDS", "60"))
+TOOL_TIMEOUTS = {
+    "search": 20,
+    "wikipedia": 20,
+    "send_push_notification": 10,
+    "Python_REPL": 30,
+}
+TOOL_OUTPUT_CHARS = int(os.getenv("SIDEKICK_TOOL_OUTPUT_CHARS", "20000"))
+TOOL_THREADS = int(os.getenv("SIDEKICK_TOOL_THREADS", "16"))
+
+# Blocking tools from every Sidekick share these threads, so the event loop's default executor stays free
+tool_threads = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="sidekick-tool")
+
+
+def is_async(tool: BaseTool) -> bool:
+    """Whether the tool has its own coroutine, rather than wrapping a blocking function"""
+    if getattr(tool, "coroutine", None):
+        return True
+    return type(tool)._arun is not BaseTool._arun and getattr(tool, "func", None) is None
+
+
+class ToolExecutor:
+    """
+    The graph's tools node: runs every tool call in the worker's last message at once, async tools on the
+    event loop and blocking ones on a shared thread pool. Each call has a timeout (per tool in TOOL_TIMEOUTS,
+    otherwise TOOL_TIMEOUT_SECONDS) and its output is capped at max_output_chars; failures and timeouts
+    come back to the worker as error messages. The latency and outcome of every call are recorded.
+    """
+
+    def __init__(self, tools: List[BaseTool], max_output_chars: int = TOOL_OUTPUT_CHARS):
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_output_chars = max_output_chars
+        self.latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=500))
+        self.outcomes = Counter()
+
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        tool_calls = state["messages"][-1].tool_calls
+        results = await asyncio.gather(*(self.run(tool_call) for tool_call in tool_calls))
+        return {"messages": list(results)}
+
+    async def run(self, tool_call: Dict[str, Any]) -> ToolMessage:
+        name = tool_call["name"]
+        tool = self.tools.get(name)
+        if tool is None:
+            return self.result(tool_call, f"Error: there is no tool named {name}", "error")
+        timeout = TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT_SECONDS)
+        started = time.monotonic()
+        try:
+            if is_async(tool):
+                call = tool.ainvoke(tool_call["args"])
+            else:
+                call = asyncio.get_running_loop().run_in_executor(tool_threads, tool.invoke, tool_call["args"])
+            output = await asyncio.wait_for(call, timeout=timeout)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            # A blocking tool can't be interrupted; its thread finishes in the background and the result is dropped
+            print(f"Tool {name} timed out after {timeout:.0f}s")
+            output = f"Error: {name} did not finish within {timeout:.0f} seconds"
+            outcome = "timeout"
+        except Exception as e:
+            output = f"Error: {e!r}\n Please fix your mistakes."
+            outcome = "error"
+        self.latencies[name].append(time.monotonic() - started)
+        self.outcomes[(name, outcome)] += 1
+        return self.result(tool_call, output, "success" if outcome == "ok" else "error")
+
+    def result(self, tool_call: Dict[str, Any], output: Any, status: str) -> ToolMessage:
+        content = output if isinstance(output, str) else str(output)
+        if len(content) > self.max_output_chars:
+            omitted = len(content) - self.max_output_chars
+            content = content[: self.max_output_chars] + f"\n...[{omitted} more characters omitted]"
+        return ToolMessage(content=content, tool_call_id=tool_call["id"], name=tool_call["name"], status=status)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        metrics = {}
+        for name, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            metrics[name] = {
+                "calls": len(ordered),
+                "p50_seconds": ordered[len(ordered) // 2],
+                "max_seconds": ordered[-1],
+                **{outcome: count for (tool, outcome), count in self.outcomes.items() if tool == name},
+            }
+        return metrics
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import aiosqlite
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+SIDEKICK_CHECKPOINTER = os.getenv("SIDEKICK_CHECKPOINTER", "sqlite").strip().lower()
+# Kept apart from the labs' memory.db, which the notebooks also write to
+SIDEKICK_DB = os.getenv("SIDEKICK_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sidekick_checkpoints.db"))
+CHECKPOINTS_PER_THREAD = int(os.getenv("SIDEKICK_CHECKPOINTS_PER_THREAD", "20"))
+PRUNE_EVERY_N_CHECKPOINTS = 10
+
+
+class PruningSqliteSaver(AsyncSqliteSaver):
+    """
+    An AsyncSqliteSaver that keeps only the newest keep checkpoints of each thread, and the pending
+    writes that belong to them, so the database grows with the number of threads rather than steps.
+    Resuming a thread only ever needs its latest checkpoint.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, keep: int = CHECKPOINTS_PER_THREAD):
+        super().__init__(conn)
+        self.keep = keep
+        self.puts: dict[str, int] = {}
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        await super().setup()
+        async with self.lock:
+            await self.conn.execute("PRAGMA synchronous=NORMAL")
+            await self.conn.execute("PRAGMA busy_timeout=5000")
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        saved = await super().aput(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        self.puts[thread_id] = self.puts.get(thread_id, 0) + 1
+        if self.puts[thread_id] % PRUNE_EVERY_N_CHECKPOINTS == 0:
+            await self.prune(thread_id)
+        return saved
+
+    async def prune(self, thread_id: str) -> None:
+        async with self.lock:
+            await self.conn.execute(
+                """
+                DELETE FROM checkpoints WHERE thread_id = ? AND (checkpoint_ns, checkpoint_id) IN (
+                    SELECT checkpoint_ns, checkpoint_id FROM (
+                        SELECT checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+                            PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC
+                        ) AS newest
+                        FROM checkpoints WHERE thread_id = ?
+                    ) WHERE newest > ?
+                )
+                """,
+                (thread_id, thread_id, self.keep),
+            )
+            await self.conn.execute(
+                """
+                DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS (
+                    SELECT 1 FROM checkpoints c
+                    WHERE c.thread_id = writes.thread_id
+                    AND c.checkpoint_ns = writes.checkpoint_ns
+                    AND c.checkpoint_id = writes.checkpoint_id
+                )
+                """,
+                (thread_id,),
+            )
+            await self.conn.commit()
+            # The pragma returns a row; closing its cursor finishes the statement, which VACUUM requires
+            async with self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)"):
+                pass
+
+    async def compact(self) -> None:
+        """Prune every thread and reclaim the freed pages; run occasionally, as it rewrites the database"""
+        async with self.conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+            thread_ids = [row[0] async for row in cursor]
+        for thread_id in thread_ids:
+            await self.prune(thread_id)
+        async with self.lock:
+            await self.conn.execute("VACUUM")
+
+
+checkpointer = None
+# Sessions starting at once would otherwise each open a connection, and all but the last would leak
+checkpointer_lock = asyncio.Lock()
+
+
+async def get_checkpointer():
+    """The process-wide checkpointer shared by every Sidekick, opened on first use"""
+    global checkpointer
+    async with checkpointer_lock:
+        if checkpointer is None:
+            if SIDEKICK_CHECKPOINTER == "memory":
+                checkpointer = MemorySaver()
+            else:
+                conn = aiosqlite.connect(SIDEKICK_DB)
+                # The connection runs on its own thread; as a daemon it won't keep the process alive at exit
+                conn.daemon = True
+                saver = PruningSqliteSaver(await conn)
+                await saver.setup()
+                checkpointer = saver
+    return checkpointer
+
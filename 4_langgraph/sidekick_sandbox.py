@@ -0,0 +1,208 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:
+    # Windows: workers are then limited only by the timeout
+    resource = None
+
+SANDBOX_DIR = os.path.abspath(os.getenv("SIDEKICK_SANDBOX_DIR", "sandbox"))
+SANDBOX_SPARES = int(os.getenv("SIDEKICK_SANDBOX_SPARES", "2"))
+SANDBOX_MAX_WORKERS = int(os.getenv("SIDEKICK_SANDBOX_MAX_WORKERS", "8"))
+SANDBOX_TIMEOUT_SECONDS = float(os.getenv("SIDEKICK_SANDBOX_TIMEOUT_SECONDS", "25"))
+SANDBOX_CPU_SECONDS = int(os.getenv("SIDEKICK_SANDBOX_CPU_SECONDS", "20"))
+# A worker's CPU allowance over its whole life, however many calls it runs
+SANDBOX_WORKER_CPU_SECONDS = int(os.getenv("SIDEKICK_SANDBOX_WORKER_CPU_SECONDS", "600"))
+SANDBOX_MEMORY_MB = int(os.getenv("SIDEKICK_SANDBOX_MEMORY_MB", "1024"))
+SANDBOX_OUTPUT_CHARS = 20000
+# The only environment variables a worker sees, so the app's API keys stay out of reach of the code it runs
+SANDBOX_ENV_KEYS = ("PATH", "LANG", "LC_ALL", "TZ", "SYSTEMROOT")
+
+
+def sanitize(code: str) -> str:
+    """Strip the markdown code fences that models like to wrap code in, as PythonREPLTool does"""
+    code = re.sub(r"^(\s|`)*(?i:python)?\s*", "", code)
+    return re.sub(r"(\s|`)*$", "", code)
+
+
+def session_dir(root: str, session_id: str) -> str:
+    """The session's own directory under root, with anything that isn't safe in a file name replaced"""
+    return os.path.join(root, re.sub(r"[^\w-]", "_", session_id))
+
+
+def limit_resources() -> None:
+    if resource is None:
+        print("Sandbox memory, CPU and file size limits are off on this platform; only the timeout applies", file=sys.stderr)
+        return
+    resource.setrlimit(resource.RLIMIT_CPU, (SANDBOX_WORKER_CPU_SECONDS, SANDBOX_WORKER_CPU_SECONDS))
+    memory = SANDBOX_MEMORY_MB * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (100 * 1024 * 1024, 100 * 1024 * 1024))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def allow_cpu(seconds: int) -> None:
+    """
+    Let the next execution use this many more CPU seconds than the worker has used so far. Only the soft
+    limit moves: the hard limit, set once at startup, can't be raised again without root.
+    """
+    if resource is None:
+        return
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used.ru_utime + used.ru_stime) + seconds
+    resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+
+def serve() -> None:
+    """The worker process: run each piece of code it is sent in one persistent namespace, replying with its output"""
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    limit_resources()
+    namespace = {"__name__": "__main__"}
+    for line in sys.stdin:
+        request = json.loads(line)
+        if "cwd" in request:
+            os.makedirs(request["cwd"], exist_ok=True)
+            os.chdir(request["cwd"])
+            replies.write(json.dumps({"output": ""}) + "\n")
+            replies.flush()
+            continue
+        output = io.StringIO()
+        try:
+            allow_cpu(request.get("cpu_seconds", SANDBOX_CPU_SECONDS))
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                exec(sanitize(request["code"]), namespace)
+            result = output.getvalue()
+        except MemoryError:
+            result = output.getvalue() + "MemoryError: the sandbox's memory limit was exceeded"
+        except BaseException as e:
+            result = output.getvalue() + "".join(traceback.format_exception_only(type(e), e))
+        replies.write(json.dumps({"output": result[:SANDBOX_OUTPUT_CHARS]}) + "\n")
+        replies.flush()
+
+
+class SandboxWorker:
+    """A running worker process, owned by at most one session at a time"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.session_id = None
+        self.last_used = time.monotonic()
+        # The worker runs one request at a time, even when the model asks for several in parallel
+        self.busy = asyncio.Lock()
+
+    async def request(self, message: dict, timeout: float) -> str:
+        async with self.busy:
+            self.process.stdin.write((json.dumps(message) + "\n").encode())
+            await self.process.stdin.drain()
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout=timeout)
+        if not line:
+            code = await self.process.wait()
+            raise RuntimeError(f"The sandbox stopped (exit code {code}), after exceeding its CPU limit or being restarted")
+        return json.loads(line)["output"]
+
+    def kill(self) -> None:
+        if self.process.returncode is None:
+            self.process.kill()
+
+
+class SandboxPool:
+    """
+    A pool of pre-started Python worker processes for Sidekick's python tool. Each session gets a worker of
+    its own, keeping its variables between calls, and running in its own directory under the sandbox directory
+    with limits on memory, CPU and file size, and none of the app's environment variables. A few spare workers are kept warm so sessions don't wait for interpreter startup.
+    A call that runs past its timeout kills its worker, and the session's next call starts a fresh one.
+    Workers are never passed from one session to another; at most max_workers are kept, evicting the least recently used.
+    """
+
+    def __init__(self, spares: int = SANDBOX_SPARES, max_workers: int = SANDBOX_MAX_WORKERS, cwd: str = SANDBOX_DIR):
+        self.spares_wanted = spares
+        self.max_workers = max_workers
+        self.cwd = cwd
+        self.spares: list[SandboxWorker] = []
+        self.sessions: dict[str, SandboxWorker] = {}
+        self.lock = asyncio.Lock()
+        self.loop = None
+
+    async def spawn(self) -> SandboxWorker:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", os.path.abspath(__file__), "--worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env={key: os.environ[key] for key in SANDBOX_ENV_KEYS if key in os.environ} | {"HOME": self.cwd},
+            limit=4 * SANDBOX_OUTPUT_CHARS,
+        )
+        return SandboxWorker(process)
+
+    async def refill(self) -> None:
+        self.spares = [worker for worker in self.spares if worker.process.returncode is None]
+        while len(self.spares) < self.spares_wanted:
+            self.spares.append(await self.spawn())
+
+    async def worker_for(self, session_id: str) -> SandboxWorker:
+        async with self.lock:
+            self.loop = asyncio.get_running_loop()
+            worker = self.sessions.get(session_id)
+            if worker and worker.process.returncode is None:
+                return worker
+            if len(self.sessions) >= self.max_workers:
+                oldest = min(self.sessions, key=lambda session: self.sessions[session].last_used)
+                print(f"Sandbox pool full; stopping the sandbox of session {oldest}")
+                self.sessions.pop(oldest).kill()
+            await self.refill()
+            worker = self.spares.pop(0) if self.spares else await self.spawn()
+            worker.session_id = session_id
+            await worker.request({"cwd": session_dir(self.cwd, session_id)}, timeout=SANDBOX_TIMEOUT_SECONDS)
+            self.sessions[session_id] = worker
+        asyncio.get_running_loop().create_task(self.refill_soon())
+        return worker
+
+    async def refill_soon(self) -> None:
+        async with self.lock:
+            await self.refill()
+
+    async def run(self, session_id: str, code: str, timeout: float = SANDBOX_TIMEOUT_SECONDS) -> str:
+        worker = await self.worker_for(session_id)
+        worker.last_used = time.monotonic()
+        try:
+            return await worker.request({"code": code, "cpu_seconds": SANDBOX_CPU_SECONDS}, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.discard(session_id, worker)
+            return f"Error: the code did not finish within {timeout:.0f} seconds, so the sandbox was restarted and its variables lost"
+        except asyncio.CancelledError:
+            self.discard(session_id, worker)
+            raise
+        except (RuntimeError, ConnectionError) as e:
+            self.discard(session_id, worker)
+            return f"Error: {e}; its variables were lost"
+
+    def discard(self, session_id: str, worker: SandboxWorker) -> None:
+        worker.kill()
+        if self.sessions.get(session_id) is worker:
+            del self.sessions[session_id]
+
+    def release(self, session_id: str) -> None:
+        """Stop the session's worker, if it has one; safe to call from any thread"""
+        worker = self.sessions.get(session_id)
+        if worker is None:
+            return
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.discard, session_id, worker)
+        else:
+            self.discard(session_id, worker)
+
+
+sandbox_pool = SandboxPool()
+
+
+if __name__ == "__main__" and "--worker" in sys.argv:
+    serve()
@@ -1,14 +1,17 @@
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, BrowserContext
 from langchain_community.agent_toolkits import PlayWrightBrowserToolkit
 from dotenv import load_dotenv
 import os
+import time
+import asyncio
 import requests
 from langchain.agents import Tool
 from langchain_community.agent_toolkits import FileManagementToolkit
 from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
-from langchain_experimental.tools import PythonREPLTool
+from langchain_core.tools import StructuredTool
 from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
+from sidekick_sandbox import sandbox_pool, session_dir
 
 
 
@@ -17,12 +20,137 @@ pushover_token = os.getenv("PUSHOVER_TOKEN")
 pushover_user = os.getenv("PUSHOVER_USER")
 pushover_url = "https://api.pushover.net/1/messages.json"
 serper = GoogleSerperAPIWrapper()
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").strip().lower() == "true"
+BROWSER_MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "8"))
+BROWSER_IDLE_SECONDS = int(os.getenv("BROWSER_IDLE_SECONDS", "600"))
+
+
+class SessionBrowser:
+    """
+    The shared browser as one Sidekick's tools see it: a single context of its own, opened on first use.
+    It provides the contexts and new_context the browser tools use, and delegates anything else to the shared Browser.
+    """
+
+    def __init__(self, pool: "BrowserPool"):
+        self.pool = pool
+        self.context: BrowserContext | None = None
+        self.last_used = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self.pool.browser, name)
+
+    @property
+    def contexts(self) -> list[BrowserContext]:
+        self.last_used = time.monotonic()
+        return [self.context] if self.context else []
+
+    async def new_context(self, **kwargs) -> BrowserContext:
+        return self.context or await self.pool.open_context(self)
+
+    async def close(self, **kwargs) -> None:
+        await self.pool.release(self)
+
+
+class BrowserPool:
+    """
+    One headless Chromium per process, shared by every Sidekick. Each session browses in its own
+    BrowserContext, so cookies and pages stay isolated. At most max_contexts are open at once; contexts
+    unused for idle_seconds are closed to make room, and reopened if their session browses again.
+    """
+
+    def __init__(
+        self,
+        max_contexts: int = BROWSER_MAX_CONTEXTS,
+        idle_seconds: int = BROWSER_IDLE_SECONDS,
+        headless: bool = BROWSER_HEADLESS,
+    ):
+        self.max_contexts = max_contexts
+        self.idle_seconds = idle_seconds
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        self.loop = None
+        self.sessions: set[SessionBrowser] = set()
+        self.changed = asyncio.Condition()
+
+    async def start(self) -> None:
+        async with self.changed:
+            if self.browser and self.browser.is_connected():
+                return
+            self.loop = asyncio.get_running_loop()
+            if not self.playwright:
+                self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(headless=self.headless)
+
+    async def session(self) -> SessionBrowser:
+        await self.start()
+        session = SessionBrowser(self)
+        self.sessions.add(session)
+        return session
+
+    def open_count(self) -> int:
+        return sum(1 for session in self.sessions if session.context)
+
+    async def reap(self) -> None:
+        """Close the contexts of sessions that haven't browsed for idle_seconds"""
+        cutoff = time.monotonic() - self.idle_seconds
+        for session in self.sessions:
+            if session.context and session.last_used < cutoff:
+                context, session.context = session.context, None
+                await context.close()
+
+    async def open_context(self, session: SessionBrowser) -> BrowserContext:
+        """
+        Open the session's context once there is room for it. The context is recorded while the lock is
+        held, so the cap counts it straight away, and a second call for the same session reuses it.
+        """
+        async with self.changed:
+            await self.reap()
+            while not session.context and self.open_count() >= self.max_contexts:
+                try:
+                    await asyncio.wait_for(self.changed.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    await self.reap()
+            if not session.context:
+                session.context = await self.browser.new_context()
+            session.last_used = time.monotonic()
+            return session.context
+
+    async def release(self, session: SessionBrowser) -> None:
+        async with self.changed:
+            self.sessions.discard(session)
+            context, session.context = session.context, None
+            if context:
+                await context.close()
+            self.changed.notify_all()
+
+    def release_soon(self, session: SessionBrowser) -> None:
+        """Release a session from any thread, such as Gradio's state cleanup"""
+        try:
+            asyncio.get_running_loop().create_task(self.release(session))
+        except RuntimeError:
+            if self.loop and self.loop.is_running():
+                asyncio.run_coroutine_threadsafe(self.release(session), self.loop)
+
+    async def close(self) -> None:
+        async with self.changed:
+            self.sessions.clear()
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+            self.browser = self.playwright = None
+
+
+browser_pool = BrowserPool()
+
 
 async def playwright_tools():
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False)
-    toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=browser)
-    return toolkit.get_tools(), browser, playwright
+    browser = await browser_pool.session()
+    # The toolkit only accepts a playwright Browser, so its tools are built on the shared one and then pointed at the session
+    toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=browser_pool.browser)
+    tools = [tool.model_copy(update={"async_browser": browser}) for tool in toolkit.get_tools()]
+    return tools, browser
 
 
 def push(text: str):
@@ -36,7 +164,21 @@ def get_file_tools():
     return toolkit.get_tools()
 
 
-async def other_tools():
+def python_tool(session_id: str):
+    async def run_python(code: str) -> str:
+        return await sandbox_pool.run(session_id, code)
+
+    folder = os.path.basename(session_dir(sandbox_pool.cwd, session_id))
+    return StructuredTool.from_function(
+        coroutine=run_python,
+        name="Python_REPL",
+        description="A Python shell. Use this to execute python commands. Input should be a valid python command. "
+        "If you want to see the output of a value, you should print it out with `print(...)`. "
+        f"Variables persist between calls, and files are read and written in the folder {folder} of the sandbox directory.",
+    )
+
+
+async def other_tools(session_id: str):
     push_tool = Tool(name="send_push_notification", func=push, description="Use this tool when you want to send a push notification")
     file_tools = get_file_tools()
 
@@ -49,7 +191,7 @@ async def other_tools():
     wikipedia = WikipediaAPIWrapper()
     wiki_tool = WikipediaQueryRun(api_wrapper=wikipedia)
 
-    python_repl = PythonREPLTool()
+    python_repl = python_tool(session_id)
     
     return file_tools + [push_tool, tool_search, python_repl,  wiki_tool]
 
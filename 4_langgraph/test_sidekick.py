@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("SIDEKICK_DB", os.path.join(tempfile.mkdtemp(prefix="test_sidekick_"), "memory.db"))
+# sidekick_tools builds its search tool on import; these tests never call it
+for key in ("OPENAI_API_KEY", "SERPER_API_KEY"):
+    os.environ.setdefault(key, "test")
+
+import asyncio
+import time
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from sidekick import Sidekick, EvaluatorOutput
+
+PASS = EvaluatorOutput(feedback="Good", success_criteria_met=True, user_input_needed=False)
+
+
+class SlowLLM:
+    def __init__(self, reply, seconds=0.1):
+        self.reply = reply
+        self.seconds = seconds
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.seconds)
+        return self.reply
+
+
+async def sidekick_with(worker, evaluator) -> Sidekick:
+    sidekick = Sidekick()
+    sidekick.tools = []
+    sidekick.worker_llm_with_tools = worker
+    sidekick.evaluator_llm_with_output = evaluator
+    await sidekick.build_graph()
+    return sidekick
+
+
+class TestSidekick(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_sessions_do_not_block_each_other(self):
+        async def session():
+            sidekick = await sidekick_with(SlowLLM(AIMessage(content="Done")), SlowLLM(PASS))
+            return [history async for history in sidekick.run_superstep("Hello", "", [])][-1]
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(session() for _ in range(10)))
+        # Ten sessions of a 0.1s worker call and a 0.1s evaluator call each, overlapping
+        self.assertLess(time.monotonic() - started, 1.0)
+        for history in results:
+            self.assertEqual(history[1], {"role": "assistant", "content": "Done"})
+            self.assertEqual(history[2]["content"], "Evaluator Feedback on this answer: Good")
+
+    async def test_worker_reply_streams_before_the_evaluation(self):
+        worker = GenericFakeChatModel(messages=iter([AIMessage(content="Paris is the capital")]))
+        sidekick = await sidekick_with(worker, SlowLLM(PASS))
+        updates = [history async for history in sidekick.run_superstep("Capital of France?", "", [])]
+        partial = [history[-1]["content"] for history in updates[:-1]]
+        self.assertGreater(len(partial), 1)
+        self.assertEqual(partial[-1], "Paris is the capital")
+        self.assertTrue(all("Paris is the capital".startswith(reply) for reply in partial))
+        self.assertEqual(len(updates[-1]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
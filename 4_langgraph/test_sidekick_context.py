@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from sidekick_context import ContextWindow, OLD_TOOL_OUTPUT_TOKENS
+
+OUTPUT = "lorem ipsum dolor sit amet " * 400
+
+
+def session(rounds: int, output: str = OUTPUT) -> list:
+    messages = [HumanMessage(content="Research the transistor", id="h0")]
+    for turn in range(1, rounds + 1):
+        call = {"name": "search", "args": {"query": f"part {turn}"}, "id": f"call{turn}"}
+        messages.append(AIMessage(content="", tool_calls=[call], id=f"a{turn}"))
+        messages.append(ToolMessage(content=output, tool_call_id=f"call{turn}", id=f"t{turn}"))
+        messages.append(AIMessage(content=f"Answer {turn}", id=f"r{turn}"))
+    return messages
+
+
+class TestWorkerWindow(unittest.TestCase):
+    def test_long_sessions_stay_within_budget(self):
+        window = ContextWindow(worker_tokens=3000)
+        sent = window.worker_messages("Be helpful", session(30))
+        self.assertLessEqual(window.usage[-1]["prompt_tokens"], 3000)
+        self.assertIsInstance(sent[0], SystemMessage)
+        self.assertEqual(sent[1].content, "Research the transistor")
+        self.assertRegex(sent[2].content, r"\[\d+ earlier turns omitted to save space\]")
+        self.assertEqual(sent[-1].content, "Answer 30")
+
+    def test_tool_results_stay_with_their_calls(self):
+        window = ContextWindow(worker_tokens=3000)
+        sent = window.worker_messages("Be helpful", session(30))
+        for index, message in enumerate(sent):
+            if isinstance(message, ToolMessage):
+                self.assertEqual(sent[index - 1].tool_calls[0]["id"], message.tool_call_id)
+
+    def test_only_older_tool_outputs_are_shortened(self):
+        window = ContextWindow(worker_tokens=100_000)
+        messages = session(3)[:-1]
+        sent = window.worker_messages("Be helpful", messages)
+        tool_outputs = [message for message in sent if isinstance(message, ToolMessage)]
+        self.assertEqual(tool_outputs[-1].content, OUTPUT)
+        for message in tool_outputs[:-1]:
+            self.assertTrue(message.content.endswith("...[truncated]"))
+            self.assertLessEqual(window.message_tokens(message), OLD_TOOL_OUTPUT_TOKENS + 20)
+
+    def test_short_sessions_are_sent_whole(self):
+        window = ContextWindow()
+        messages = session(3, output="A short result")
+        self.assertEqual(window.worker_messages("Be helpful", messages)[1:], messages)
+
+
+class TestTranscript(unittest.TestCase):
+    def test_formats_only_new_messages(self):
+        window = ContextWindow()
+        messages = session(5)
+        window.transcript(messages)
+        messages = messages + [HumanMessage(content="And the vacuum tube?", id="h1")]
+        with mock.patch.object(window, "format_message", wraps=window.format_message) as format_message:
+            transcript = window.transcript(messages)
+        format_message.assert_called_once()
+        self.assertEqual(transcript, ContextWindow().transcript(messages))
+        self.assertTrue(transcript.endswith("User: And the vacuum tube?\n"))
+
+    def test_starts_again_when_the_history_changes(self):
+        window = ContextWindow()
+        window.transcript(session(5))
+        other = [HumanMessage(content="Something else", id="x0")]
+        self.assertEqual(window.transcript(other), "Conversation history:\n\nUser: Something else\n")
+
+    def test_keeps_the_first_request_and_the_latest_lines_within_budget(self):
+        window = ContextWindow(transcript_tokens=60)
+        transcript = window.transcript(session(20))
+        self.assertIn("User: Research the transistor\n[earlier conversation omitted]\n", transcript)
+        self.assertTrue(transcript.endswith("Assistant: Answer 20\n"))
+        self.assertNotIn("Answer 1\n", transcript)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool, Tool
+import sidekick_executor
+from sidekick_executor import ToolExecutor
+
+
+def blocking_tool(name, seconds, output="done"):
+    def run(text: str) -> str:
+        time.sleep(seconds)
+        return output
+
+    return Tool(name=name, func=run, description=name)
+
+
+def async_tool(name, seconds, output="done"):
+    async def run(text: str) -> str:
+        await asyncio.sleep(seconds)
+        return output
+
+    return StructuredTool.from_function(coroutine=run, name=name, description=name)
+
+
+def failing_tool(name):
+    def run(text: str) -> str:
+        raise ValueError("bad input")
+
+    return Tool(name=name, func=run, description=name)
+
+
+def calls(*names):
+    return {"messages": [AIMessage(content="", tool_calls=[{"name": name, "args": {"text": "x"}, "id": f"call{index}"} for index, name in enumerate(names)])]}
+
+
+class TestToolExecutor(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_blocking_and_async_calls_concurrently(self):
+        executor = ToolExecutor([blocking_tool("slow_blocking", 0.2), async_tool("slow_async", 0.2)])
+        started = time.monotonic()
+        result = await executor(calls("slow_blocking", "slow_async", "slow_blocking"))
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertEqual([message.tool_call_id for message in result["messages"]], ["call0", "call1", "call2"])
+        self.assertEqual({message.content for message in result["messages"]}, {"done"})
+
+    async def test_blocking_tools_leave_the_event_loop_free(self):
+        executor = ToolExecutor([blocking_tool("slow_blocking", 0.2)])
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await executor(calls("slow_blocking"))
+        ticker.cancel()
+        self.assertGreater(ticks, 10)
+
+    async def test_timeouts_and_failures_come_back_as_errors(self):
+        executor = ToolExecutor([async_tool("hangs", 5), failing_tool("fails")])
+        with mock.patch.dict(sidekick_executor.TOOL_TIMEOUTS, {"hangs": 0.05}), mock.patch("builtins.print"):
+            result = await executor(calls("hangs", "fails", "missing"))
+        hangs, fails, missing = result["messages"]
+        self.assertEqual(hangs.status, "error")
+        self.assertIn("did not finish within", hangs.content)
+        self.assertIn("bad input", fails.content)
+        self.assertEqual(missing.content, "Error: there is no tool named missing")
+        metrics = executor.metrics()
+        self.assertEqual(metrics["hangs"]["timeout"], 1)
+        self.assertEqual(metrics["fails"]["error"], 1)
+
+    async def test_caps_long_outputs(self):
+        executor = ToolExecutor([async_tool("chatty", 0, "x" * 150)], max_output_chars=100)
+        (message,) = (await executor(calls("chatty")))["messages"]
+        self.assertEqual(message.content, "x" * 100 + "\n...[50 more characters omitted]")
+
+    def test_is_async(self):
+        self.assertTrue(sidekick_executor.is_async(async_tool("a", 0)))
+        self.assertFalse(sidekick_executor.is_async(blocking_tool("b", 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
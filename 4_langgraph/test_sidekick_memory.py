@@ -0,0 +1,112 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# sidekick_tools builds its search tool on import; these tests never call it
+for key in ("OPENAI_API_KEY", "SERPER_API_KEY"):
+    os.environ.setdefault(key, "test")
+
+import aiosqlite
+from langchain_core.messages import AIMessage
+import sidekick_memory
+from sidekick import Sidekick, EvaluatorOutput
+from sidekick_memory import PruningSqliteSaver, PRUNE_EVERY_N_CHECKPOINTS
+
+
+class FakeLLM:
+    def __init__(self, reply):
+        self.reply = reply
+
+    async def ainvoke(self, messages):
+        # A fresh message each time, as add_messages gives the returned message an id
+        return self.reply.model_copy()
+
+
+class TestPruningSqliteSaver(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(prefix="test_sidekick_"), "memory.db")
+        self.connections = []
+
+    async def asyncTearDown(self):
+        for conn in self.connections:
+            await conn.close()
+
+    async def saver(self, keep: int) -> PruningSqliteSaver:
+        conn = await aiosqlite.connect(self.path)
+        self.connections.append(conn)
+        saver = PruningSqliteSaver(conn, keep=keep)
+        await saver.setup()
+        return saver
+
+    async def sidekick(self, saver, sidekick_id, reply="Done") -> Sidekick:
+        sidekick = Sidekick(sidekick_id)
+        sidekick.memory = saver
+        sidekick.tools = []
+        sidekick.worker_llm_with_tools = FakeLLM(AIMessage(content=reply))
+        evaluation = EvaluatorOutput(feedback="Good", success_criteria_met=True, user_input_needed=False)
+        sidekick.evaluator_llm_with_output = FakeLLM(evaluation)
+        await sidekick.build_graph()
+        return sidekick
+
+    async def count(self, saver, table, thread_id):
+        async with saver.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)) as cursor:
+            return (await cursor.fetchone())[0]
+
+    async def test_keeps_only_the_newest_checkpoints_of_each_thread(self):
+        saver = await self.saver(keep=5)
+        sidekick = await self.sidekick(saver, "long")
+        other = await self.sidekick(saver, "short")
+        for turn in range(20):
+            async for _ in sidekick.run_superstep(f"Question {turn}", "", []):
+                pass
+        async for _ in other.run_superstep("Only question", "", []):
+            pass
+        self.assertLess(await self.count(saver, "checkpoints", "long"), 5 + PRUNE_EVERY_N_CHECKPOINTS)
+        self.assertEqual(await self.count(saver, "checkpoints", "short"), 4)
+        # The latest state is intact after pruning
+        self.assertEqual(len(await sidekick.history()), 60)
+
+    async def test_resumes_a_session_by_id_after_a_restart(self):
+        saver = await self.saver(keep=5)
+        first = await self.sidekick(saver, "resume-me", reply="Paris")
+        async for _ in first.run_superstep("Capital of France?", "", []):
+            pass
+        restarted = await self.sidekick(await self.saver(keep=5), "resume-me")
+        self.assertEqual(
+            await restarted.history(),
+            [{"role": "user", "content": "Capital of France?"}, {"role": "assistant", "content": "Paris"}, {"role": "assistant", "content": "Evaluator Feedback on this answer: Good"}],
+        )
+
+    async def test_compact_prunes_every_thread(self):
+        saver = await self.saver(keep=2)
+        sidekick = await self.sidekick(saver, "compact-me")
+        for turn in range(3):
+            async for _ in sidekick.run_superstep(f"Question {turn}", "", []):
+                pass
+        await saver.compact()
+        self.assertEqual(await self.count(saver, "checkpoints", "compact-me"), 2)
+
+    async def test_memory_checkpointer_when_configured(self):
+        with mock.patch.object(sidekick_memory, "SIDEKICK_CHECKPOINTER", "memory"), mock.patch.object(
+            sidekick_memory, "checkpointer", None
+        ):
+            self.assertIsInstance(await sidekick_memory.get_checkpointer(), sidekick_memory.MemorySaver)
+
+    async def test_sessions_starting_at_once_share_one_connection(self):
+        path = os.path.join(tempfile.mkdtemp(prefix="test_sidekick_"), "checkpoints.db")
+        connect = mock.Mock(wraps=aiosqlite.connect)
+        with mock.patch.object(sidekick_memory, "SIDEKICK_CHECKPOINTER", "sqlite"), mock.patch.object(
+            sidekick_memory, "SIDEKICK_DB", path
+        ), mock.patch.object(sidekick_memory, "checkpointer", None), mock.patch.object(
+            sidekick_memory, "checkpointer_lock", asyncio.Lock()
+        ), mock.patch.object(sidekick_memory.aiosqlite, "connect", connect):
+            savers = await asyncio.gather(*(sidekick_memory.get_checkpointer() for _ in range(5)))
+        self.assertEqual(connect.call_count, 1)
+        self.assertTrue(all(saver is savers[0] for saver in savers))
+        await savers[0].conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
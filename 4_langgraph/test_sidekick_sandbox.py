@@ -0,0 +1,79 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+import sidekick_sandbox
+from sidekick_sandbox import SandboxPool, sanitize, session_dir
+
+
+class TestSandboxPool(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.root = tempfile.mkdtemp(prefix="test_sandbox_")
+        self.pool = SandboxPool(spares=1, max_workers=2, cwd=self.root)
+
+    async def asyncTearDown(self):
+        # Let any spares being started in the background finish before stopping everything
+        await asyncio.sleep(0)
+        async with self.pool.lock:
+            pass
+        for worker in list(self.pool.sessions.values()) + self.pool.spares:
+            worker.kill()
+            await worker.process.wait()
+
+    async def test_sessions_keep_their_variables_in_their_own_directories(self):
+        await self.pool.run("a", "x = 1\nopen('mine.txt', 'w').write('a')")
+        await self.pool.run("b", "x = 2")
+        self.assertEqual(await self.pool.run("a", "```python\nprint(x)\n```"), "1\n")
+        self.assertEqual(await self.pool.run("b", "import os; print(os.getcwd())"), session_dir(self.root, "b") + "\n")
+        self.assertTrue(os.path.exists(os.path.join(self.root, "a", "mine.txt")))
+        self.assertEqual(session_dir(self.root, "../../etc"), os.path.join(self.root, "______etc"))
+
+    async def test_workers_do_not_see_the_apps_secrets(self):
+        with mock.patch.dict(os.environ, {"OPENAI_API_KEY": "secret"}):
+            pool = SandboxPool(spares=0, cwd=self.root)
+            output = await pool.run("a", "import os; print(os.environ.get('OPENAI_API_KEY'), os.environ['HOME'])")
+            worker = pool.sessions["a"]
+            pool.discard("a", worker)
+            await worker.process.wait()
+        self.assertEqual(output, f"None {self.root}\n")
+
+    async def test_a_worker_survives_many_calls_under_its_cpu_limit(self):
+        # Each call used to lower the hard CPU limit, which a non-root worker then failed to raise
+        for i in range(5):
+            self.assertEqual(await self.pool.run("a", f"print({i})"), f"{i}\n")
+        limits = await self.pool.run("a", "import resource; print(resource.getrlimit(resource.RLIMIT_CPU)[1])")
+        self.assertEqual(limits, f"{sidekick_sandbox.SANDBOX_WORKER_CPU_SECONDS}\n")
+
+    async def test_runaway_code_restarts_the_sandbox(self):
+        await self.pool.run("a", "x = 1")
+        result = await self.pool.run("a", "while True: pass", timeout=0.5)
+        self.assertIn("did not finish within", result)
+        self.assertIn("NameError", await self.pool.run("a", "print(x)"))
+
+    async def test_calls_from_one_session_run_one_at_a_time(self):
+        results = await asyncio.gather(*(self.pool.run("a", f"import time; time.sleep(0.05); print({i})") for i in range(3)))
+        self.assertEqual(results, ["0\n", "1\n", "2\n"])
+
+    async def test_the_least_recently_used_session_is_evicted(self):
+        for session in ("a", "b", "c"):
+            await self.pool.run(session, "x = 1")
+        self.assertEqual(set(self.pool.sessions), {"b", "c"})
+
+
+class TestWithoutResourceLimits(unittest.TestCase):
+    def test_workers_fall_back_to_the_timeout_alone(self):
+        with mock.patch.object(sidekick_sandbox, "resource", None), mock.patch("builtins.print") as printed:
+            sidekick_sandbox.limit_resources()
+            sidekick_sandbox.allow_cpu(5)
+        self.assertIn("limits are off", printed.call_args.args[0])
+
+
+class TestSanitize(unittest.TestCase):
+    def test_strips_code_fences(self):
+        self.assertEqual(sanitize("```python\nprint(1)\n```"), "print(1)")
+        self.assertEqual(sanitize("print(1)"), "print(1)")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import unittest
+
+# sidekick_tools builds its search tool on import; these tests never call it
+os.environ.setdefault("SERPER_API_KEY", "test")
+
+import asyncio
+from langchain_community.tools.playwright.utils import aget_current_page
+from sidekick_tools import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+        self.closed = False
+
+    async def new_page(self):
+        page = object()
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+        self.browser.open -= 1
+
+
+class FakeBrowser:
+    """Counts the contexts open at once; opening one takes a moment, as a real browser's does"""
+
+    def __init__(self):
+        self.open = 0
+        self.most_open = 0
+        self.opened = 0
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self):
+        await asyncio.sleep(0.01)
+        self.open += 1
+        self.opened += 1
+        self.most_open = max(self.most_open, self.open)
+        return FakeContext(self)
+
+
+class TestBrowserPool(unittest.IsolatedAsyncioTestCase):
+    def pool(self, max_contexts):
+        pool = BrowserPool(max_contexts=max_contexts)
+        pool.browser = FakeBrowser()
+        return pool
+
+    async def test_concurrent_sessions_never_exceed_the_cap(self):
+        pool = self.pool(max_contexts=2)
+        sessions = [await pool.session() for _ in range(5)]
+
+        async def browse(session):
+            await aget_current_page(session)
+            await asyncio.sleep(0.02)
+            await session.close()
+
+        await asyncio.gather(*(browse(session) for session in sessions))
+        self.assertEqual(pool.browser.opened, 5)
+        self.assertEqual(pool.browser.most_open, 2)
+        self.assertEqual(pool.browser.open, 0)
+
+    async def test_repeat_calls_from_one_session_share_its_context(self):
+        pool = self.pool(max_contexts=2)
+        session = await pool.session()
+        contexts = await asyncio.gather(*(session.new_context() for _ in range(3)))
+        self.assertEqual(len({id(context) for context in contexts}), 1)
+        self.assertEqual(pool.browser.opened, 1)
+        self.assertEqual(session.contexts, [contexts[0]])
+
+    async def test_idle_contexts_are_closed_to_make_room(self):
+        pool = self.pool(max_contexts=1)
+        pool.idle_seconds = 0
+        idle, busy = await pool.session(), await pool.session()
+        first = await idle.new_context()
+        await busy.new_context()
+        self.assertTrue(first.closed)
+        self.assertEqual(idle.contexts, [])
+        # The idle session gets a fresh context if it browses again
+        await aget_current_page(idle)
+        self.assertEqual(pool.browser.opened, 3)
+
+    async def test_delegates_everything_else_to_the_shared_browser(self):
+        pool = self.pool(max_contexts=1)
+        session = await pool.session()
+        self.assertTrue(session.is_connected())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,12 @@
 from autogen_core import MessageContext, RoutedAgent, message_handler
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.messages import TextMessage
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from model_clients import provider
 import messages
+from generated_agents import registry
 from autogen_core import TRACE_LOGGER_NAME
-import importlib
 import logging
-from autogen_core import AgentId
+from autogen_core import AgentId, TopicId
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
@@ -17,6 +17,9 @@ logger.addHandler(logging.StreamHandler())
 logger.setLevel(logging.DEBUG)
 
 
+MAX_GENERATION_ATTEMPTS = 3
+
+
 class Creator(RoutedAgent):
 
     # Change this system message to reflect the unique characteristics of this agent
@@ -36,7 +39,7 @@ class Creator(RoutedAgent):
 
     def __init__(self, name) -> None:
         super().__init__(name)
-        model_client = OpenAIChatCompletionClient(model="gpt-4o-mini", temperature=1.0)
+        model_client = provider.get_client(name, model="gpt-4o-mini", temperature=1.0)
         self._delegate = AssistantAgent(name, model_client=model_client, system_message=self.system_message)
 
     def get_user_prompt(self):
@@ -44,22 +47,36 @@ class Creator(RoutedAgent):
             Respond only with the python code, no other text, and no markdown code blocks.\n\n\
             Be creative about taking the agent in a new direction, but don't change method signatures.\n\n\
             Here is the template:\n\n"
-        with open("agent.py", "r", encoding="utf-8") as f:
-            template = f.read()
-        return prompt + template   
-        
+        return prompt + registry.get_template()
+
+    async def generate(self, agent_name: str, ctx: MessageContext) -> str:
+        prompt = self.get_user_prompt()
+        for attempt in range(1, MAX_GENERATION_ATTEMPTS + 1):
+            text_message = TextMessage(content=prompt, source="user")
+            response = await self._delegate.on_messages([text_message], ctx.cancellation_token)
+            try:
+                return registry.store(agent_name, response.chat_message.content)
+            except ValueError as e:
+                print(f"** Creator's code for agent {agent_name} was rejected on attempt {attempt}: {e}")
+                if attempt == MAX_GENERATION_ATTEMPTS:
+                    raise
+                prompt = self.get_user_prompt() + f"\n\nYour previous attempt was rejected: {e}"
 
     @message_handler
     async def handle_my_message_type(self, message: messages.Message, ctx: MessageContext) -> messages.Message:
         filename = message.content
         agent_name = filename.split(".")[0]
-        text_message = TextMessage(content=self.get_user_prompt(), source="user")
-        response = await self._delegate.on_messages([text_message], ctx.cancellation_token)
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(response.chat_message.content)
-        print(f"** Creator has created python code for agent {agent_name} - about to register with Runtime")
-        module = importlib.import_module(agent_name)
-        await module.Agent.register(self.runtime, agent_name, lambda: module.Agent(agent_name))
+        code = registry.lookup(agent_name)
+        if code:
+            print(f"** Creator is reusing the python code it created before for agent {agent_name}")
+        else:
+            code = await self.generate(agent_name, ctx)
+            print(f"** Creator has created python code for agent {agent_name} - about to register with Runtime")
+        module = registry.load(agent_name, code)
+        agent_class = messages.tracked(module.Agent)
+        await agent_class.register(self.runtime, agent_name, lambda: agent_class(agent_name))
+        messages.recipients.register(agent_name)
+        await self.publish_message(messages.Registered(agent_name), TopicId("agents", "default"))
         logger.info(f"** Agent {agent_name} is live")
         result = await self.send_message(messages.Message(content="Give me an idea"), AgentId(agent_name, "default"))
         return messages.Message(content=result.content)
\ No newline at end of file
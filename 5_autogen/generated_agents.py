@@ -0,0 +1,152 @@
+import ast
+import hashlib
+from contextlib import contextmanager
+import importlib
+import json
+import os
+import re
+import sys
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the launcher's workers may then lose each other's index entries, and regenerate those agents next run
+    fcntl = None
+
+TEMPLATE_FILE = "agent.py"
+GENERATED_DIR = "generated"
+INDEX_FILE = os.path.join(GENERATED_DIR, "index.json")
+REUSE_GENERATED_AGENTS = os.getenv("REUSE_GENERATED_AGENTS", "true").strip().lower() == "true"
+
+
+def content_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def strip_code_fences(code: str) -> str:
+    """Models sometimes wrap the code in a markdown block despite being asked not to"""
+    match = re.search(r"```(?:python)?\s*\n(.*?)```", code, re.DOTALL)
+    return (match.group(1) if match else code).strip() + "\n"
+
+
+def validate(code: str) -> None:
+    """Raise ValueError unless the code parses and defines class Agent(RoutedAgent) with an __init__ taking a name"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        raise ValueError(f"The code is not valid Python: {e}") from e
+    agent = next((node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "Agent"), None)
+    if agent is None:
+        raise ValueError("The code must define a class named Agent")
+    bases = [base.id if isinstance(base, ast.Name) else getattr(base, "attr", None) for base in agent.bases]
+    if "RoutedAgent" not in bases:
+        raise ValueError("The Agent class must inherit from RoutedAgent")
+    init = next((node for node in agent.body if isinstance(node, ast.FunctionDef) and node.name == "__init__"), None)
+    if init is None or len(init.args.args) < 2:
+        raise ValueError("The Agent class must have an __init__ method that takes a name parameter")
+
+
+def read_index(index_file: str) -> dict:
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@contextmanager
+def locked(path: str):
+    """Hold an exclusive lock on path for the duration, so processes sharing a file take turns"""
+    with open(path, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class GeneratedAgentRegistry:
+    """
+    Remembers the code the Creator has generated, so agents survive from one run of world.py to the next.
+    The template is read from disk only when it changes. Generated code is validated once, stored under
+    its content hash in the generated directory, and recorded in an index against the agent's name along
+    with the hash of the template it was generated from, so editing the template regenerates the agents.
+    The agent's module file is only rewritten when its code changes, so Python reuses the compiled bytecode.
+    Several processes can share the index: each new entry is merged into the index on disk under a lock.
+    """
+
+    def __init__(self, template_file: str = TEMPLATE_FILE, index_file: str = INDEX_FILE):
+        self.template_file = template_file
+        self.index_file = index_file
+        self.template = None
+        self.template_hash = None
+        self.template_mtime = None
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        self.index = read_index(index_file)
+
+    def get_template(self) -> str:
+        mtime = os.path.getmtime(self.template_file)
+        if mtime != self.template_mtime:
+            with open(self.template_file, "r", encoding="utf-8") as f:
+                self.template = f.read()
+            self.template_hash = content_hash(self.template)
+            self.template_mtime = mtime
+        return self.template
+
+    def get_template_hash(self) -> str:
+        self.get_template()
+        return self.template_hash
+
+    def code_path(self, digest: str) -> str:
+        return os.path.join(os.path.dirname(self.index_file), f"{digest}.py")
+
+    def lookup(self, agent_name: str) -> str | None:
+        """The stored code for this agent, if it was generated from the current template and is still on disk"""
+        entry = self.index.get(agent_name)
+        # Entries written before the template hash was recorded are plain digests, and are regenerated
+        if not REUSE_GENERATED_AGENTS or not isinstance(entry, dict) or entry.get("template") != self.get_template_hash():
+            return None
+        digest = entry["code"]
+        if not os.path.exists(self.code_path(digest)):
+            return None
+        with open(self.code_path(digest), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def store(self, agent_name: str, code: str) -> str:
+        """Validate and store newly generated code for the agent, returning the cleaned code"""
+        code = strip_code_fences(code)
+        validate(code)
+        digest = content_hash(code)
+        if not os.path.exists(self.code_path(digest)):
+            with open(self.code_path(digest), "w", encoding="utf-8") as f:
+                f.write(code)
+        entry = {"code": digest, "template": self.get_template_hash()}
+        with locked(self.index_file + ".lock"):
+            self.index = read_index(self.index_file)
+            self.index[agent_name] = entry
+            temporary = f"{self.index_file}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(self.index, f, indent=2)
+            os.replace(temporary, self.index_file)
+        return code
+
+    def load(self, agent_name: str, code: str):
+        """Import the agent's module, writing its file only if the code has changed"""
+        filename = f"{agent_name}.py"
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                unchanged = f.read() == code
+        except FileNotFoundError:
+            unchanged = False
+        if not unchanged:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(code)
+            importlib.invalidate_caches()
+        if agent_name in sys.modules:
+            return sys.modules[agent_name] if unchanged else importlib.reload(sys.modules[agent_name])
+        return importlib.import_module(agent_name)
+
+
+registry = GeneratedAgentRegistry()
@@ -0,0 +1,262 @@
+from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntimeHost, GrpcWorkerAgentRuntime
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from autogen_core import AgentId, MessageContext, RoutedAgent, TopicId, TypeSubscription, message_handler
+from autogen_core import try_get_known_serializers_for_type
+from autogen_core.models import CreateResult, RequestUsage
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.messages import TextMessage
+import multiprocessing
+import statistics
+import argparse
+import sys
+import messages
+from model_clients import provider
+import asyncio
+import random
+import time
+import uuid
+
+HOST_ADDRESS = "localhost:50051"
+HOW_MANY_AGENTS = 20
+WORKERS = 4
+STARTUP_SECONDS = 60
+
+
+class WorkerRuntime(GrpcWorkerAgentRuntime):
+    """
+    The host matches each response to its request by the target worker and the request id, but every runtime
+    numbers its requests from 1, so requests to one worker from two others get mixed up; use unique ids instead
+    """
+
+    async def _get_new_request_id(self) -> str:
+        return uuid.uuid4().hex
+
+
+class Directory(RoutedAgent):
+    """One per worker: hears about agents registered on every worker, so any of them can be chosen as a recipient"""
+
+    @message_handler
+    async def on_registered(self, message: messages.Registered, ctx: MessageContext) -> None:
+        messages.recipients.register(message.name)
+
+
+class MockModelClient(ReplayChatCompletionClient):
+    """Stands in for the OpenAI client in benchmarks: waits like a model call, then does some CPU work like handling a response"""
+
+    def __init__(self, latency: float, cpu_seconds: float):
+        super().__init__(["mock"])
+        self.latency = latency
+        self.cpu_seconds = cpu_seconds
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        await asyncio.sleep(self.latency)
+        deadline = time.process_time() + self.cpu_seconds
+        while time.process_time() < deadline:
+            pass
+        self._cur_usage = RequestUsage(prompt_tokens=100, completion_tokens=100)
+        return CreateResult(finish_reason="stop", content="A mock business idea", usage=self._cur_usage, cached=False)
+
+
+class BenchAgent(RoutedAgent):
+    """Behaves like the agent template, bouncing ideas to peers, but with a mock model"""
+
+    CHANCES_THAT_I_BOUNCE_IDEA_OFF_ANOTHER = 0.5
+
+    def __init__(self, name) -> None:
+        super().__init__(name)
+        model_client = provider.get_client(name, model="mock", temperature=0.7)
+        self._delegate = AssistantAgent(name, model_client=model_client, system_message="You are an entrepreneur.")
+
+    @message_handler
+    async def handle_message(self, message: messages.Message, ctx: MessageContext) -> messages.Message:
+        text_message = TextMessage(content=message.content, source="user")
+        response = await self._delegate.on_messages([text_message], ctx.cancellation_token)
+        idea = response.chat_message.content
+        if message.can_bounce() and random.random() < self.CHANCES_THAT_I_BOUNCE_IDEA_OFF_ANOTHER:
+            recipient = messages.find_recipient(self.id.type)
+            response = await self.send_message(messages.Message(content=f"Please refine: {idea}"), recipient)
+            idea = response.content
+        return messages.Message(content=idea)
+
+
+def assigned(index: int, workers: int, how_many: int) -> list[str]:
+    """The agents that this worker hosts: every workers-th agent, starting at its own index"""
+    return [f"agent{i}" for i in range(index + 1, how_many + 1, workers)]
+
+
+def worker_of(agent: int, workers: int) -> int:
+    """The index of the worker that assigned() gives agent number agent to"""
+    return (agent - 1) % workers
+
+
+async def serve(index: int, workers: int, how_many: int, bench: dict | None, events, subscribed, stop) -> None:
+    runtime = WorkerRuntime(host_address=HOST_ADDRESS)
+    await runtime.start()
+    await Directory.register(runtime, f"directory{index}", lambda: Directory(f"directory{index}"))
+    await runtime.add_subscription(TypeSubscription("agents", f"directory{index}"))
+    # A Registered message published before another worker's Directory subscribes never reaches it
+    await asyncio.to_thread(subscribed.wait, STARTUP_SECONDS)
+    if bench:
+        provider.factory = lambda model: MockModelClient(**bench)
+        agent_class = messages.tracked(BenchAgent)
+        for name in assigned(index, workers, how_many):
+            await agent_class.register(runtime, name, lambda name=name: agent_class(name))
+            messages.recipients.register(name)
+            await runtime.publish_message(messages.Registered(name), TopicId("agents", "default"))
+    else:
+        from creator import Creator
+
+        creator_class = messages.tracked(Creator)
+        await creator_class.register(runtime, f"Creator{index}", lambda: creator_class(f"Creator{index}"))
+    events.put(("ready", index, None))
+    await asyncio.to_thread(stop.wait)
+    local = set(assigned(index, workers, how_many))
+    stats = {name: values for name, values in messages.recipients.metrics().items() if name in local}
+    model_usage = {name: values for name, values in provider.metrics().items() if name in local}
+    known = sum(1 for values in messages.recipients.metrics().values() if values["weight"] > 0)
+    events.put(("stats", index, {"agents": stats, "known": known, "model_calls": messages.model_calls.metrics(), "model_usage": model_usage}))
+    await runtime.stop()
+
+
+def run_worker(index: int, workers: int, how_many: int, bench: dict | None, events, subscribed, stop) -> None:
+    asyncio.run(serve(index, workers, how_many, bench, events, subscribed, stop))
+
+
+async def send_and_time(runtime, message: messages.Message, recipient: AgentId, latencies: list[float]) -> str | None:
+    started = time.monotonic()
+    try:
+        result = await runtime.send_message(message, recipient)
+        latencies.append(time.monotonic() - started)
+        return result.content
+    except Exception as e:
+        print(f"Message to {recipient.type} failed: {e}")
+        return None
+
+
+async def launch(workers: int = WORKERS, how_many: int = HOW_MANY_AGENTS, bench: dict | None = None, requests: int = 0) -> dict:
+    """
+    Start the host and one worker runtime per process, spread the agents across them, then drive them: in a
+    real run, ask each worker's Creator to create its share of the agents, as world.py does; in a benchmark,
+    send requests messages to the mock agents. Returns the throughput, latency, and per-worker counts and
+    latencies of the requests sent to the agents (or Creator) each worker hosts.
+    """
+    host = GrpcWorkerAgentRuntimeHost(address=HOST_ADDRESS)
+    host.start()
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    subscribed = context.Barrier(workers)
+    stop = context.Event()
+    processes = [
+        context.Process(target=run_worker, args=(index, workers, how_many, bench, events, subscribed, stop), daemon=True)
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in range(workers):
+        await asyncio.to_thread(events.get)
+    driver = WorkerRuntime(host_address=HOST_ADDRESS)
+    driver.add_message_serializer(try_get_known_serializers_for_type(messages.Message))
+    await driver.start()
+
+    latencies = {index: [] for index in range(workers)}
+    started = time.monotonic()
+    if bench:
+        await asyncio.gather(*(
+            send_and_time(
+                driver,
+                messages.Message(content="Give me an idea"),
+                AgentId(f"agent{i % how_many + 1}", "default"),
+                latencies[worker_of(i % how_many + 1, workers)],
+            )
+            for i in range(requests)
+        ))
+    else:
+        async def create(i: int) -> None:
+            creator = AgentId(f"Creator{worker_of(i, workers)}", "default")
+            idea = await send_and_time(driver, messages.Message(content=f"agent{i}.py"), creator, latencies[worker_of(i, workers)])
+            if idea is not None:
+                with open(f"idea{i}.md", "w") as f:
+                    f.write(idea)
+
+        await asyncio.gather(*(create(i) for i in range(1, how_many + 1)))
+    elapsed = time.monotonic() - started
+
+    stop.set()
+    per_worker = {}
+    for _ in range(workers):
+        kind, index, worker_stats = await asyncio.to_thread(events.get)
+        stats = worker_stats["agents"]
+        per_worker[index] = {
+            "agents": len(stats),
+            # The agents on every worker that this one can bounce ideas to
+            "recipients": worker_stats["known"],
+            "messages": sum(values["received"] for values in stats.values()),
+            "busy_seconds": round(sum(values["seconds"] for values in stats.values()), 2),
+            "model_calls": worker_stats["model_calls"],
+            "tokens": sum(values["prompt_tokens"] + values["completion_tokens"] for values in worker_stats["model_usage"].values()),
+            "p50_latency": round(statistics.median(latencies[index]), 3) if latencies[index] else None,
+            "max_latency": round(max(latencies[index]), 3) if latencies[index] else None,
+        }
+    for process in processes:
+        await asyncio.to_thread(process.join, 10)
+    try:
+        await driver.stop()
+        await host.stop()
+    except Exception as e:
+        print(e)
+
+    handled = sum(worker["messages"] for worker in per_worker.values())
+    everything = [latency for worker_latencies in latencies.values() for latency in worker_latencies]
+    return {
+        "workers": workers,
+        "requests": len(everything),
+        "seconds": round(elapsed, 2),
+        "messages_per_second": round(handled / elapsed, 1),
+        "p50_latency": round(statistics.median(everything), 3) if everything else None,
+        "max_latency": round(max(everything), 3) if everything else None,
+        "per_worker": dict(sorted(per_worker.items())),
+    }
+
+
+def report(results: list[dict]) -> str:
+    """A markdown table comparing the benchmark runs, with a row per worker of each run"""
+    lines = [
+        "| workers | worker | agents | messages | model calls | p50 latency (s) | max latency (s) | messages/s (run) |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for result in results:
+        for index, worker in result["per_worker"].items():
+            lines.append(
+                f"| {result['workers']} | {index} | {worker['agents']} | {worker['messages']} | {worker['model_calls']['calls']} "
+                f"| {worker['p50_latency']} | {worker['max_latency']} | {result['messages_per_second']} |"
+            )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the agents across several worker runtimes")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--agents", type=int, default=HOW_MANY_AGENTS)
+    parser.add_argument("--bench", action="store_true", help="Measure throughput with mock models instead of creating agents")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds each mock model call waits")
+    parser.add_argument("--cpu", type=float, default=0.01, help="CPU seconds each mock model call uses")
+    parser.add_argument("--output", help="Also write the benchmark's per-worker comparison to this markdown file")
+    args = parser.parse_args()
+    if not args.bench:
+        print(asyncio.run(launch(args.workers, args.agents)))
+        return
+    bench = {"latency": args.latency, "cpu_seconds": args.cpu}
+    results = []
+    for workers in sorted({1, 2, args.workers}):
+        results.append(asyncio.run(launch(workers, args.agents, bench, args.requests)))
+        print(results[-1])
+    table = report(results)
+    print(table)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(f"Measured with `uv run launcher.py {' '.join(sys.argv[1:])}`: {args.requests} requests to {args.agents} mock agents, {args.latency}s latency and {args.cpu} CPU seconds per model call\n\n{table}\n")
+
+
+if __name__ == "__main__":
+    main()
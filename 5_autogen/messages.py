@@ -1,24 +1,234 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from autogen_core import AgentId
-import glob
+from collections import Counter, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+import asyncio
+import time
 import os
 
 
 import random
 
+MAX_IN_FLIGHT_PER_AGENT = int(os.getenv("AGENT_MAX_IN_FLIGHT", "2"))
+MAX_HOPS = int(os.getenv("AGENT_MAX_HOPS", "4"))
+REQUEST_SECONDS = float(os.getenv("AGENT_REQUEST_SECONDS", "300"))
+MAX_MODEL_CALLS = int(os.getenv("AGENT_MAX_MODEL_CALLS", "8"))
+
 @dataclass
 class Message:
     content: str
+    # How many more times this request may be passed on to another agent
+    hops_left: int = MAX_HOPS
+    # The time.time() by which the original request must be answered; 0 until the first agent receives it
+    deadline: float = 0.0
+    # How many agents the request has passed through before this one
+    depth: int = 0
+    # False when the request ran out of hops or time before it could be passed on, so this is the sender's own idea
+    refined: bool = True
+
+    def can_bounce(self) -> bool:
+        return self.hops_left > 0 and (not self.deadline or time.time() < self.deadline)
+
+
+@dataclass
+class Registered:
+    name: str
+
+
+@dataclass
+class AgentStats:
+    weight: float = 1.0
+    in_flight: int = 0
+    received: int = 0
+    selected: int = 0
+    seconds: float = 0.0
+
+
+class RecipientRegistry:
+    """
+    The agents registered with this runtime, kept in memory as the Creator registers them, with counters
+    of the messages each has received and is handling now. Recipients are chosen at random in proportion
+    to their weight and their affinity with the sender, favouring agents with fewer messages in flight
+    and skipping those with MAX_IN_FLIGHT_PER_AGENT or more while any other agent is free.
+    """
+
+    def __init__(self):
+        self.agents: dict[str, AgentStats] = {}
+        self.affinity: dict[tuple[str, str], float] = {}
+
+    def register(self, name: str, weight: float = 1.0) -> None:
+        self.agents.setdefault(name, AgentStats()).weight = weight
+
+    def set_affinity(self, sender: str, recipient: str, factor: float) -> None:
+        """Make sender this many times more (or less) likely to choose recipient"""
+        self.affinity[(sender, recipient)] = factor
+
+    @contextmanager
+    def handling(self, name: str):
+        # Agents that were never registered, like the Creator, are counted but never chosen as recipients
+        stats = self.agents.setdefault(name, AgentStats(weight=0.0))
+        stats.received += 1
+        stats.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            stats.in_flight -= 1
+            stats.seconds += time.monotonic() - started
+
+    def choose(self, sender: str | None = None) -> str | None:
+        available = [name for name, stats in self.agents.items() if stats.weight > 0]
+        candidates = [name for name in available if name != sender] or available
+        free = [name for name in candidates if self.agents[name].in_flight < MAX_IN_FLIGHT_PER_AGENT]
+        candidates = free or candidates
+        if not candidates:
+            return None
+        weights = [
+            self.agents[name].weight * self.affinity.get((sender, name), 1.0) / (1 + self.agents[name].in_flight)
+            for name in candidates
+        ]
+        name = random.choices(candidates, weights=weights)[0] if sum(weights) > 0 else random.choice(candidates)
+        self.agents[name].selected += 1
+        return name
+
+    def metrics(self) -> dict[str, dict]:
+        return {name: vars(stats).copy() for name, stats in self.agents.items()}
+
+
+recipients = RecipientRegistry()
+
+# The request the agent is handling now, whose budget any message it sends on is charged to
+current_request: ContextVar[Message | None] = ContextVar("current_request", default=None)
+# The agent's latest model reply while handling the current request: its idea as it stands
+latest_reply: ContextVar[str | None] = ContextVar("latest_reply", default=None)
+
+
+def remembering(on_messages):
+    """Wrap an AssistantAgent's on_messages so that its reply is kept in latest_reply"""
+
+    async def call(*args, **kwargs):
+        response = await on_messages(*args, **kwargs)
+        content = getattr(response.chat_message, "content", None)
+        if isinstance(content, str):
+            latest_reply.set(content)
+        return response
+
+    return call
+
+
+class ModelCallLimiter:
+    """
+    Caps the model calls in flight across every agent in this runtime at max_calls. The others queue for a
+    slot, but no longer than their request's deadline. Records how long each call queued and how deep in
+    its bounce chain it was made, and counts the requests that ran out of deadline or hops.
+    """
+
+    def __init__(self, max_calls: int = MAX_MODEL_CALLS):
+        self.max_calls = max_calls
+        self.semaphore = asyncio.Semaphore(max_calls)
+        self.in_flight = 0
+        self.waits = deque(maxlen=1000)
+        self.depths = Counter()
+        self.expired = 0
+        self.out_of_hops = 0
+
+    @asynccontextmanager
+    async def slot(self, request: Message | None):
+        started = time.monotonic()
+        timeout = request.deadline - time.time() if request and request.deadline else None
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise TimeoutError("The request's deadline passed while it waited to call the model") from None
+        self.waits.append(time.monotonic() - started)
+        self.depths[request.depth if request else 0] += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def limited(self, on_messages):
+        """Wrap an AssistantAgent's on_messages so that each call waits for a slot"""
+
+        async def call(*args, **kwargs):
+            async with self.slot(current_request.get()):
+                return await on_messages(*args, **kwargs)
+
+        return call
+
+    def metrics(self) -> dict:
+        waits = sorted(self.waits)
+        return {
+            "in_flight": self.in_flight,
+            "calls": sum(self.depths.values()),
+            "p50_queue_seconds": round(waits[len(waits) // 2], 3) if waits else None,
+            "max_queue_seconds": round(waits[-1], 3) if waits else None,
+            "chain_depths": dict(sorted(self.depths.items())),
+            "expired": self.expired,
+            "out_of_hops": self.out_of_hops,
+        }
+
+
+model_calls = ModelCallLimiter()
+
+
+def tracked(agent_class):
+    """
+    A subclass of the agent class that counts the messages each instance handles in the registry, limits its
+    model calls, and charges the messages it sends on to the budget of the request it is handling
+    """
+
+    class Tracked(agent_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            delegate = getattr(self, "_delegate", None)
+            if delegate is not None:
+                delegate.on_messages = remembering(model_calls.limited(delegate.on_messages))
+
+        async def on_message_impl(self, message, ctx):
+            token = reply_token = None
+            if isinstance(message, Message):
+                if not message.deadline:
+                    message.deadline = time.time() + REQUEST_SECONDS
+                token = current_request.set(message)
+                reply_token = latest_reply.set(None)
+            try:
+                with recipients.handling(self.id.type):
+                    return await super().on_message_impl(message, ctx)
+            finally:
+                if token is not None:
+                    current_request.reset(token)
+                    latest_reply.reset(reply_token)
+
+        async def send_message(self, message, recipient, **kwargs):
+            request = current_request.get()
+            if isinstance(message, Message) and request is not None:
+                if not request.can_bounce():
+                    # Agents written before the hop budget bounce without checking it and use the reply as their idea,
+                    # so reply with the idea as it stands rather than the request to refine it
+                    model_calls.out_of_hops += 1
+                    print(f"{self.id.type}: request is out of hops or time; not passing it to {recipient.type}")
+                    return Message(content=latest_reply.get() or message.content, refined=False)
+                message = replace(
+                    message,
+                    hops_left=min(message.hops_left, request.hops_left - 1),
+                    deadline=min(message.deadline or request.deadline, request.deadline),
+                    depth=request.depth + 1,
+                )
+            return await super().send_message(message, recipient, **kwargs)
+
+    Tracked.__name__ = Tracked.__qualname__ = agent_class.__name__
+    return Tracked
 
 
-def find_recipient() -> AgentId:
-    try:
-        agent_files = glob.glob("agent*.py")
-        agent_names = [os.path.splitext(file)[0] for file in agent_files]
-        agent_names.remove("agent")
-        agent_name = random.choice(agent_names)
-        print(f"Selecting agent for refinement: {agent_name}")
-        return AgentId(agent_name, "default")
-    except Exception as e:
-        print(f"Exception finding recipient: {e}")
+def find_recipient(sender: str | None = None) -> AgentId:
+    agent_name = recipients.choose(sender)
+    if agent_name is None:
+        print("No agents registered yet; falling back to agent1")
         return AgentId("agent1", "default")
+    print(f"Selecting agent for refinement: {agent_name}")
+    return AgentId(agent_name, "default")
@@ -0,0 +1,187 @@
+from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import json
+import time
+import os
+
+MODEL_REQUESTS_PER_MINUTE = float(os.getenv("MODEL_REQUESTS_PER_MINUTE", "500"))
+MODEL_REQUEST_BURST = int(os.getenv("MODEL_REQUEST_BURST", "20"))
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "512"))
+
+
+class RateLimiter:
+    """Spaces requests out to requests_per_minute, letting up to burst of them through at once after a quiet spell"""
+
+    def __init__(self, requests_per_minute: float = MODEL_REQUESTS_PER_MINUTE, burst: int = MODEL_REQUEST_BURST):
+        self.interval = 60.0 / requests_per_minute
+        self.burst_seconds = (burst - 1) * self.interval
+        self.next_due = 0.0
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        due = max(self.next_due, now)
+        self.next_due = due + self.interval
+        delay = due - self.burst_seconds - now
+        if delay > 0:
+            self.waits += 1
+            self.waited_seconds += delay
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class AgentTypeStats:
+    calls: int = 0
+    cached: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=500))
+
+
+class SharedModelClient(ChatCompletionClient):
+    """
+    What the provider hands each agent: a view onto the process's one client for the model, with the agent's
+    own create arguments such as temperature, that counts its calls and tokens against the agent's type
+    """
+
+    def __init__(self, provider: "ModelClientProvider", model: str, agent_type: str, create_args: dict):
+        self.provider = provider
+        self.model = model
+        self.client = provider.clients[model]
+        self.agent_type = agent_type
+        self.create_args = create_args
+        self.usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    async def create(self, messages, *, tools=[], json_output=None, extra_create_args={}, cancellation_token=None) -> CreateResult:
+        create_args = {**self.create_args, **extra_create_args}
+        stats = self.provider.stats_for(self.agent_type)
+        key = self.provider.cache_key(self.model, messages, create_args, json_output) if not tools else None
+        if key and key in self.provider.cache:
+            self.provider.cache.move_to_end(key)
+            stats.cached += 1
+            return self.provider.cache[key].model_copy(update={"cached": True})
+        await self.provider.rate_limiter.wait()
+        started = time.monotonic()
+        result = await self.client.create(
+            messages, tools=tools, json_output=json_output, extra_create_args=create_args, cancellation_token=cancellation_token
+        )
+        self.record(stats, result, time.monotonic() - started)
+        if key:
+            self.provider.remember(key, result)
+        return result
+
+    async def create_stream(self, messages, *, tools=[], json_output=None, extra_create_args={}, cancellation_token=None):
+        create_args = {**self.create_args, **extra_create_args}
+        stats = self.provider.stats_for(self.agent_type)
+        await self.provider.rate_limiter.wait()
+        started = time.monotonic()
+        async for chunk in self.client.create_stream(
+            messages, tools=tools, json_output=json_output, extra_create_args=create_args, cancellation_token=cancellation_token
+        ):
+            if isinstance(chunk, CreateResult):
+                self.record(stats, chunk, time.monotonic() - started)
+            yield chunk
+
+    def record(self, stats: AgentTypeStats, result: CreateResult, seconds: float) -> None:
+        stats.calls += 1
+        stats.prompt_tokens += result.usage.prompt_tokens
+        stats.completion_tokens += result.usage.completion_tokens
+        stats.latencies.append(seconds)
+        self.usage = RequestUsage(
+            prompt_tokens=self.usage.prompt_tokens + result.usage.prompt_tokens,
+            completion_tokens=self.usage.completion_tokens + result.usage.completion_tokens,
+        )
+
+    async def close(self) -> None:
+        # The underlying client is shared with other agents; the provider closes it
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self.usage
+
+    def total_usage(self) -> RequestUsage:
+        return self.usage
+
+    def count_tokens(self, messages, *, tools=[]) -> int:
+        return self.client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages, *, tools=[]) -> int:
+        return self.client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self.client.capabilities
+
+    @property
+    def model_info(self):
+        return self.client.model_info
+
+
+class ModelClientProvider:
+    """
+    Hands out model clients for every agent in this process. Agents asking for the same model share one
+    underlying client, and so one pool of HTTP connections, and all of their requests go through one rate
+    limiter. Responses to requests made at temperature 0 without tools are cached, so an identical system
+    message and prompt is answered without calling the model again. Calls, tokens and latency are counted
+    for each agent type.
+    """
+
+    def __init__(self, cache_size: int = MODEL_CACHE_SIZE):
+        self.clients: dict[str, ChatCompletionClient] = {}
+        self.rate_limiter = RateLimiter()
+        self.cache: OrderedDict[str, CreateResult] = OrderedDict()
+        self.cache_size = cache_size
+        self.stats: dict[str, AgentTypeStats] = {}
+        # Replaced in benchmarks to use a mock model
+        self.factory = lambda model: OpenAIChatCompletionClient(model=model)
+
+    def get_client(self, agent_type: str, model: str = "gpt-4o-mini", **create_args) -> SharedModelClient:
+        if model not in self.clients:
+            self.clients[model] = self.factory(model)
+        return SharedModelClient(self, model, agent_type, create_args)
+
+    def stats_for(self, agent_type: str) -> AgentTypeStats:
+        return self.stats.setdefault(agent_type, AgentTypeStats())
+
+    def cache_key(self, model: str, messages, create_args: dict, json_output) -> str | None:
+        """Requests are only cached at temperature 0, and not when asking for structured output"""
+        if create_args.get("temperature") != 0 or not isinstance(json_output, (bool, type(None))):
+            return None
+        payload = json.dumps(
+            [model, json_output, sorted(create_args.items()), [message.model_dump(mode="json") for message in messages]],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def remember(self, key: str, result: CreateResult) -> None:
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def metrics(self) -> dict[str, dict]:
+        metrics = {}
+        for agent_type, stats in self.stats.items():
+            latencies = sorted(stats.latencies)
+            metrics[agent_type] = {
+                "calls": stats.calls,
+                "cached": stats.cached,
+                "prompt_tokens": stats.prompt_tokens,
+                "completion_tokens": stats.completion_tokens,
+                "p50_seconds": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                "max_seconds": round(latencies[-1], 3) if latencies else None,
+            }
+        return metrics
+
+    async def close(self) -> None:
+        for client in self.clients.values():
+            await client.close()
+        self.clients.clear()
+
+
+provider = ModelClientProvider()
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import generated_agents
+from generated_agents import GeneratedAgentRegistry, strip_code_fences, validate
+
+CODE = '''from autogen_core import RoutedAgent
+
+
+class Agent(RoutedAgent):
+    def __init__(self, name) -> None:
+        super().__init__(name)
+        self.idea = {idea!r}
+'''
+
+
+class TestGeneratedAgentRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_generated_agents_")
+        self.template_file = os.path.join(self.directory, "agent.py")
+        self.write_template("template one")
+        self.index_file = os.path.join(self.directory, "generated", "index.json")
+
+    def write_template(self, text):
+        with open(self.template_file, "w", encoding="utf-8") as f:
+            f.write(text)
+        # Make the change visible even when the filesystem's mtime resolution is coarse
+        os.utime(self.template_file, (0, os.path.getmtime(self.template_file) + 1))
+
+    def registry(self):
+        return GeneratedAgentRegistry(self.template_file, self.index_file)
+
+    def test_stored_code_is_reused_by_the_next_run(self):
+        code = self.registry().store("agent1", "```python\n" + CODE.format(idea="a") + "```")
+        self.assertEqual(code, CODE.format(idea="a"))
+        self.assertEqual(self.registry().lookup("agent1"), code)
+        self.assertIsNone(self.registry().lookup("agent2"))
+
+    def test_editing_the_template_invalidates_stored_code(self):
+        registry = self.registry()
+        registry.store("agent1", CODE.format(idea="a"))
+        self.write_template("template two")
+        self.assertIsNone(registry.lookup("agent1"))
+        self.assertIsNone(self.registry().lookup("agent1"))
+        registry.store("agent1", CODE.format(idea="b"))
+        self.assertEqual(self.registry().lookup("agent1"), CODE.format(idea="b"))
+
+    def test_entries_without_a_template_hash_are_regenerated(self):
+        registry = self.registry()
+        registry.store("agent1", CODE.format(idea="a"))
+        registry.index["agent1"] = registry.index["agent1"]["code"]
+        self.assertIsNone(registry.lookup("agent1"))
+
+    def test_reuse_can_be_switched_off(self):
+        registry = self.registry()
+        registry.store("agent1", CODE.format(idea="a"))
+        with mock.patch.object(generated_agents, "REUSE_GENERATED_AGENTS", False):
+            self.assertIsNone(registry.lookup("agent1"))
+
+    def test_invalid_code_is_rejected_and_not_stored(self):
+        registry = self.registry()
+        for code in ["def (", "class Other(RoutedAgent): pass", "class Agent: pass", "class Agent(RoutedAgent): pass"]:
+            with self.assertRaises(ValueError):
+                registry.store("agent1", code)
+        self.assertIsNone(registry.lookup("agent1"))
+
+    def test_load_rewrites_the_module_only_when_its_code_changes(self):
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        sys.path.insert(0, self.directory)
+        self.addCleanup(sys.path.remove, self.directory)
+        self.addCleanup(os.chdir, cwd)
+        self.addCleanup(sys.modules.pop, "sample_agent_module", None)
+        registry = self.registry()
+        module = registry.load("sample_agent_module", CODE.format(idea="a"))
+        mtime = os.path.getmtime("sample_agent_module.py")
+        self.assertIs(registry.load("sample_agent_module", CODE.format(idea="a")), module)
+        self.assertEqual(os.path.getmtime("sample_agent_module.py"), mtime)
+        module = registry.load("sample_agent_module", CODE.format(idea="bb"))
+        with open("sample_agent_module.py", encoding="utf-8") as f:
+            self.assertEqual(f.read(), CODE.format(idea="bb"))
+        self.assertTrue(hasattr(module, "Agent"))
+
+
+class TestValidation(unittest.TestCase):
+    def test_strip_code_fences(self):
+        self.assertEqual(strip_code_fences("Here:\n```python\nx = 1\n```\nDone"), "x = 1\n")
+        self.assertEqual(strip_code_fences("x = 1"), "x = 1\n")
+
+    def test_validate_accepts_the_template_shape(self):
+        validate(CODE.format(idea="a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
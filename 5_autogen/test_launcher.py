@@ -0,0 +1,74 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import launcher
+from generated_agents import GeneratedAgentRegistry
+
+CODE = '''from autogen_core import RoutedAgent
+
+
+class Agent(RoutedAgent):
+    def __init__(self, name) -> None:
+        super().__init__(name)
+        self.number = {number}
+'''
+
+
+def store_agents(template_file: str, index_file: str, first: int, count: int) -> None:
+    registry = GeneratedAgentRegistry(template_file, index_file)
+    for number in range(first, first + count):
+        registry.store(f"agent{number}", CODE.format(number=number))
+
+
+class TestAssignment(unittest.TestCase):
+    def test_every_agent_is_hosted_by_the_worker_it_is_sent_to(self):
+        for workers in (1, 3, 4):
+            hosted = {name: index for index in range(workers) for name in launcher.assigned(index, workers, 10)}
+            self.assertEqual(len(hosted), 10)
+            for number in range(1, 11):
+                self.assertEqual(hosted[f"agent{number}"], launcher.worker_of(number, workers))
+
+
+class TestSharedIndex(unittest.TestCase):
+    def test_workers_storing_at_once_keep_each_others_entries(self):
+        directory = tempfile.mkdtemp(prefix="test_launcher_")
+        template_file = os.path.join(directory, "agent.py")
+        with open(template_file, "w") as f:
+            f.write("template")
+        index_file = os.path.join(directory, "generated", "index.json")
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=store_agents, args=(template_file, index_file, 1 + 10 * worker, 10))
+            for worker in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+        registry = GeneratedAgentRegistry(template_file, index_file)
+        self.assertEqual(len(registry.index), 40)
+        self.assertEqual(registry.lookup("agent17"), CODE.format(number=17))
+
+
+class TestLaunch(unittest.TestCase):
+    def test_every_worker_hears_about_every_agent(self):
+        bench = {"latency": 0.01, "cpu_seconds": 0.0}
+        result = asyncio.run(launcher.launch(workers=3, how_many=6, bench=bench, requests=12))
+        self.assertEqual(result["requests"], 12)
+        self.assertEqual(sorted(result["per_worker"]), [0, 1, 2])
+        for worker in result["per_worker"].values():
+            self.assertEqual(worker["agents"], 2)
+            self.assertEqual(worker["recipients"], 6)
+            self.assertIsNotNone(worker["p50_latency"])
+        table = launcher.report([result])
+        self.assertEqual(len(table.splitlines()), 2 + 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
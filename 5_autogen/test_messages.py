@@ -0,0 +1,126 @@
+import asyncio
+import random
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from autogen_core import AgentId, MessageContext, RoutedAgent, SingleThreadedAgentRuntime, message_handler
+import messages
+from messages import Message, RecipientRegistry
+
+
+class TestRecipientRegistry(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.registry = RecipientRegistry()
+        for name in ("agent1", "agent2", "agent3"):
+            self.registry.register(name)
+
+    def choices(self, sender=None, n=3000):
+        return [self.registry.choose(sender) for _ in range(n)]
+
+    def test_never_chooses_the_sender_unless_it_is_alone(self):
+        self.assertNotIn("agent1", self.choices("agent1"))
+        alone = RecipientRegistry()
+        alone.register("agent1")
+        self.assertEqual(alone.choose("agent1"), "agent1")
+        self.assertIsNone(RecipientRegistry().choose())
+
+    def test_unregistered_handlers_are_counted_but_never_chosen(self):
+        with self.registry.handling("creator"):
+            self.assertEqual(self.registry.metrics()["creator"]["in_flight"], 1)
+        self.assertNotIn("creator", self.choices())
+        self.assertEqual(self.registry.metrics()["creator"]["received"], 1)
+
+    def test_busy_agents_are_skipped_while_others_are_free(self):
+        with self.registry.handling("agent2"), self.registry.handling("agent2"):
+            self.assertEqual(set(self.choices("agent1")), {"agent3"})
+            with self.registry.handling("agent3"), self.registry.handling("agent3"):
+                # Everyone is busy, so anyone but the sender will do
+                self.assertEqual(set(self.choices("agent1")), {"agent2", "agent3"})
+        self.assertEqual(self.registry.metrics()["agent2"]["in_flight"], 0)
+
+    def test_weights_and_affinity_shape_the_choice(self):
+        self.registry.register("agent2", weight=3.0)
+        self.registry.set_affinity("agent1", "agent3", 0.0)
+        chosen = self.choices("agent1")
+        self.assertEqual(set(chosen), {"agent2"})
+        chosen = self.choices()
+        self.assertAlmostEqual(chosen.count("agent2") / len(chosen), 0.6, delta=0.05)
+        self.assertEqual(self.registry.metrics()["agent2"]["selected"], chosen.count("agent2") + 3000)
+
+    def test_find_recipient_falls_back_to_agent1(self):
+        with mock.patch.object(messages, "recipients", RecipientRegistry()), mock.patch("builtins.print"):
+            self.assertEqual(messages.find_recipient("agent4").type, "agent1")
+        with mock.patch.object(messages, "recipients", self.registry), mock.patch("builtins.print"):
+            self.assertIn(messages.find_recipient("agent1").type, {"agent2", "agent3"})
+
+
+class FakeDelegate:
+    def __init__(self, name):
+        self.name = name
+
+    async def on_messages(self, chat_messages, cancellation_token):
+        await asyncio.sleep(0.02)
+        return SimpleNamespace(chat_message=SimpleNamespace(content=f"{self.name}'s idea"))
+
+
+class Bouncer(RoutedAgent):
+    """Like agents generated before the hop budget: always bounces its idea to its peer, without checking can_bounce"""
+
+    def __init__(self, name, peer) -> None:
+        super().__init__(name)
+        self.peer = peer
+        self._delegate = FakeDelegate(name)
+
+    @message_handler
+    async def handle_message(self, message: Message, ctx: MessageContext) -> Message:
+        response = await self._delegate.on_messages([message.content], ctx.cancellation_token)
+        idea = response.chat_message.content
+        response = await self.send_message(Message(content=f"Please refine: {idea}"), AgentId(self.peer, "default"))
+        return Message(content=response.content, refined=response.refined)
+
+
+class TestTracked(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.runtime = SingleThreadedAgentRuntime()
+        agent_class = messages.tracked(Bouncer)
+        for name, peer in (("a", "b"), ("b", "a")):
+            await agent_class.register(self.runtime, name, lambda name=name, peer=peer: agent_class(name, peer))
+        self.runtime.start()
+        patch = mock.patch("builtins.print")
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def asyncTearDown(self):
+        await self.runtime.stop_when_idle()
+
+    async def send(self, message):
+        return await self.runtime.send_message(message, AgentId("a", "default"))
+
+    async def test_out_of_hops_returns_the_senders_idea_not_the_bounce_request(self):
+        result = await self.send(Message(content="go", hops_left=1))
+        self.assertEqual(result.content, "b's idea")
+        self.assertFalse(result.refined)
+
+        result = await self.send(Message(content="go", hops_left=0))
+        self.assertEqual(result.content, "a's idea")
+        self.assertFalse(result.refined)
+
+    async def test_a_deadline_passing_stops_bouncing(self):
+        result = await self.send(Message(content="go", deadline=time.time() + 0.01))
+        self.assertEqual(result.content, "a's idea")
+        self.assertFalse(result.refined)
+
+    async def test_bounces_are_charged_to_the_original_request(self):
+        out_of_hops = messages.model_calls.out_of_hops
+        with mock.patch.object(messages, "recipients", RecipientRegistry()) as registry:
+            await self.send(Message(content="go", hops_left=3))
+        self.assertEqual(messages.model_calls.out_of_hops, out_of_hops + 1)
+        # a, b, a and b handle it, the last with no hops left to pass it on
+        self.assertEqual(registry.metrics()["a"]["received"], 2)
+        self.assertEqual(registry.metrics()["b"]["received"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import time
+import unittest
+from autogen_core.models import CreateResult, RequestUsage, SystemMessage, UserMessage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from model_clients import ModelClientProvider, RateLimiter
+
+
+class FakeClient(ReplayChatCompletionClient):
+    """Answers every request, recording the create arguments it was called with"""
+
+    def __init__(self):
+        super().__init__(["fake"])
+        self.calls = []
+        self.closed = False
+
+    async def create(self, messages, *, tools=[], json_output=None, extra_create_args={}, cancellation_token=None) -> CreateResult:
+        self.calls.append(extra_create_args)
+        await asyncio.sleep(0.01)
+        usage = RequestUsage(prompt_tokens=10, completion_tokens=5)
+        return CreateResult(finish_reason="stop", content=f"answer {len(self.calls)}", usage=usage, cached=False)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+PROMPT = [SystemMessage(content="You are an entrepreneur."), UserMessage(content="Give me an idea", source="user")]
+
+
+class TestModelClientProvider(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.provider = ModelClientProvider(cache_size=2)
+        self.provider.factory = lambda model: FakeClient()
+
+    async def test_agents_share_one_client_per_model_with_their_own_arguments(self):
+        warm = self.provider.get_client("agent1", model="fake", temperature=0.7)
+        cold = self.provider.get_client("agent2", model="fake", temperature=0.2)
+        other = self.provider.get_client("agent2", model="other")
+        self.assertIs(warm.client, cold.client)
+        self.assertIsNot(warm.client, other.client)
+        await warm.create(PROMPT)
+        await cold.create(PROMPT, extra_create_args={"max_tokens": 10})
+        self.assertEqual(warm.client.calls, [{"temperature": 0.7}, {"temperature": 0.2, "max_tokens": 10}])
+        self.assertEqual(warm.total_usage(), RequestUsage(prompt_tokens=10, completion_tokens=5))
+
+        await warm.close()
+        self.assertFalse(warm.client.closed)
+        await self.provider.close()
+        self.assertTrue(cold.client.closed)
+        self.assertEqual(self.provider.clients, {})
+
+    async def test_only_deterministic_requests_are_cached(self):
+        client = self.provider.get_client("agent1", model="fake", temperature=0)
+        first = await client.create(PROMPT)
+        again = await self.provider.get_client("agent2", model="fake", temperature=0).create(PROMPT)
+        self.assertEqual(again.content, first.content)
+        self.assertTrue(again.cached)
+        self.assertEqual(len(client.client.calls), 1)
+
+        await self.provider.get_client("agent1", model="fake", temperature=1.0).create(PROMPT)
+        await self.provider.get_client("agent1", model="fake", temperature=1.0).create(PROMPT)
+        await client.create(PROMPT, json_output=dict)
+        await client.create(PROMPT, tools=[object()])
+        self.assertEqual(len(client.client.calls), 5)
+
+        metrics = self.provider.metrics()
+        self.assertEqual(metrics["agent1"]["calls"], 5)
+        self.assertEqual(metrics["agent1"]["prompt_tokens"], 50)
+        self.assertEqual((metrics["agent2"]["calls"], metrics["agent2"]["cached"]), (0, 1))
+
+    async def test_the_cache_keeps_the_most_recently_used_answers(self):
+        client = self.provider.get_client("agent1", model="fake", temperature=0)
+        prompts = [[UserMessage(content=f"prompt {i}", source="user")] for i in range(3)]
+        await client.create(prompts[0])
+        await client.create(prompts[1])
+        await client.create(prompts[0])
+        await client.create(prompts[2])
+        self.assertEqual(len(client.client.calls), 3)
+        await client.create(prompts[0])
+        await client.create(prompts[1])
+        self.assertEqual(len(client.client.calls), 4)
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_lets_a_burst_through_then_spaces_requests_out(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=3)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.wait() for _ in range(3)))
+        self.assertLess(time.monotonic() - started, 0.05)
+        await asyncio.gather(*(limiter.wait() for _ in range(3)))
+        self.assertAlmostEqual(time.monotonic() - started, 0.3, delta=0.1)
+        self.assertEqual(limiter.waits, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
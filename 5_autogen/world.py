@@ -4,6 +4,7 @@ from creator import Creator
 from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntime
 from autogen_core import AgentId
 import messages
+from model_clients import provider
 import asyncio
 
 HOW_MANY_AGENTS = 20
@@ -21,13 +22,17 @@ async def main():
     host.start() 
     worker = GrpcWorkerAgentRuntime(host_address="localhost:50051")
     await worker.start()
-    result = await Creator.register(worker, "Creator", lambda: Creator("Creator"))
+    creator_class = messages.tracked(Creator)
+    result = await creator_class.register(worker, "Creator", lambda: creator_class("Creator"))
     creator_id = AgentId("Creator", "default")
     coroutines = [create_and_message(worker, creator_id, i) for i in range(1, HOW_MANY_AGENTS+1)]
     await asyncio.gather(*coroutines)
+    print(f"Model calls: {messages.model_calls.metrics()}")
+    print(f"Model usage by agent: {provider.metrics()}")
     try:
         await worker.stop()
         await host.stop()
+        await provider.close()
     except Exception as e:
         print(e)
 
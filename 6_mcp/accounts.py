@@ -1,14 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 import json
 from dotenv import load_dotenv
-from datetime import datetime
-from market import get_share_price
-from database import write_account, read_account, write_log
+from market import get_share_price, get_share_prices, current_time
+from database import write_account, read_account, write_log, write_account_details, write_trade, write_portfolio_value
 
 load_dotenv(override=True)
 
 INITIAL_BALANCE = 10_000.0
 SPREAD = 0.002
+# How many of the latest transactions a report includes
+REPORT_TRANSACTIONS = 10
 
 
 class Transaction(BaseModel):
@@ -33,6 +34,43 @@ class Account(BaseModel):
     transactions: list[Transaction]
     portfolio_value_time_series: list[tuple[str, float]]
 
+    # Running totals kept up to date as trades are applied and stored alongside the account,
+    # so neither loading nor reporting re-scans the transactions
+    _net_spend: float = PrivateAttr(default=0.0)
+    _positions: dict[str, int] = PrivateAttr(default_factory=dict)
+    _cost_basis: dict[str, float] = PrivateAttr(default_factory=dict)
+    _realized_profit_loss: float = PrivateAttr(default=0.0)
+
+    def model_post_init(self, __context):
+        totals = (__context or {}).get("totals")
+        if totals and totals["net_spend"] is not None:
+            self._net_spend = totals["net_spend"]
+            self._realized_profit_loss = totals["realized_profit_loss"] or 0.0
+            self._cost_basis = dict(totals["cost_basis"])
+            self._positions = dict(self.holdings)
+        else:
+            for transaction in self.transactions:
+                self._apply_transaction(transaction)
+
+    def _apply_transaction(self, transaction: Transaction):
+        """ Fold a transaction into the running spend, cost basis and realized P&L (average cost method). """
+        symbol = transaction.symbol
+        held = self._positions.get(symbol, 0)
+        self._net_spend += transaction.total()
+        if transaction.quantity > 0:
+            self._cost_basis[symbol] = self._cost_basis.get(symbol, 0.0) + transaction.total()
+        elif held:
+            sold = -transaction.quantity
+            average_price = self._cost_basis.get(symbol, 0.0) / held
+            self._realized_profit_loss += sold * (transaction.price - average_price)
+            self._cost_basis[symbol] = self._cost_basis.get(symbol, 0.0) - sold * average_price
+        held += transaction.quantity
+        if held:
+            self._positions[symbol] = held
+        else:
+            self._positions.pop(symbol, None)
+            self._cost_basis.pop(symbol, None)
+
     @classmethod
     def get(cls, name: str):
         fields = read_account(name.lower())
@@ -43,14 +81,33 @@ class Account(BaseModel):
                 "strategy": "",
                 "holdings": {},
                 "transactions": [],
-                "portfolio_value_time_series": []
+                "portfolio_value_time_series": [],
+                "net_spend": 0.0,
+                "realized_profit_loss": 0.0,
+                "cost_basis": {},
             }
             write_account(name, fields)
-        return cls(**fields)
-    
-    
+        totals = {key: fields.pop(key, None) for key in ("net_spend", "realized_profit_loss", "cost_basis")}
+        account = cls.model_validate(fields, context={"totals": totals})
+        if totals["net_spend"] is None:
+            # Saved before the totals were stored: they were rebuilt from the transactions, so store them now
+            account.save()
+        return account
+
+    def totals(self) -> dict:
+        """ The running totals, in the form the database stores them. """
+        return {
+            "net_spend": self._net_spend,
+            "realized_profit_loss": self._realized_profit_loss,
+            "cost_basis": dict(self._cost_basis),
+        }
+
     def save(self):
-        write_account(self.name.lower(), self.model_dump())
+        """ Rewrite the whole account; prefer the targeted writes below on hot paths. """
+        write_account(self.name.lower(), self.model_dump() | self.totals())
+
+    def save_details(self):
+        write_account_details(self.name, self.balance, self.strategy)
 
     def reset(self, strategy: str):
         self.balance = INITIAL_BALANCE
@@ -58,6 +115,10 @@ class Account(BaseModel):
         self.holdings = {}
         self.transactions = []
         self.portfolio_value_time_series = []
+        self._net_spend = 0.0
+        self._positions = {}
+        self._cost_basis = {}
+        self._realized_profit_loss = 0.0
         self.save()
 
     def deposit(self, amount: float):
@@ -66,7 +127,7 @@ class Account(BaseModel):
             raise ValueError("Deposit amount must be positive.")
         self.balance += amount
         print(f"Deposited ${amount}. New balance: ${self.balance}")
-        self.save()
+        self.save_details()
 
     def withdraw(self, amount: float):
         """ Withdraw funds from the account, ensuring it doesn't go negative. """
@@ -74,7 +135,7 @@ class Account(BaseModel):
             raise ValueError("Insufficient funds for withdrawal.")
         self.balance -= amount
         print(f"Withdrew ${amount}. New balance: ${self.balance}")
-        self.save()
+        self.save_details()
 
     def buy_shares(self, symbol: str, quantity: int, rationale: str) -> str:
         """ Buy shares of a stock if sufficient funds are available. """
@@ -89,14 +150,18 @@ class Account(BaseModel):
         
         # Update holdings
         self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = current_time().strftime("%Y-%m-%d %H:%M:%S")
         # Record transaction
         transaction = Transaction(symbol=symbol, quantity=quantity, price=buy_price, timestamp=timestamp, rationale=rationale)
+        self._apply_transaction(transaction)
         self.transactions.append(transaction)
         
         # Update balance
         self.balance -= total_cost
-        self.save()
+        write_trade(
+            self.name, self.balance, self.holdings[symbol], transaction.model_dump(),
+            self._cost_basis.get(symbol, 0.0), self._net_spend, self._realized_profit_loss,
+        )
         write_log(self.name, "account", f"Bought {quantity} of {symbol}")
         return "Completed. Latest details:\n" + self.report()
 
@@ -115,28 +180,48 @@ class Account(BaseModel):
         # If shares are completely sold, remove from holdings
         if self.holdings[symbol] == 0:
             del self.holdings[symbol]
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = current_time().strftime("%Y-%m-%d %H:%M:%S")
         # Record transaction
         transaction = Transaction(symbol=symbol, quantity=-quantity, price=sell_price, timestamp=timestamp, rationale=rationale)  # negative quantity for sell
+        self._apply_transaction(transaction)
         self.transactions.append(transaction)
 
         # Update balance
         self.balance += total_proceeds
-        self.save()
+        write_trade(
+            self.name, self.balance, self.holdings.get(symbol, 0), transaction.model_dump(),
+            self._cost_basis.get(symbol, 0.0), self._net_spend, self._realized_profit_loss,
+        )
         write_log(self.name, "account", f"Sold {quantity} of {symbol}")
         return "Completed. Latest details:\n" + self.report()
 
     def calculate_portfolio_value(self):
         """ Calculate the total value of the user's portfolio. """
         total_value = self.balance
+        prices = get_share_prices(list(self.holdings))
         for symbol, quantity in self.holdings.items():
-            total_value += get_share_price(symbol) * quantity
+            total_value += prices[symbol] * quantity
         return total_value
 
     def calculate_profit_loss(self, portfolio_value: float):
         """ Calculate profit or loss from the initial spend. """
-        initial_spend = sum(transaction.total() for transaction in self.transactions)
-        return portfolio_value - initial_spend - self.balance
+        return portfolio_value - self._net_spend - self.balance
+
+    def calculate_unrealized_profit_loss(self, portfolio_value: float):
+        """ Calculate the gain or loss on shares still held, relative to their cost basis. """
+        return portfolio_value - self.balance - sum(self._cost_basis.values())
+
+    def get_cost_basis(self) -> dict[str, float]:
+        """ Report the amount paid for each current holding, using the average cost method. """
+        return dict(self._cost_basis)
+
+    def get_average_prices(self) -> dict[str, float]:
+        """ Report the average price paid per share for each current holding. """
+        return {symbol: cost / self._positions[symbol] for symbol, cost in self._cost_basis.items()}
+
+    def get_realized_profit_loss(self) -> float:
+        """ Report the profit or loss locked in by sales so far. """
+        return self._realized_profit_loss
 
     def get_holdings(self):
         """ Report the current holdings of the user. """
@@ -144,21 +229,36 @@ class Account(BaseModel):
 
     def get_profit_loss(self):
         """ Report the user's profit or loss at any point in time. """
-        return self.calculate_profit_loss()
+        return self.calculate_profit_loss(self.calculate_portfolio_value())
 
     def list_transactions(self):
         """ List all transactions made by the user. """
         return [transaction.model_dump() for transaction in self.transactions]
     
-    def report(self) -> str:
-        """ Return a json string representing the account.  """
+    def record_portfolio_value(self) -> float:
+        """ Value the portfolio now and add it to the time series. """
         portfolio_value = self.calculate_portfolio_value()
-        self.portfolio_value_time_series.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value))
-        self.save()
-        pnl = self.calculate_profit_loss(portfolio_value)
-        data = self.model_dump()
-        data["total_portfolio_value"] = portfolio_value
-        data["total_profit_loss"] = pnl
+        timestamp = current_time().strftime("%Y-%m-%d %H:%M:%S")
+        self.portfolio_value_time_series.append((timestamp, portfolio_value))
+        write_portfolio_value(self.name, timestamp, portfolio_value)
+        return portfolio_value
+
+    def report(self) -> str:
+        """ Return a json string summarizing the account, from its running totals, holdings and latest transactions. """
+        portfolio_value = self.record_portfolio_value()
+        data = {
+            "name": self.name,
+            "balance": self.balance,
+            "strategy": self.strategy,
+            "holdings": self.holdings,
+            "total_portfolio_value": portfolio_value,
+            "total_profit_loss": self.calculate_profit_loss(portfolio_value),
+            "realized_profit_loss": self._realized_profit_loss,
+            "unrealized_profit_loss": self.calculate_unrealized_profit_loss(portfolio_value),
+            "average_prices": self.get_average_prices(),
+            "transaction_count": len(self.transactions),
+            "recent_transactions": [transaction.model_dump() for transaction in self.transactions[-REPORT_TRANSACTIONS:]],
+        }
         write_log(self.name, "account", f"Retrieved account details")
         return json.dumps(data)
     
@@ -170,7 +270,7 @@ class Account(BaseModel):
     def change_strategy(self, strategy: str) -> str:
         """ At your discretion, if you choose to, call this to change your investment strategy for the future """
         self.strategy = strategy
-        self.save()
+        self.save_details()
         write_log(self.name, "account", f"Changed strategy")
         return "Changed strategy"
 
@@ -1,39 +1,122 @@
 import mcp
 from mcp.client.stdio import stdio_client
+from mcp.shared.memory import create_connected_server_and_client_session
 from mcp import StdioServerParameters
 from agents import FunctionTool
+from contextlib import asynccontextmanager
+import anyio
+import asyncio
 import json
 
 params = StdioServerParameters(command="uv", args=["run", "accounts_server.py"], env=None)
 
 
+class AccountsSession:
+    """
+    One long-lived accounts_server process and MCP session, shared by every caller.
+    ClientSession matches responses to request ids, so concurrent calls are multiplexed over it.
+    The process is started on first use and restarted if it has died.
+    Given an in-process FastMCP server instead, as in a backtest, it talks to that over memory streams.
+    """
+
+    def __init__(self, server_params: StdioServerParameters = params, server=None):
+        self.server_params = server_params
+        self.server = server
+        self.session = None
+        self.error = None
+        self.task = None
+        self.loop = None
+        self.ready = None
+        self.closing = None
+        self.lock = None
+
+    @asynccontextmanager
+    async def connect(self):
+        if self.server is not None:
+            async with create_connected_server_and_client_session(self.server) as session:
+                yield session
+        else:
+            async with stdio_client(self.server_params) as streams:
+                async with mcp.ClientSession(*streams) as session:
+                    await session.initialize()
+                    yield session
+
+    async def serve(self):
+        # The stdio and session contexts must be entered and exited by the same task, so this task owns them
+        try:
+            async with self.connect() as session:
+                self.session = session
+                self.ready.set()
+                await self.closing.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.session = None
+            self.ready.set()
+
+    async def get(self) -> mcp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.lock = asyncio.Lock()
+            self.task = None
+        async with self.lock:
+            if self.session is None or self.task is None or self.task.done():
+                self.error = None
+                self.ready = asyncio.Event()
+                self.closing = asyncio.Event()
+                self.task = asyncio.create_task(self.serve())
+                await self.ready.wait()
+                if self.session is None:
+                    raise RuntimeError(f"Could not start the accounts server: {self.error}")
+            return self.session
+
+    async def request(self, send):
+        """Run send(session), reconnecting and retrying once if the server had gone away before it was sent"""
+        session = await self.get()
+        try:
+            return await send(session)
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            await self.close()
+            session = await self.get()
+            return await send(session)
+
+    async def close(self):
+        if self.task and self.loop is asyncio.get_running_loop():
+            self.closing.set()
+            await self.task
+        self.task = None
+        self.session = None
+
+
+accounts_session = AccountsSession()
+
+
+async def use_accounts_server(server) -> None:
+    """Talk to an in-process FastMCP accounts server rather than a subprocess, as in a backtest; None restores it"""
+    await accounts_session.close()
+    accounts_session.server = server
+
+
 async def list_accounts_tools():
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            tools_result = await session.list_tools()
-            return tools_result.tools
-        
+    tools_result = await accounts_session.request(lambda session: session.list_tools())
+    return tools_result.tools
+
 async def call_accounts_tool(tool_name, tool_args):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.call_tool(tool_name, tool_args)
-            return result
-            
+    return await accounts_session.request(lambda session: session.call_tool(tool_name, tool_args))
+
 async def read_accounts_resource(name):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.read_resource(f"accounts://accounts_server/{name}")
-            return result.contents[0].text
-        
+    result = await accounts_session.request(
+        lambda session: session.read_resource(f"accounts://accounts_server/{name}")
+    )
+    return result.contents[0].text
+
 async def read_strategy_resource(name):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.read_resource(f"accounts://strategy/{name}")
-            return result.contents[0].text
+    result = await accounts_session.request(lambda session: session.read_resource(f"accounts://strategy/{name}"))
+    return result.contents[0].text
+
+async def close_accounts_session():
+    await accounts_session.close()
 
 async def get_accounts_tools_openai():
     openai_tools = []
@@ -44,7 +127,7 @@ async def get_accounts_tools_openai():
             description=tool.description,
             params_json_schema=schema,
             on_invoke_tool=lambda ctx, args, toolname=tool.name: call_accounts_tool(toolname, json.loads(args))
-                
+
         )
         openai_tools.append(openai_tool)
-    return openai_tools
\ No newline at end of file
+    return openai_tools
@@ -0,0 +1,329 @@
+"""
+Replay the trading floor against historical daily bars, as fast as the machine allows.
+
+The real Trader agents run each simulated day, but each one's LLM is replaced by a scripted model:
+a rule that looks at the day's prices and indicators and places its orders as tool calls through
+the accounts server. The accounts and market servers run in-process, and the market clock and
+share prices are driven by the simulation, so results are deterministic.
+
+Run with: uv run backtest.py 2024-01-01 2024-12-31 [--csv bars.csv] [--fake]
+"""
+
+import os
+
+# Keep simulated accounts away from the live traders' accounts.db
+os.environ.setdefault("ACCOUNTS_DB", "backtest.db")
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+import pandas as pd
+from agents import Model, ModelResponse, Usage, set_tracing_disabled
+from agents.mcp import MCPServer
+from mcp.shared.memory import create_connected_server_and_client_session
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputItemDoneEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+)
+import accounts_client
+import accounts_server
+import market
+import market_server
+from accounts import Account, SPREAD
+from market_history import get_bars, compute_indicators, load_bars_csv
+from traders import Trader
+
+DEFAULT_SYMBOLS = ["SPY", "AAPL", "MSFT", "NVDA", "AMZN", "TSLA"]
+WARMUP_DAYS = 60
+REBALANCE_EVERY_N_DAYS = 20
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.time = datetime.now()
+
+    def __call__(self) -> datetime:
+        return self.time
+
+
+class HistoricalPriceFeed:
+    """Prices each symbol at its most recent close on or before the simulated date"""
+
+    def __init__(self, closes: pd.DataFrame, clock: SimulatedClock):
+        self.closes = closes.ffill()
+        self.clock = clock
+
+    def __call__(self, symbols: list[str]) -> dict[str, float]:
+        row = self.closes.asof(pd.Timestamp(self.clock().date()))
+        return {symbol: float(row.get(symbol, 0.0) or 0.0) for symbol in symbols}
+
+
+@dataclass
+class MarketDay:
+    """What a scripted trader can see on a given day"""
+
+    index: int
+    prices: pd.Series
+    sma: pd.Series
+    rsi: pd.Series
+
+
+@dataclass
+class Simulation:
+    """The simulated clock, and the market day the scripted models are trading"""
+
+    clock: SimulatedClock
+    today: MarketDay | None = None
+
+
+class ScriptedModel(Model):
+    """
+    Stands in for a Trader's LLM. On the first turn of each run, rule(account, day) decides the orders
+    as {symbol: signed quantity}; they are then placed one tool call per turn, sells first so that the
+    proceeds are available for buys, and the run ends with a short summary.
+    """
+
+    def __init__(self, name: str, rule: Callable[[Account, "MarketDay"], dict[str, int]], simulation: "Simulation"):
+        self.name = name
+        self.rule = rule
+        self.simulation = simulation
+        self.pending: list[tuple[str, int]] = []
+        self.calls = 0
+
+    def orders(self) -> list[tuple[str, int]]:
+        orders = self.rule(Account.get(self.name), self.simulation.today)
+        return sorted(((symbol, quantity) for symbol, quantity in orders.items() if quantity), key=lambda order: order[1])
+
+    def tool_call(self, symbol: str, quantity: int) -> ResponseFunctionToolCall:
+        arguments = {"name": self.name, "symbol": symbol, "quantity": abs(quantity), "rationale": "Backtest"}
+        return ResponseFunctionToolCall(
+            type="function_call",
+            id=f"fc_{self.calls}",
+            call_id=f"call_{self.calls}",
+            name="buy_shares" if quantity > 0 else "sell_shares",
+            arguments=json.dumps(arguments),
+        )
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        self.calls += 1
+        if isinstance(input, str) or not any(item.get("type") == "function_call_output" for item in input):
+            self.pending = self.orders()
+        if self.pending:
+            output = self.tool_call(*self.pending.pop(0))
+        else:
+            text = ResponseOutputText(type="output_text", text="Orders placed for the day.", annotations=[])
+            output = ResponseOutputMessage(id="msg", type="message", role="assistant", status="completed", content=[text])
+        return ModelResponse(output=[output], usage=Usage(), response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        """The same scripted turn as get_response, streamed as each output item and then the completed response"""
+        response = await self.get_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing)
+        for index, item in enumerate(response.output):
+            yield ResponseOutputItemDoneEvent(type="response.output_item.done", item=item, output_index=index, sequence_number=index)
+        completed = Response(
+            id=f"resp_{self.calls}",
+            created_at=time.time(),
+            model="scripted",
+            object="response",
+            output=response.output,
+            tool_choice="auto",
+            tools=[],
+            parallel_tool_calls=False,
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=completed, sequence_number=len(response.output))
+
+
+class InProcessMCPServer(MCPServer):
+    """Serves a FastMCP server's tools over memory streams, so they share the simulation's clock and prices"""
+
+    def __init__(self, server):
+        super().__init__()
+        self.server = server
+        self.session = None
+        self.exit_stack = AsyncExitStack()
+
+    @property
+    def name(self) -> str:
+        return self.server.name
+
+    async def connect(self):
+        self.session = await self.exit_stack.enter_async_context(create_connected_server_and_client_session(self.server))
+
+    async def cleanup(self):
+        await self.exit_stack.aclose()
+        self.session = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.cleanup()
+
+    async def list_tools(self, run_context=None, agent=None):
+        return (await self.session.list_tools()).tools
+
+    async def call_tool(self, tool_name, arguments):
+        return await self.session.call_tool(tool_name, arguments)
+
+    async def list_prompts(self):
+        return await self.session.list_prompts()
+
+    async def get_prompt(self, name, arguments=None):
+        return await self.session.get_prompt(name, arguments)
+
+
+def affordable(cash: float, price: float) -> int:
+    return int(cash // (price * (1 + SPREAD))) if price > 0 else 0
+
+
+def buy_and_hold(account: Account, day: MarketDay) -> dict[str, int]:
+    if account.holdings:
+        return {}
+    prices = day.prices.dropna()
+    budget = account.balance / len(prices)
+    return {symbol: affordable(budget, price) for symbol, price in prices.items()}
+
+
+def contrarian(account: Account, day: MarketDay) -> dict[str, int]:
+    orders = {}
+    for symbol, rsi in day.rsi.dropna().items():
+        if rsi > 70 and account.holdings.get(symbol):
+            orders[symbol] = -account.holdings[symbol]
+        elif rsi < 30:
+            orders[symbol] = affordable(account.balance / 4, day.prices[symbol])
+    return orders
+
+
+def equal_weight(account: Account, day: MarketDay) -> dict[str, int]:
+    if day.index % REBALANCE_EVERY_N_DAYS:
+        return {}
+    prices = day.prices.dropna()
+    value = account.balance + sum(prices.get(symbol, 0.0) * quantity for symbol, quantity in account.holdings.items())
+    target = value / len(prices) * (1 - SPREAD)
+    return {symbol: int(target // price) - account.holdings.get(symbol, 0) for symbol, price in prices.items()}
+
+
+def momentum(account: Account, day: MarketDay) -> dict[str, int]:
+    orders = {}
+    trending = day.prices > day.sma
+    for symbol, quantity in account.holdings.items():
+        if not trending.get(symbol, False):
+            orders[symbol] = -quantity
+    buys = [symbol for symbol, up in trending.items() if up and symbol not in account.holdings]
+    for symbol in buys:
+        orders[symbol] = affordable(account.balance / len(buys), day.prices[symbol])
+    return orders
+
+
+RULES = {
+    "Warren": ("Scripted: buy equal amounts on day one and hold", buy_and_hold),
+    "George": ("Scripted: buy oversold (RSI < 30), sell overbought (RSI > 70)", contrarian),
+    "Ray": (f"Scripted: rebalance to equal weights every {REBALANCE_EVERY_N_DAYS} days", equal_weight),
+    "Cathie": ("Scripted: hold whatever closes above its 20 day moving average", momentum),
+}
+
+
+def scripted_traders(rules: dict, simulation: Simulation) -> list[Trader]:
+    """Real Traders, each with a ScriptedModel playing its rule in place of an LLM"""
+    return [
+        Trader(name, model_name="scripted", model=ScriptedModel(name, rule, simulation))
+        for name, (_, rule) in rules.items()
+    ]
+
+
+def load_history(symbols: list[str], start: str, end: str) -> dict[str, pd.DataFrame]:
+    """Closes, SMA and RSI for every symbol as date x symbol frames, computed once up front"""
+    warmup_start = (datetime.strptime(start, "%Y-%m-%d") - timedelta(days=WARMUP_DAYS)).strftime("%Y-%m-%d")
+    indicators = {symbol: compute_indicators(get_bars(symbol, warmup_start, end)) for symbol in symbols}
+    return {
+        column: pd.DataFrame({symbol: df[column] for symbol, df in indicators.items()}).sort_index()
+        for column in ["close", "sma", "rsi"]
+    }
+
+
+async def run_backtest(start: str, end: str, symbols: list[str], rules: dict = RULES) -> tuple[pd.DataFrame, dict]:
+    """
+    Simulate every trading day from start to end inclusive, running each trader once a day.
+    rules maps each trader's name to its (strategy, rule).
+    Returns the traders' daily closing portfolio values (date x trader) and throughput stats.
+    """
+    history = load_history(symbols, start, end)
+    closes = history["close"]
+    dates = closes.loc[start:end].index
+    simulation = Simulation(SimulatedClock())
+    traders = scripted_traders(rules, simulation)
+    market.use_clock(simulation.clock)
+    market.use_price_feed(HistoricalPriceFeed(closes, simulation.clock))
+    set_tracing_disabled(True)
+    # The in-process servers would otherwise log every request
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+    equity = {trader.name: [] for trader in traders}
+    began = time.perf_counter()
+    try:
+        await accounts_client.use_accounts_server(accounts_server.mcp)
+        async with AsyncExitStack() as stack:
+            trader_mcp_servers = [
+                await stack.enter_async_context(InProcessMCPServer(server))
+                for server in (accounts_server.mcp, market_server.mcp)
+            ]
+            for name, (strategy, _) in rules.items():
+                Account.get(name).reset(strategy)
+            for index, date in enumerate(dates):
+                simulation.clock.time = date.to_pydatetime().replace(hour=16)
+                simulation.today = MarketDay(index, closes.loc[date], history["sma"].loc[date], history["rsi"].loc[date])
+                for trader in traders:
+                    await trader.run(trader_mcp_servers, [])
+                    equity[trader.name].append(Account.get(trader.name).record_portfolio_value())
+    finally:
+        await accounts_client.use_accounts_server(None)
+        market.use_clock(None)
+        market.use_price_feed(None)
+    elapsed = time.perf_counter() - began
+    orders_placed = sum(len(Account.get(name).transactions) for name in rules)
+    stats = {
+        "simulated_days": len(dates),
+        "orders_placed": orders_placed,
+        "model_calls": sum(trader.model.calls for trader in traders),
+        "seconds": elapsed,
+        "simulated_days_per_second": len(dates) / elapsed if elapsed else 0.0,
+    }
+    return pd.DataFrame(equity, index=dates), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the traders, with scripted models, against historical daily bars")
+    parser.add_argument("start", help="first date, YYYY-MM-DD")
+    parser.add_argument("end", help="last date, YYYY-MM-DD")
+    parser.add_argument("--symbols", default=",".join(DEFAULT_SYMBOLS), help="comma separated symbols")
+    parser.add_argument("--csv", help="load daily bars from this CSV file first")
+    parser.add_argument("--fake", action="store_true", help="use generated bars instead of polygon")
+    parser.add_argument("--output", help="write the equity curves to this CSV file")
+    args = parser.parse_args()
+
+    if args.fake:
+        market.use_polygon_client(market.FakePolygonClient())
+    if args.csv:
+        print(f"Loaded {load_bars_csv(args.csv)} bars from {args.csv}")
+    equity, stats = asyncio.run(run_backtest(args.start, args.end, args.symbols.split(",")))
+    if args.output:
+        equity.to_csv(args.output)
+    print(equity.iloc[[0, -1]].round(2).to_string() if len(equity) else "No trading days in range")
+    print(
+        f"{stats['simulated_days']} days, {stats['model_calls']} model calls, {stats['orders_placed']} orders in {stats['seconds']:.2f}s "
+        f"({stats['simulated_days_per_second']:.1f} simulated days per second)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import mcp
+from mcp import StdioServerParameters
+from mcp.client.stdio import stdio_client
+import accounts_client
+
+# The real accounts server, started with this interpreter rather than uv, on a scratch database
+server_params = StdioServerParameters(
+    command=sys.executable,
+    args=["accounts_server.py"],
+    env={**os.environ, "ACCOUNTS_DB": os.path.join(tempfile.mkdtemp(prefix="bench_accounts_client_"), "accounts.db")},
+    cwd=os.path.dirname(os.path.abspath(__file__)),
+)
+CALLS = 50
+
+
+async def fresh_process_per_call() -> None:
+    """How every call worked before: start the server, initialize a session, make one request"""
+    async with stdio_client(server_params) as streams:
+        async with mcp.ClientSession(*streams) as session:
+            await session.initialize()
+            await session.call_tool("get_balance", {"name": "bench"})
+
+
+async def main() -> None:
+    started = time.perf_counter()
+    for _ in range(5):
+        await fresh_process_per_call()
+    print(f"fresh process per call          {(time.perf_counter() - started) / 5 * 1000:8.1f} ms/call")
+
+    accounts_client.accounts_session.server_params = server_params
+    started = time.perf_counter()
+    await accounts_client.call_accounts_tool("get_balance", {"name": "bench"})
+    print(f"persistent session, first call  {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        await accounts_client.call_accounts_tool("get_balance", {"name": "bench"})
+    print(f"persistent session, sequential  {(time.perf_counter() - started) / CALLS * 1000:8.1f} ms/call")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(accounts_client.call_accounts_tool("get_balance", {"name": "bench"}) for _ in range(CALLS)))
+    print(f"persistent session, {CALLS} at once {(time.perf_counter() - started) / CALLS * 1000:8.1f} ms/call")
+    await accounts_client.close_accounts_session()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Measure against a scratch database, never the traders' accounts.db
+SCRATCH = tempfile.mkdtemp(prefix="bench_database_")
+os.environ["ACCOUNTS_DB"] = os.path.join(SCRATCH, "accounts.db")
+
+import database
+
+N = 2000
+
+
+def per_call(label: str, seconds: float, n: int) -> None:
+    print(f"{label:<40} {seconds / n * 1e6:8.0f} us/op")
+
+
+def bench_connections(n: int = N) -> None:
+    """write_log and read_log on the pooled connection, against opening a fresh connection for every write as before"""
+    started = time.perf_counter()
+    for i in range(n):
+        database.write_log("bench", "test", f"message {i}")
+    per_call("write_log, pooled connection", time.perf_counter() - started, n)
+
+    started = time.perf_counter()
+    for _ in range(n):
+        list(database.read_log("bench", 13))
+    per_call("read_log, pooled connection", time.perf_counter() - started, n)
+
+    started = time.perf_counter()
+    for i in range(n):
+        with sqlite3.connect(database.DB) as conn:
+            conn.execute(
+                "INSERT INTO logs (name, datetime, type, message) VALUES (?, datetime('now'), ?, ?)",
+                ("bench", "test", f"message {i}"),
+            )
+        conn.close()
+    per_call("write_log, fresh connection per call", time.perf_counter() - started, n)
+
+
+def bench_log_sink(n: int = 20 * N) -> None:
+    """Log entries written one transaction each, against queued on a LogSink and written in batches"""
+    started = time.perf_counter()
+    for i in range(n):
+        database.write_log("bench", "span", f"Started span {i}")
+    per_call("write_log per entry", time.perf_counter() - started, n)
+
+    sink = database.LogSink()
+    started = time.perf_counter()
+    for i in range(n):
+        sink.write("bench", "span", f"Started span {i}")
+    per_call("LogSink.write (enqueue only)", time.perf_counter() - started, n)
+    sink.flush()
+    per_call("LogSink.write including the final flush", time.perf_counter() - started, n)
+    sink.shutdown()
+
+
+BENCHMARKS = {"connections": bench_connections, "log_sink": bench_log_sink}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"== {name}")
+        BENCHMARKS[name]()
@@ -1,16 +1,167 @@
 import sqlite3
 import json
-from datetime import datetime
+import os
+import threading
+import atexit
+import queue
+import time
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
-DB = "accounts.db"
+DB = os.getenv("ACCOUNTS_DB", "accounts.db")
 
+# Connection tuning: WAL lets the Gradio log reader run alongside the traders' writers,
+# and busy_timeout makes a writer wait for the lock rather than fail with "database is locked"
+BUSY_TIMEOUT_MS = 5_000
+CACHED_STATEMENTS = 256
 
-with sqlite3.connect(DB) as conn:
+_local = threading.local()
+_connections: list[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Return the connection for the current thread, opening and tuning it on first use.
+
+    Each thread (and so every asyncio task running on that thread) reuses one connection,
+    so sqlite's per-connection statement cache turns repeated queries into prepared statements.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        # check_same_thread=False only so close_connections can close it from the exiting thread
+        conn = sqlite3.connect(
+            DB, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=CACHED_STATEMENTS, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        _local.conn = conn
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+
+def close_connections() -> None:
+    """Close every pooled connection; called automatically at interpreter exit."""
+    with _connections_lock:
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
+    _local.__dict__.clear()
+
+
+atexit.register(close_connections)
+
+
+def _replace_account(conn: sqlite3.Connection, name: str, account_dict: dict) -> None:
+    """
+    Overwrite every row belonging to the account with the contents of account_dict.
+
+    The running totals (net_spend, realized_profit_loss and cost_basis per symbol) are optional;
+    without them they are stored as NULL, and the account rebuilds them from its transactions once on load.
+    """
+    conn.execute('''
+        INSERT INTO account_details (name, balance, strategy, net_spend, realized_profit_loss)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            balance=excluded.balance,
+            strategy=excluded.strategy,
+            net_spend=excluded.net_spend,
+            realized_profit_loss=excluded.realized_profit_loss
+    ''', (
+        name,
+        account_dict["balance"],
+        account_dict["strategy"],
+        account_dict.get("net_spend"),
+        account_dict.get("realized_profit_loss"),
+    ))
+    for table in ("holdings", "transactions", "portfolio_values"):
+        conn.execute(f'DELETE FROM {table} WHERE name = ?', (name,))
+    cost_basis = account_dict.get("cost_basis") or {}
+    conn.executemany(
+        'INSERT INTO holdings (name, symbol, quantity, cost_basis) VALUES (?, ?, ?, ?)',
+        [(name, symbol, quantity, cost_basis.get(symbol)) for symbol, quantity in account_dict["holdings"].items()],
+    )
+    conn.executemany('''
+        INSERT INTO transactions (name, symbol, quantity, price, timestamp, rationale)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [
+        (name, t["symbol"], t["quantity"], t["price"], t["timestamp"], t["rationale"])
+        for t in account_dict["transactions"]
+    ])
+    conn.executemany(
+        'INSERT INTO portfolio_values (name, timestamp, value) VALUES (?, ?, ?)',
+        [(name, timestamp, value) for timestamp, value in account_dict["portfolio_value_time_series"]],
+    )
+
+
+def migrate_json_accounts(conn: sqlite3.Connection) -> None:
+    """Move accounts stored as a JSON blob in the legacy accounts table into the relational tables"""
+    rows = conn.execute('''
+        SELECT name, account FROM accounts
+        WHERE name NOT IN (SELECT name FROM account_details)
+    ''').fetchall()
+    for name, account in rows:
+        _replace_account(conn, name, json.loads(account))
+
+
+def add_missing_columns(conn: sqlite3.Connection, table: str, columns: dict[str, str]) -> None:
+    """Add columns introduced after the table was first created in an existing database"""
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for column, type in columns.items():
+        if column not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {type}')
+
+
+with get_connection() as conn:
     cursor = conn.cursor()
+    # Legacy table: one JSON blob per account, now only read by migrate_json_accounts
     cursor.execute('CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, account TEXT)')
+    # net_spend and realized_profit_loss are running totals kept by Account; NULL until first computed
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS account_details (
+            name TEXT PRIMARY KEY,
+            balance REAL,
+            strategy TEXT,
+            net_spend REAL,
+            realized_profit_loss REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS holdings (
+            name TEXT,
+            symbol TEXT,
+            quantity INTEGER,
+            cost_basis REAL,
+            PRIMARY KEY (name, symbol)
+        )
+    ''')
+    add_missing_columns(conn, "account_details", {"net_spend": "REAL", "realized_profit_loss": "REAL"})
+    add_missing_columns(conn, "holdings", {"cost_basis": "REAL"})
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            symbol TEXT,
+            quantity INTEGER,
+            price REAL,
+            timestamp TEXT,
+            rationale TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_name_timestamp ON transactions (name, timestamp)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio_values (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            timestamp TEXT,
+            value REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_portfolio_values_name_timestamp ON portfolio_values (name, timestamp)')
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -20,82 +171,296 @@ with sqlite3.connect(DB) as conn:
             message TEXT
         )
     ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_name_datetime ON logs (name, datetime)')
     cursor.execute('CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)')
-    conn.commit()
+    # Daily bars clustered by (symbol, date), so a symbol's history is one contiguous range scan;
+    # synthetic marks generated bars, from FakePolygonClient, which only offline runs may read
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bars (
+            symbol TEXT,
+            date TEXT,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            synthetic INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (symbol, date)
+        ) WITHOUT ROWID
+    ''')
+    add_missing_columns(conn, "bars", {"synthetic": "INTEGER NOT NULL DEFAULT 0"})
+    migrate_json_accounts(conn)
 
 def write_account(name, account_dict):
-    json_data = json.dumps(account_dict)
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO accounts (name, account)
-            VALUES (?, ?)
-            ON CONFLICT(name) DO UPDATE SET account=excluded.account
-        ''', (name.lower(), json_data))
-        conn.commit()
+    """Replace the whole account; trades and valuations use the append-only writers below"""
+    with get_connection() as conn:
+        _replace_account(conn, name.lower(), account_dict)
 
 def read_account(name):
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT account FROM accounts WHERE name = ?', (name.lower(),))
-        row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
-    
+    name = name.lower()
+    conn = get_connection()
+    row = conn.execute(
+        'SELECT balance, strategy, net_spend, realized_profit_loss FROM account_details WHERE name = ?', (name,)
+    ).fetchone()
+    if not row:
+        return None
+    holdings = conn.execute('SELECT symbol, quantity, cost_basis FROM holdings WHERE name = ?', (name,)).fetchall()
+    transactions = conn.execute('''
+        SELECT symbol, quantity, price, timestamp, rationale FROM transactions
+        WHERE name = ?
+        ORDER BY id
+    ''', (name,)).fetchall()
+    portfolio_values = conn.execute(
+        'SELECT timestamp, value FROM portfolio_values WHERE name = ? ORDER BY id', (name,)
+    ).fetchall()
+    return {
+        "name": name,
+        "balance": row[0],
+        "strategy": row[1],
+        "holdings": {symbol: quantity for symbol, quantity, _ in holdings},
+        "net_spend": row[2],
+        "realized_profit_loss": row[3],
+        # None when the account's totals have never been stored
+        "cost_basis": None if row[2] is None else {symbol: cost_basis or 0.0 for symbol, _, cost_basis in holdings},
+        "transactions": [
+            {"symbol": symbol, "quantity": quantity, "price": price, "timestamp": timestamp, "rationale": rationale}
+            for symbol, quantity, price, timestamp, rationale in transactions
+        ],
+        "portfolio_value_time_series": portfolio_values,
+    }
+
+def write_account_details(name: str, balance: float, strategy: str) -> None:
+    with get_connection() as conn:
+        conn.execute(
+            'UPDATE account_details SET balance = ?, strategy = ? WHERE name = ?',
+            (balance, strategy, name.lower()),
+        )
+
+def write_trade(
+    name: str,
+    balance: float,
+    holding: int,
+    transaction: dict,
+    cost_basis: float,
+    net_spend: float,
+    realized_profit_loss: float,
+) -> None:
+    """
+    Record a trade: append the transaction and update the balance, the running totals and the one holding it changed.
+
+    Args:
+        name (str): The account name
+        balance (float): The cash balance after the trade
+        holding (int): The number of shares of transaction["symbol"] held after the trade
+        transaction (dict): The transaction to append
+        cost_basis (float): The cost basis of the shares of transaction["symbol"] held after the trade
+        net_spend (float): The total spent on trades, net of proceeds, after the trade
+        realized_profit_loss (float): The profit or loss locked in by sales, after the trade
+    """
+    name = name.lower()
+    symbol = transaction["symbol"]
+    with get_connection() as conn:
+        conn.execute(
+            'UPDATE account_details SET balance = ?, net_spend = ?, realized_profit_loss = ? WHERE name = ?',
+            (balance, net_spend, realized_profit_loss, name),
+        )
+        if holding:
+            conn.execute('''
+                INSERT INTO holdings (name, symbol, quantity, cost_basis)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(name, symbol) DO UPDATE SET quantity=excluded.quantity, cost_basis=excluded.cost_basis
+            ''', (name, symbol, holding, cost_basis))
+        else:
+            conn.execute('DELETE FROM holdings WHERE name = ? AND symbol = ?', (name, symbol))
+        conn.execute('''
+            INSERT INTO transactions (name, symbol, quantity, price, timestamp, rationale)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, symbol, transaction["quantity"], transaction["price"], transaction["timestamp"], transaction["rationale"]))
+
+def write_portfolio_value(name: str, timestamp: str, value: float) -> None:
+    with get_connection() as conn:
+        conn.execute(
+            'INSERT INTO portfolio_values (name, timestamp, value) VALUES (?, ?, ?)',
+            (name.lower(), timestamp, value),
+        )
+
 def write_log(name: str, type: str, message: str):
     """
     Write a log entry to the logs table.
-    
+
     Args:
         name (str): The name associated with the log
         type (str): The type of log entry
         message (str): The log message
     """
-    now = datetime.now().isoformat()
-    
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
+    with get_connection() as conn:
+        conn.execute('''
             INSERT INTO logs (name, datetime, type, message)
             VALUES (?, datetime('now'), ?, ?)
         ''', (name.lower(), type, message))
-        conn.commit()
+
+def write_logs(entries: list[tuple[str, str, str, str]]):
+    """
+    Write a batch of log entries to the logs table in a single transaction.
+
+    Args:
+        entries (list): Tuples of (name, datetime, type, message), with datetime as 'YYYY-MM-DD HH:MM:SS' UTC
+    """
+    with get_connection() as conn:
+        conn.executemany('''
+            INSERT INTO logs (name, datetime, type, message)
+            VALUES (?, ?, ?, ?)
+        ''', [(name.lower(), when, type, message) for name, when, type, message in entries])
+
+
+_STOP = object()
+
+
+class LogSink:
+    """
+    A bounded in-memory buffer of log entries, drained by a background thread that writes them
+    with write_logs once max_batch_size entries are waiting or flush_interval seconds have passed.
+    Writers never wait: while the buffer is full, new entries are dropped and counted in dropped.
+    """
+
+    def __init__(self, max_queue_size: int = 10_000, max_batch_size: int = 500, flush_interval: float = 0.5):
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.closed = False
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self.thread.start()
+        atexit.register(self.shutdown)
+
+    def write(self, name: str, type: str, message: str) -> None:
+        """Queue a log entry, stamped now; never blocks, dropping the entry if the buffer is full"""
+        if self.closed:
+            write_log(name, type, message)
+            return
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            self.queue.put_nowait((name, now, type, message))
+        except queue.Full:
+            # Called on the event loop's thread, which must not wait for a backed-up writer
+            self.dropped += 1
+            if self.dropped == 1:
+                print("Log buffer is full; dropping log entries until the writer catches up")
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Block until everything queued before this call has been written"""
+        if self.closed:
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def shutdown(self, timeout: float | None = 5.0) -> None:
+        """Write whatever is buffered and stop the background thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+    def _run(self) -> None:
+        batch = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if isinstance(item, tuple):
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.max_batch_size:
+                    continue
+            if batch:
+                try:
+                    write_logs(batch)
+                except Exception as e:
+                    print(f"Failed to write {len(batch)} log entries: {e}")
+                batch = []
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
 
 def read_log(name: str, last_n=10):
     """
     Read the most recent log entries for a given name.
-    
+
     Args:
         name (str): The name to retrieve logs for
         last_n (int): Number of most recent entries to retrieve
-        
+
     Returns:
         list: A list of tuples containing (datetime, type, message)
     """
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT datetime, type, message FROM logs 
-            WHERE name = ? 
-            ORDER BY datetime DESC
-            LIMIT ?
-        ''', (name.lower(), last_n))
-        
-        return reversed(cursor.fetchall())
+    conn = get_connection()
+    cursor = conn.execute('''
+        SELECT datetime, type, message FROM logs
+        WHERE name = ?
+        ORDER BY datetime DESC
+        LIMIT ?
+    ''', (name.lower(), last_n))
+    return reversed(cursor.fetchall())
 
 def write_market(date: str, data: dict) -> None:
     data_json = json.dumps(data)
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
+    with get_connection() as conn:
+        conn.execute('''
             INSERT INTO market (date, data)
             VALUES (?, ?)
             ON CONFLICT(date) DO UPDATE SET data=excluded.data
         ''', (date, data_json))
-        conn.commit()
 
 def read_market(date: str) -> dict | None:
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT data FROM market WHERE date = ?', (date,))
-        row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
\ No newline at end of file
+    conn = get_connection()
+    row = conn.execute('SELECT data FROM market WHERE date = ?', (date,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def write_bars(bars: list[tuple[str, str, float, float, float, float, float]], synthetic: bool = False) -> None:
+    """
+    Insert or replace daily bars. Synthetic bars never replace real ones.
+
+    Args:
+        bars (list): Tuples of (symbol, date, open, high, low, close, volume), with date as 'YYYY-MM-DD'
+        synthetic (bool): Whether the bars were generated rather than fetched or loaded
+    """
+    with get_connection() as conn:
+        conn.executemany('''
+            INSERT INTO bars (symbol, date, open, high, low, close, volume, synthetic)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (symbol, date) DO UPDATE SET
+                open = excluded.open,
+                high = excluded.high,
+                low = excluded.low,
+                close = excluded.close,
+                volume = excluded.volume,
+                synthetic = excluded.synthetic
+            WHERE bars.synthetic OR NOT excluded.synthetic
+        ''', [(*bar, int(synthetic)) for bar in bars])
+
+def read_bars(
+    symbol: str, start: str, end: str, synthetic: bool = False
+) -> list[tuple[str, float, float, float, float, float]]:
+    """
+    Read the daily bars for a symbol between two dates inclusive, oldest first.
+
+    Args:
+        synthetic (bool): Whether to include generated bars as well as real ones
+
+    Returns:
+        list: Tuples of (date, open, high, low, close, volume)
+    """
+    conn = get_connection()
+    return conn.execute('''
+        SELECT date, open, high, low, close, volume FROM bars
+        WHERE symbol = ? AND date BETWEEN ? AND ? AND synthetic <= ?
+        ORDER BY date
+    ''', (symbol, start, end, int(synthetic))).fetchall()
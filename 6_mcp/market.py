@@ -1,9 +1,12 @@
 from polygon import RESTClient
 from dotenv import load_dotenv
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
-from database import write_market, read_market
+import threading
+import time
+from types import SimpleNamespace
+from database import write_market, read_market, write_bars
 from functools import lru_cache
 from datetime import timezone
 
@@ -15,24 +18,184 @@ polygon_plan = os.getenv("POLYGON_PLAN")
 is_paid_polygon = polygon_plan == "paid"
 is_realtime_polygon = polygon_plan == "realtime"
 
+# How long a looked-up price may be reused, by plan: end of day prices only change once a day,
+# the paid plan is already 15 minutes delayed, and realtime should stay close to the tape
+PRICE_CACHE_TTL_SECONDS = {"eod": 15 * 60, "paid": 60, "realtime": 1}
+
+if is_realtime_polygon:
+    price_cache_ttl = PRICE_CACHE_TTL_SECONDS["realtime"]
+elif is_paid_polygon:
+    price_cache_ttl = PRICE_CACHE_TTL_SECONDS["paid"]
+else:
+    price_cache_ttl = PRICE_CACHE_TTL_SECONDS["eod"]
+price_cache_ttl = float(os.getenv("PRICE_CACHE_TTL_SECONDS", price_cache_ttl))
+
+# The market status only changes at the open and close, so one check serves every trader for a while
+MARKET_STATUS_TTL_SECONDS = 5 * 60
+
+_polygon_client = None
+_price_feed = None
+_clock = None
+_price_cache: dict[str, tuple[float, float]] = {}
+_price_cache_lock = threading.Lock()
+_market_status: tuple[bool, float] | None = None
+
+
+class FakePolygonClient:
+    """
+    An offline stand-in for polygon's RESTClient, covering the calls made in this module.
+    Prices are stable per symbol so results are repeatable; calls counts requests made.
+    """
+
+    def __init__(self, symbols: list[str] | None = None, market_open: bool = True):
+        self.symbols = symbols or ["AAPL", "AMZN", "GOOGL", "META", "MSFT", "NVDA", "SPY", "TSLA"]
+        self.market_open = market_open
+        self.calls = 0
+
+    def price(self, symbol: str) -> float:
+        return round(random.Random(symbol).uniform(10, 500), 2)
+
+    def get_market_status(self):
+        self.calls += 1
+        return SimpleNamespace(market="open" if self.market_open else "closed")
+
+    def get_previous_close_agg(self, ticker: str):
+        self.calls += 1
+        yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+        return [SimpleNamespace(ticker=ticker, close=self.price(ticker), timestamp=yesterday.timestamp() * 1000)]
+
+    def bar(self, ticker: str, day) -> SimpleNamespace:
+        """A repeatable random-walk daily bar around the symbol's price"""
+        rng = random.Random(f"{ticker}{day}")
+        close = round(self.price(ticker) * rng.uniform(0.9, 1.1), 2)
+        open_ = round(close * rng.uniform(0.98, 1.02), 2)
+        timestamp = datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000
+        return SimpleNamespace(
+            ticker=ticker,
+            open=open_,
+            high=max(open_, close) * 1.01,
+            low=min(open_, close) * 0.99,
+            close=close,
+            volume=rng.randint(100_000, 10_000_000),
+            timestamp=timestamp,
+        )
+
+    def get_grouped_daily_aggs(self, date, adjusted=True, include_otc=False):
+        self.calls += 1
+        return [self.bar(symbol, date) for symbol in self.symbols]
+
+    def get_aggs(self, ticker, multiplier, timespan, from_, to, adjusted=True, limit=50000):
+        self.calls += 1
+        start = datetime.strptime(str(from_), "%Y-%m-%d").date()
+        end = datetime.strptime(str(to), "%Y-%m-%d").date()
+        days = (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+        return [self.bar(ticker, day) for day in days if day.weekday() < 5 and ticker in self.symbols]
+
+    def snapshot(self, ticker: str):
+        close = SimpleNamespace(close=self.price(ticker))
+        return SimpleNamespace(ticker=ticker, min=close, prev_day=close)
+
+    def get_snapshot_ticker(self, market_type: str, ticker: str):
+        self.calls += 1
+        return self.snapshot(ticker)
+
+    def get_snapshot_all(self, market_type: str, tickers: list[str] | None = None):
+        self.calls += 1
+        return [self.snapshot(ticker) for ticker in tickers or self.symbols if ticker in self.symbols]
+
+
+def get_polygon_client():
+    """Return the process-wide polygon client, so connections are reused across lookups"""
+    global _polygon_client
+    if _polygon_client is None:
+        _polygon_client = RESTClient(polygon_api_key)
+    return _polygon_client
+
+
+def use_polygon_client(client) -> None:
+    """Swap in a different client, such as a FakePolygonClient to work offline"""
+    global _polygon_client
+    _polygon_client = client
+    clear_price_cache()
+
+
+def use_price_feed(feed) -> None:
+    """Price every lookup with feed(symbols) -> {symbol: price} instead of polygon, as in a backtest; None restores live prices"""
+    global _price_feed
+    _price_feed = feed
+    clear_price_cache()
+
+
+def use_clock(clock) -> None:
+    """Take the current time from clock() -> datetime instead of the system clock, as in a backtest; None restores it"""
+    global _clock
+    _clock = clock
+
+
+def current_time() -> datetime:
+    return _clock() if _clock else datetime.now()
+
+
+def has_polygon() -> bool:
+    return bool(polygon_api_key) or _polygon_client is not None
+
+
+def is_synthetic() -> bool:
+    """Whether market data is being generated by a FakePolygonClient rather than fetched"""
+    return isinstance(_polygon_client, FakePolygonClient)
+
+
+def clear_price_cache() -> None:
+    global _market_status
+    _market_status = None
+    with _price_cache_lock:
+        _price_cache.clear()
+    get_market_for_prior_date.cache_clear()
+
 
 def is_market_open() -> bool:
-    client = RESTClient(polygon_api_key)
-    market_status = client.get_market_status()
-    return market_status.market == "open"
+    global _market_status
+    now = time.monotonic()
+    if _market_status and now - _market_status[1] < MARKET_STATUS_TTL_SECONDS:
+        return _market_status[0]
+    market_status = get_polygon_client().get_market_status()
+    is_open = market_status.market == "open"
+    _market_status = (is_open, now)
+    return is_open
 
 
 def get_all_share_prices_polygon_eod() -> dict[str, float]:
     """With much thanks to student Reema R. for fixing the timezone issue with this!"""
-    client = RESTClient(polygon_api_key)
+    client = get_polygon_client()
 
     probe = client.get_previous_close_agg("SPY")[0]
     last_close = datetime.fromtimestamp(probe.timestamp / 1000, tz=timezone.utc).date()
 
     results = client.get_grouped_daily_aggs(last_close, adjusted=True, include_otc=False)
+    date = last_close.strftime("%Y-%m-%d")
+    write_bars([(r.ticker, date, r.open, r.high, r.low, r.close, r.volume) for r in results], synthetic=is_synthetic())
     return {result.ticker: result.close for result in results}
 
 
+def get_bars_polygon(symbol: str, start: str, end: str) -> list[tuple]:
+    """Fetch daily bars from polygon and store them, returning them as write_bars tuples"""
+    aggs = get_polygon_client().get_aggs(symbol, 1, "day", start, end, adjusted=True, limit=50000)
+    bars = [
+        (
+            symbol,
+            datetime.fromtimestamp(agg.timestamp / 1000, tz=timezone.utc).strftime("%Y-%m-%d"),
+            agg.open,
+            agg.high,
+            agg.low,
+            agg.close,
+            agg.volume,
+        )
+        for agg in aggs
+    ]
+    write_bars(bars, synthetic=is_synthetic())
+    return bars
+
+
 @lru_cache(maxsize=2)
 def get_market_for_prior_date(today):
     market_data = read_market(today)
@@ -42,29 +205,58 @@ def get_market_for_prior_date(today):
     return market_data
 
 
-def get_share_price_polygon_eod(symbol) -> float:
+def get_share_prices_polygon_eod(symbols: list[str]) -> dict[str, float]:
     today = datetime.now().date().strftime("%Y-%m-%d")
     market_data = get_market_for_prior_date(today)
-    return market_data.get(symbol, 0.0)
+    return {symbol: market_data.get(symbol, 0.0) for symbol in symbols}
 
 
-def get_share_price_polygon_min(symbol) -> float:
-    client = RESTClient(polygon_api_key)
-    result = client.get_snapshot_ticker("stocks", symbol)
-    return result.min.close or result.prev_day.close
+def get_share_prices_polygon_min(symbols: list[str]) -> dict[str, float]:
+    snapshots = get_polygon_client().get_snapshot_all("stocks", tickers=symbols)
+    prices = dict.fromkeys(symbols, 0.0)
+    for snapshot in snapshots:
+        minute_close = snapshot.min.close if snapshot.min else None
+        prior_close = snapshot.prev_day.close if snapshot.prev_day else None
+        prices[snapshot.ticker] = minute_close or prior_close or 0.0
+    return prices
 
 
-def get_share_price_polygon(symbol) -> float:
-    if is_paid_polygon:
-        return get_share_price_polygon_min(symbol)
+def get_share_prices_polygon(symbols: list[str]) -> dict[str, float]:
+    if is_paid_polygon or is_realtime_polygon:
+        return get_share_prices_polygon_min(symbols)
     else:
-        return get_share_price_polygon_eod(symbol)
+        return get_share_prices_polygon_eod(symbols)
 
 
-def get_share_price(symbol) -> float:
-    if polygon_api_key:
+def get_share_prices(symbols: list[str]) -> dict[str, float]:
+    """
+    Look up the prices of several symbols, making at most one request for those not
+    already cached within price_cache_ttl seconds.
+    """
+    if _price_feed:
+        return _price_feed(symbols)
+    now = time.monotonic()
+    prices = {}
+    with _price_cache_lock:
+        for symbol in symbols:
+            cached = _price_cache.get(symbol)
+            if cached and now - cached[1] < price_cache_ttl:
+                prices[symbol] = cached[0]
+    missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in prices]
+    if missing and has_polygon():
         try:
-            return get_share_price_polygon(symbol)
+            fetched = get_share_prices_polygon(missing)
+            with _price_cache_lock:
+                for symbol, price in fetched.items():
+                    _price_cache[symbol] = (price, now)
+            prices.update(fetched)
         except Exception as e:
-            print(f"Was not able to use the polygon API due to {e}; using a random number")
-    return float(random.randint(1, 100))
+            print(f"Was not able to use the polygon API due to {e}; using random numbers")
+    for symbol in missing:
+        if symbol not in prices:
+            prices[symbol] = float(random.randint(1, 100))
+    return prices
+
+
+def get_share_price(symbol) -> float:
+    return get_share_prices([symbol])[symbol]
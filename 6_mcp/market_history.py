@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from database import read_bars, write_bars
+from market import has_polygon, is_synthetic, get_bars_polygon
+
+BAR_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+# Allowance for weekends and holidays when deciding whether stored bars cover a date range
+COVERAGE_SLACK_DAYS = 4
+
+
+def load_bars_csv(path: str) -> int:
+    """
+    Load daily bars into the local store from a CSV file, for backfilling or working offline.
+    The file needs a header row with symbol, date, open, high, low, close and volume columns.
+    Returns the number of bars loaded.
+    """
+    df = pd.read_csv(path, parse_dates=["date"])
+    df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+    df["symbol"] = df["symbol"].str.upper()
+    bars = list(df[["symbol", *BAR_COLUMNS]].itertuples(index=False, name=None))
+    write_bars(bars)
+    return len(bars)
+
+
+def covers(bars: list[tuple], start: str, end: str) -> bool:
+    if not bars:
+        return False
+    slack = timedelta(days=COVERAGE_SLACK_DAYS)
+    first = datetime.strptime(bars[0][0], "%Y-%m-%d")
+    last = datetime.strptime(bars[-1][0], "%Y-%m-%d")
+    latest_close = min(datetime.strptime(end, "%Y-%m-%d"), datetime.now() - timedelta(days=1))
+    return first - slack <= datetime.strptime(start, "%Y-%m-%d") and last + slack >= latest_close
+
+
+def get_bars(symbol: str, start: str, end: str) -> pd.DataFrame:
+    """
+    Daily bars for a symbol between two 'YYYY-MM-DD' dates inclusive, indexed by date.
+    Served from the local store; polygon is only asked when the store doesn't cover the range.
+    Generated bars are only served while a FakePolygonClient is in use, so they never stand in for real history.
+    """
+    symbol = symbol.upper()
+    synthetic = is_synthetic()
+    bars = read_bars(symbol, start, end, synthetic)
+    if not covers(bars, start, end) and has_polygon():
+        try:
+            get_bars_polygon(symbol, start, end)
+            bars = read_bars(symbol, start, end, synthetic)
+        except Exception as e:
+            print(f"Was not able to fetch bars for {symbol} from polygon due to {e}; using stored bars")
+    df = pd.DataFrame(bars, columns=BAR_COLUMNS)
+    df["date"] = pd.to_datetime(df["date"])
+    return df.set_index("date")
+
+
+def compute_indicators(bars: pd.DataFrame, window: int = 20) -> pd.DataFrame:
+    """
+    Add indicator columns to daily bars: simple and exponential moving averages, Bollinger bands,
+    14 day RSI (Wilder smoothing) and annualized volatility of daily log returns over the window.
+    """
+    close = bars["close"]
+    df = bars.copy()
+    df["sma"] = close.rolling(window).mean()
+    df["ema"] = close.ewm(span=window, adjust=False).mean()
+    std = close.rolling(window).std()
+    df["bollinger_upper"] = df["sma"] + 2 * std
+    df["bollinger_lower"] = df["sma"] - 2 * std
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = -change.clip(upper=0).ewm(alpha=1 / 14, adjust=False).mean()
+    df["rsi"] = 100 - 100 / (1 + gain / loss)
+    log_returns = np.log(close).diff()
+    df["volatility"] = log_returns.rolling(window).std() * np.sqrt(252)
+    return df
+
+
+def get_indicators(symbol: str, end: str, window: int = 20) -> dict:
+    """The latest indicator values for a symbol as of a date, using enough history to fill the window"""
+    start = (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=window * 2 + 30)).strftime("%Y-%m-%d")
+    bars = get_bars(symbol, start, end)
+    if bars.empty:
+        return {}
+    latest = compute_indicators(bars, window).iloc[-1]
+    result = {key: (None if pd.isna(value) else round(float(value), 4)) for key, value in latest.items()}
+    return {"symbol": symbol.upper(), "date": bars.index[-1].strftime("%Y-%m-%d"), **result}
@@ -1,5 +1,6 @@
 from mcp.server.fastmcp import FastMCP
-from market import get_share_price
+from market import get_share_price, get_share_prices
+from market_history import get_bars, get_indicators
 
 mcp = FastMCP("market_server")
 
@@ -12,5 +13,39 @@ async def lookup_share_price(symbol: str) -> float:
     """
     return get_share_price(symbol)
 
+@mcp.tool()
+async def lookup_share_prices(symbols: list[str]) -> dict[str, float]:
+    """This tool provides the current prices of several stock symbols in one lookup.
+
+    Args:
+        symbols: the symbols of the stocks
+    """
+    return get_share_prices(symbols)
+
+@mcp.tool()
+async def lookup_historical_bars(symbol: str, start_date: str, end_date: str) -> list[dict]:
+    """This tool provides daily open, high, low, close and volume bars for a stock symbol.
+
+    Args:
+        symbol: the symbol of the stock
+        start_date: the first date to include, as YYYY-MM-DD
+        end_date: the last date to include, as YYYY-MM-DD
+    """
+    bars = get_bars(symbol, start_date, end_date).reset_index()
+    bars["date"] = bars["date"].dt.strftime("%Y-%m-%d")
+    return bars.to_dict(orient="records")
+
+@mcp.tool()
+async def lookup_indicators(symbol: str, date: str, window: int = 20) -> dict:
+    """This tool provides technical indicators for a stock symbol as of a date: moving averages,
+    Bollinger bands, 14 day RSI and annualized volatility, computed from daily closes.
+
+    Args:
+        symbol: the symbol of the stock
+        date: the date to compute the indicators for, as YYYY-MM-DD
+        window: the number of trading days for the moving averages, bands and volatility
+    """
+    return get_indicators(symbol, date, window)
+
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
\ No newline at end of file
+    mcp.run(transport='stdio')
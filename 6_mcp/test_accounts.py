@@ -0,0 +1,121 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("ACCOUNTS_DB", os.path.join(tempfile.mkdtemp(prefix="test_6_mcp_"), "accounts.db"))
+
+import database
+import market
+from accounts import Account, REPORT_TRANSACTIONS
+
+SYMBOLS = ["AAPL", "AMZN", "MSFT", "NVDA", "TSLA"]
+
+
+def recompute(transactions):
+    """The full recomputation over the transaction history that reports used before totals were kept"""
+    spend = sum(t.total() for t in transactions)
+    held, cost, realized = {}, {}, 0.0
+    for t in transactions:
+        if t.quantity > 0:
+            cost[t.symbol] = cost.get(t.symbol, 0.0) + t.total()
+        else:
+            average = cost[t.symbol] / held[t.symbol]
+            realized += -t.quantity * (t.price - average)
+            cost[t.symbol] -= -t.quantity * average
+        held[t.symbol] = held.get(t.symbol, 0) + t.quantity
+        if not held[t.symbol]:
+            del held[t.symbol], cost[t.symbol]
+    return spend, cost, realized
+
+
+class TestIncrementalTotals(unittest.TestCase):
+    def setUp(self):
+        self.prices = {}
+        market.use_price_feed(lambda symbols: {symbol: self.prices[symbol] for symbol in symbols})
+
+    def tearDown(self):
+        market.use_price_feed(None)
+
+    def trade_randomly(self, account, rng):
+        symbol = rng.choice(SYMBOLS)
+        self.prices[symbol] = round(rng.uniform(5, 500), 2)
+        held = account.holdings.get(symbol, 0)
+        if held and rng.random() < 0.4:
+            account.sell_shares(symbol, rng.randint(1, held), "random")
+        elif account.balance > self.prices[symbol] * 1.01:
+            affordable = int(account.balance // (self.prices[symbol] * 1.01))
+            account.buy_shares(symbol, rng.randint(1, min(affordable, 20)), "random")
+
+    def assert_matches_recomputation(self, account):
+        spend, cost, realized = recompute(account.transactions)
+        value = account.calculate_portfolio_value()
+        self.assertAlmostEqual(account.calculate_profit_loss(value), value - spend - account.balance, places=6)
+        self.assertEqual(set(account.get_cost_basis()), set(cost))
+        for symbol, basis in cost.items():
+            self.assertAlmostEqual(account.get_cost_basis()[symbol], basis, places=6)
+            self.assertAlmostEqual(account.get_average_prices()[symbol], basis / account.holdings[symbol], places=6)
+        self.assertAlmostEqual(account.get_realized_profit_loss(), realized, places=6)
+        self.assertAlmostEqual(account.calculate_unrealized_profit_loss(value), value - account.balance - sum(cost.values()), places=6)
+
+    def test_randomized_trades_match_full_recomputation(self):
+        for seed in range(8):
+            rng = random.Random(seed)
+            self.prices = {symbol: round(rng.uniform(5, 500), 2) for symbol in SYMBOLS}
+            account = Account.get(f"random{seed}")
+            account.reset("random")
+            for _ in range(60):
+                self.trade_randomly(account, rng)
+                self.assert_matches_recomputation(account)
+
+    def test_reload_uses_stored_totals_without_replaying(self):
+        rng = random.Random(99)
+        self.prices = {symbol: round(rng.uniform(5, 500), 2) for symbol in SYMBOLS}
+        account = Account.get("reloaded")
+        account.reset("random")
+        for _ in range(40):
+            self.trade_randomly(account, rng)
+        with mock.patch.object(Account, "_apply_transaction", side_effect=AssertionError("replayed the history")):
+            reloaded = Account.get("reloaded")
+        self.assertEqual(reloaded.totals(), account.totals())
+        self.assert_matches_recomputation(reloaded)
+
+    def test_accounts_saved_without_totals_are_rebuilt_once_then_stored(self):
+        self.prices = {"AAPL": 100.0, "MSFT": 50.0}
+        account = Account.get("legacy")
+        account.reset("random")
+        account.buy_shares("AAPL", 10, "first")
+        account.buy_shares("MSFT", 4, "second")
+        self.prices["AAPL"] = 120.0
+        account.sell_shares("AAPL", 5, "third")
+        legacy = account.model_dump()
+        database.write_account("legacy", legacy)
+        self.assertIsNone(database.read_account("legacy")["net_spend"])
+
+        rebuilt = Account.get("legacy")
+        self.assertEqual(rebuilt.totals(), account.totals())
+        stored = database.read_account("legacy")
+        self.assertAlmostEqual(stored["net_spend"], account.totals()["net_spend"])
+        self.assertAlmostEqual(stored["cost_basis"]["AAPL"], account.get_cost_basis()["AAPL"])
+
+    def test_report_covers_holdings_and_recent_trades_not_the_whole_history(self):
+        rng = random.Random(5)
+        self.prices = {symbol: round(rng.uniform(5, 500), 2) for symbol in SYMBOLS}
+        account = Account.get("reported")
+        account.reset("random")
+        for _ in range(40):
+            self.trade_randomly(account, rng)
+        with mock.patch.object(Account, "model_dump", side_effect=AssertionError("dumped the whole account")):
+            report = json.loads(account.report())
+        self.assertNotIn("portfolio_value_time_series", report)
+        self.assertEqual(report["transaction_count"], len(account.transactions))
+        self.assertEqual(report["recent_transactions"], [t.model_dump() for t in account.transactions[-REPORT_TRANSACTIONS:]])
+        self.assertEqual(report["holdings"], account.holdings)
+        self.assertAlmostEqual(report["realized_profit_loss"], account.get_realized_profit_loss())
+        self.assertAlmostEqual(report["total_portfolio_value"], account.calculate_portfolio_value())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+import anyio
+from mcp import StdioServerParameters
+import accounts_client
+
+server_params = StdioServerParameters(
+    command=sys.executable,
+    args=["accounts_server.py"],
+    env={**os.environ, "ACCOUNTS_DB": os.path.join(tempfile.mkdtemp(prefix="test_6_mcp_"), "accounts.db")},
+    cwd=os.path.dirname(os.path.abspath(__file__)),
+)
+
+
+class TestAccountsSession(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.session = accounts_client.AccountsSession(server_params)
+
+    async def asyncTearDown(self):
+        await self.session.close()
+
+    async def test_concurrent_requests_share_one_server(self):
+        results = await asyncio.gather(
+            *(self.session.request(lambda session: session.call_tool("get_balance", {"name": "shared"})) for _ in range(20))
+        )
+        self.assertEqual({result.content[0].text for result in results}, {"10000.0"})
+        task = self.session.task
+        await self.session.request(lambda session: session.read_resource("accounts://accounts_server/shared"))
+        self.assertIs(self.session.task, task)
+
+    async def test_restarts_the_server_after_it_stops(self):
+        await self.session.get()
+        first = self.session.task
+        await self.session.close()
+        result = await self.session.request(lambda session: session.read_resource("accounts://accounts_server/again"))
+        self.assertEqual(json.loads(result.contents[0].text)["name"], "again")
+        self.assertIsNot(self.session.task, first)
+
+    async def test_retries_once_when_the_connection_was_closed(self):
+        attempts = []
+
+        async def send(session):
+            attempts.append(session)
+            if len(attempts) == 1:
+                raise anyio.ClosedResourceError()
+            return "sent"
+
+        self.assertEqual(await self.session.request(send), "sent")
+        self.assertEqual(len(attempts), 2)
+        self.assertIsNot(attempts[0], attempts[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("ACCOUNTS_DB", os.path.join(tempfile.mkdtemp(prefix="test_6_mcp_"), "accounts.db"))
+# traders.py creates its model clients on import; the backtest never calls them
+for key in ("OPENAI_API_KEY", "OPENROUTER_API_KEY", "DEEPSEEK_API_KEY", "GOOGLE_API_KEY", "GROK_API_KEY"):
+    os.environ.setdefault(key, "test")
+
+from agents import Agent, Runner, function_tool, set_tracing_disabled
+import backtest
+import market
+from accounts import Account
+
+
+def buy_then_sell(account, day):
+    """Buy 10 AAPL on the first day and sell them on the fifth"""
+    if day.index == 0:
+        return {"AAPL": 10}
+    if day.index == 4:
+        return {"AAPL": -account.holdings.get("AAPL", 0)}
+    return {}
+
+
+RULES = {"Tester": ("Scripted: buy then sell", buy_then_sell), "Idle": ("Scripted: do nothing", lambda account, day: {})}
+
+
+class TestBacktest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        market.use_polygon_client(market.FakePolygonClient())
+
+    def tearDown(self):
+        market.use_polygon_client(None)
+
+    async def test_real_traders_place_scripted_orders_through_the_accounts_server(self):
+        equity, stats = await backtest.run_backtest("2024-02-01", "2024-02-29", ["AAPL", "MSFT"], RULES)
+        self.assertEqual(stats["simulated_days"], 21)
+        self.assertEqual(list(equity.columns), ["Tester", "Idle"])
+        self.assertEqual(stats["orders_placed"], 2)
+        # Each trader runs once a day; the tester takes two extra turns for its two orders
+        self.assertEqual(stats["model_calls"], 2 * 21 + 2)
+
+        account = Account.get("Tester")
+        self.assertEqual([t.quantity for t in account.transactions], [10, -10])
+        self.assertEqual([t.rationale for t in account.transactions], ["Backtest", "Backtest"])
+        self.assertEqual([t.timestamp[:10] for t in account.transactions], ["2024-02-01", "2024-02-07"])
+        self.assertEqual(account.strategy, "Scripted: buy then sell")
+        self.assertEqual(set(equity["Idle"]), {10_000.0})
+        self.assertEqual(equity["Tester"].iloc[-1], account.balance)
+
+    async def test_runs_are_deterministic(self):
+        first, _ = await backtest.run_backtest("2024-02-01", "2024-02-15", ["AAPL"], RULES)
+        second, _ = await backtest.run_backtest("2024-02-01", "2024-02-15", ["AAPL"], RULES)
+        self.assertTrue(first.equals(second))
+
+
+class TestScriptedModel(unittest.IsolatedAsyncioTestCase):
+    async def test_streams_the_same_turns_it_answers_with(self):
+        set_tracing_disabled(True)
+        orders = []
+
+        @function_tool
+        def buy_shares(name: str, symbol: str, quantity: int, rationale: str) -> str:
+            orders.append((symbol, quantity))
+            return "Completed"
+
+        @function_tool
+        def sell_shares(name: str, symbol: str, quantity: int, rationale: str) -> str:
+            orders.append((symbol, -quantity))
+            return "Completed"
+
+        simulation = backtest.Simulation(backtest.SimulatedClock())
+        model = backtest.ScriptedModel("Streamer", lambda account, day: {"AAPL": 3, "MSFT": -2}, simulation)
+        agent = Agent(name="Streamer", instructions="Trade", model=model, tools=[buy_shares, sell_shares])
+        result = Runner.run_streamed(agent, "Trade today")
+        events = [event.type async for event in result.stream_events()]
+        self.assertIn("run_item_stream_event", events)
+        self.assertEqual(orders, [("MSFT", -2), ("AAPL", 3)])
+        self.assertEqual(result.final_output, "Orders placed for the day.")
+        self.assertEqual(model.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
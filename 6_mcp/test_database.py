@@ -0,0 +1,141 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+os.environ.setdefault("ACCOUNTS_DB", os.path.join(tempfile.mkdtemp(prefix="test_6_mcp_"), "accounts.db"))
+
+import database
+
+
+class TestConnections(unittest.TestCase):
+    def test_each_thread_reuses_its_own_connection(self):
+        seen = {}
+
+        def connect(index):
+            seen[index] = (database.get_connection(), database.get_connection())
+
+        threads = [threading.Thread(target=connect, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for first, second in seen.values():
+            self.assertIs(first, second)
+        self.assertEqual(len({id(first) for first, _ in seen.values()}), 4)
+
+    def test_connections_use_wal(self):
+        mode = database.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_close_connections_closes_other_threads_connections(self):
+        opened = []
+        thread = threading.Thread(target=lambda: opened.append(database.get_connection()))
+        thread.start()
+        thread.join()
+        database.close_connections()
+        with self.assertRaises(Exception):
+            opened[0].execute("SELECT 1")
+        # The current thread opens a fresh connection on next use
+        database.write_log("tester", "test", "after close")
+        self.assertIn("after close", [message for _, _, message in database.read_log("tester", 1)])
+
+
+class TestAccountTables(unittest.TestCase):
+    def account(self, name):
+        return {
+            "name": name,
+            "balance": 1000.0,
+            "strategy": "Buy low",
+            "holdings": {"AAPL": 3},
+            "transactions": [
+                {"symbol": "AAPL", "quantity": 3, "price": 100.0, "timestamp": "2025-01-02 10:00:00", "rationale": "Cheap"}
+            ],
+            "portfolio_value_time_series": [("2025-01-02 10:00:00", 1300.0)],
+        }
+
+    def test_write_and_read_account(self):
+        database.write_account("Alice", self.account("alice"))
+        account = database.read_account("alice")
+        self.assertEqual(account["balance"], 1000.0)
+        self.assertEqual(account["holdings"], {"AAPL": 3})
+        self.assertEqual(account["transactions"][0]["rationale"], "Cheap")
+        self.assertEqual([tuple(value) for value in account["portfolio_value_time_series"]], [("2025-01-02 10:00:00", 1300.0)])
+
+    def test_write_trade_appends_and_updates_one_holding(self):
+        database.write_account("bob", self.account("bob"))
+        sale = {"symbol": "AAPL", "quantity": -3, "price": 110.0, "timestamp": "2025-01-03 10:00:00", "rationale": "Up"}
+        database.write_trade("bob", 1330.0, 0, sale, cost_basis=0.0, net_spend=-30.0, realized_profit_loss=30.0)
+        account = database.read_account("bob")
+        self.assertEqual(account["balance"], 1330.0)
+        self.assertEqual(account["holdings"], {})
+        self.assertEqual([t["quantity"] for t in account["transactions"]], [3, -3])
+        self.assertEqual((account["net_spend"], account["realized_profit_loss"]), (-30.0, 30.0))
+
+    def test_legacy_json_accounts_are_migrated(self):
+        conn = database.get_connection()
+        with conn:
+            conn.execute("INSERT INTO accounts (name, account) VALUES (?, ?)", ("carol", json.dumps(self.account("carol"))))
+        database.migrate_json_accounts(conn)
+        self.assertEqual(database.read_account("carol")["holdings"], {"AAPL": 3})
+
+
+class TestLogSink(unittest.TestCase):
+    def test_flush_writes_every_entry_from_several_threads(self):
+        sink = database.LogSink(max_batch_size=50, flush_interval=10)
+
+        def write(thread):
+            for i in range(200):
+                sink.write(f"sink{thread}", "test", f"entry {i}")
+
+        threads = [threading.Thread(target=write, args=(thread,)) for thread in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sink.flush()
+        for thread in range(5):
+            messages = [message for _, _, message in database.read_log(f"sink{thread}", 1000)]
+            self.assertEqual(sorted(messages), sorted(f"entry {i}" for i in range(200)))
+        sink.shutdown()
+
+    def test_entries_wait_for_the_flush_interval_then_are_written(self):
+        sink = database.LogSink(max_batch_size=1000, flush_interval=0.2)
+        sink.write("interval", "test", "queued")
+        self.assertEqual(list(database.read_log("interval", 10)), [])
+        time.sleep(0.6)
+        self.assertEqual([message for _, _, message in database.read_log("interval", 10)], ["queued"])
+        sink.shutdown()
+
+    def test_a_backed_up_writer_drops_entries_rather_than_blocking(self):
+        stuck = threading.Event()
+        original = database.write_logs
+
+        def slow_write_logs(batch):
+            stuck.wait(5)
+            original(batch)
+
+        with mock.patch.object(database, "write_logs", slow_write_logs), mock.patch("builtins.print"):
+            sink = database.LogSink(max_queue_size=2, max_batch_size=1, flush_interval=0)
+            started = time.monotonic()
+            for i in range(10):
+                sink.write("backed-up", "test", f"entry {i}")
+            self.assertLess(time.monotonic() - started, 1)
+            self.assertGreaterEqual(sink.dropped, 7)
+            stuck.set()
+            sink.shutdown()
+        written = len(list(database.read_log("backed-up", 100)))
+        self.assertEqual(written + sink.dropped, 10)
+
+    def test_writes_after_shutdown_go_straight_to_the_database(self):
+        sink = database.LogSink()
+        sink.shutdown()
+        sink.write("closed", "test", "direct")
+        self.assertEqual([message for _, _, message in database.read_log("closed", 10)], ["direct"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("ACCOUNTS_DB", os.path.join(tempfile.mkdtemp(prefix="test_6_mcp_"), "accounts.db"))
+
+import market
+
+
+class TestBulkPrices(unittest.TestCase):
+    def setUp(self):
+        self.client = market.FakePolygonClient()
+        market.use_polygon_client(self.client)
+        self.now = 1000.0
+        patches = [
+            mock.patch.object(market, "is_paid_polygon", True),
+            mock.patch.object(market, "price_cache_ttl", 60.0),
+            mock.patch.object(market.time, "monotonic", lambda: self.now),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        market.use_polygon_client(None)
+
+    def test_one_client_call_per_ttl_window(self):
+        symbols = ["AAPL", "MSFT", "NVDA", "TSLA"]
+        prices = market.get_share_prices(symbols)
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(prices, {symbol: self.client.price(symbol) for symbol in symbols})
+
+        for symbol in symbols:
+            market.get_share_price(symbol)
+        self.now += 59
+        market.get_share_prices(symbols)
+        self.assertEqual(self.client.calls, 1)
+
+        self.now += 2
+        market.get_share_prices(symbols)
+        self.assertEqual(self.client.calls, 2)
+
+    def test_only_uncached_symbols_are_requested(self):
+        market.get_share_prices(["AAPL", "MSFT"])
+        with mock.patch.object(self.client, "get_snapshot_all", wraps=self.client.get_snapshot_all) as snapshot_all:
+            market.get_share_prices(["AAPL", "MSFT", "NVDA"])
+        snapshot_all.assert_called_once_with("stocks", tickers=["NVDA"])
+
+    def test_price_feed_overrides_polygon(self):
+        market.use_price_feed(lambda symbols: {symbol: 1.5 for symbol in symbols})
+        try:
+            self.assertEqual(market.get_share_price("AAPL"), 1.5)
+        finally:
+            market.use_price_feed(None)
+        self.assertEqual(self.client.calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("ACCOUNTS_DB", os.path.join(tempfile.mkdtemp(prefix="test_6_mcp_"), "accounts.db"))
+
+import numpy as np
+import pandas as pd
+import database
+import market
+import market_history
+
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        self.client = market.FakePolygonClient()
+        market.use_polygon_client(self.client)
+
+    def tearDown(self):
+        market.use_polygon_client(None)
+
+    def test_polygon_is_asked_only_when_the_store_does_not_cover_the_range(self):
+        bars = market_history.get_bars("googl", "2024-03-01", "2024-03-29")
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(len(bars), 21)
+        self.assertTrue(bars.index.is_monotonic_increasing)
+
+        again = market_history.get_bars("GOOGL", "2024-03-04", "2024-03-28")
+        self.assertEqual(self.client.calls, 1)
+        pd.testing.assert_frame_equal(again, bars.loc["2024-03-04":"2024-03-28"])
+
+        market_history.get_bars("GOOGL", "2024-01-01", "2024-03-29")
+        self.assertEqual(self.client.calls, 2)
+
+    def test_synthetic_bars_are_only_read_while_the_fake_client_is_in_use(self):
+        market_history.get_bars("MSFT", "2022-06-01", "2022-06-30")
+        self.assertTrue(database.read_bars("MSFT", "2022-06-01", "2022-06-30", synthetic=True))
+        self.assertEqual(database.read_bars("MSFT", "2022-06-01", "2022-06-30"), [])
+        market.use_polygon_client(None)
+        with mock.patch.object(market, "polygon_api_key", None):
+            self.assertTrue(market_history.get_bars("MSFT", "2022-06-01", "2022-06-30").empty)
+
+    def test_synthetic_bars_never_replace_real_ones(self):
+        real = ("NVDA", "2022-06-01", 1.0, 1.0, 1.0, 1.0, 1.0)
+        database.write_bars([real])
+        database.write_bars([("NVDA", "2022-06-01", 2.0, 2.0, 2.0, 2.0, 2.0)], synthetic=True)
+        self.assertEqual(database.read_bars("NVDA", "2022-06-01", "2022-06-01", synthetic=True), [real[1:]])
+        database.write_bars([("NVDA", "2022-06-02", 2.0, 2.0, 2.0, 2.0, 2.0)], synthetic=True)
+        database.write_bars([("NVDA", "2022-06-02", 3.0, 3.0, 3.0, 3.0, 3.0)])
+        self.assertEqual(database.read_bars("NVDA", "2022-06-02", "2022-06-02"), [("2022-06-02", 3.0, 3.0, 3.0, 3.0, 3.0)])
+
+    def test_load_bars_csv(self):
+        path = os.path.join(tempfile.mkdtemp(prefix="test_6_mcp_"), "bars.csv")
+        pd.DataFrame(
+            {
+                "symbol": ["zzz", "zzz"],
+                "date": ["2023-05-01", "2023-05-02"],
+                "open": [1.0, 2.0],
+                "high": [1.5, 2.5],
+                "low": [0.5, 1.5],
+                "close": [1.2, 2.2],
+                "volume": [100, 200],
+            }
+        ).to_csv(path, index=False)
+        self.assertEqual(market_history.load_bars_csv(path), 2)
+        self.assertEqual(
+            database.read_bars("ZZZ", "2023-05-01", "2023-05-31"),
+            [("2023-05-01", 1.0, 1.5, 0.5, 1.2, 100.0), ("2023-05-02", 2.0, 2.5, 1.5, 2.2, 200.0)],
+        )
+
+
+class TestIndicators(unittest.TestCase):
+    def test_matches_a_direct_computation(self):
+        rng = np.random.default_rng(7)
+        close = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 60))))
+        df = market_history.compute_indicators(pd.DataFrame({"close": close}), window=20)
+        last = close.iloc[-20:]
+        self.assertAlmostEqual(df["sma"].iloc[-1], last.mean())
+        self.assertAlmostEqual(df["bollinger_upper"].iloc[-1], last.mean() + 2 * last.std())
+        returns = np.diff(np.log(close.to_numpy()))[-20:]
+        self.assertAlmostEqual(df["volatility"].iloc[-1], returns.std(ddof=1) * np.sqrt(252))
+        self.assertTrue(df["sma"].iloc[:19].isna().all())
+        self.assertTrue(((df["rsi"].dropna() >= 0) & (df["rsi"].dropna() <= 100)).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
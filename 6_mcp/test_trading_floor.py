@@ -0,0 +1,164 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("ACCOUNTS_DB", os.path.join(tempfile.mkdtemp(prefix="test_6_mcp_"), "accounts.db"))
+# traders.py creates its model clients on import; these tests never call a model
+for key in ("OPENAI_API_KEY", "OPENROUTER_API_KEY", "DEEPSEEK_API_KEY", "GOOGLE_API_KEY", "GROK_API_KEY"):
+    os.environ.setdefault(key, "test")
+
+import trading_floor
+
+
+class FakeServer:
+    """Stands in for MCPServerStdio, recording the task that connected and cleaned it up"""
+
+    instances = []
+
+    def __init__(self, params, client_session_timeout_seconds=None):
+        self.params = params
+        self.name = params["command"]
+        self.healthy = True
+        self.connected_in = None
+        self.cleaned_up_in = None
+        FakeServer.instances.append(self)
+
+    async def connect(self):
+        self.connected_in = asyncio.current_task()
+
+    async def cleanup(self):
+        self.cleaned_up_in = asyncio.current_task()
+
+    async def list_tools(self):
+        if not self.healthy:
+            raise ConnectionError("gone")
+        return []
+
+
+class FakeTrader:
+    def __init__(self, name, seconds=0.0):
+        self.name = name
+        self.seconds = seconds
+        self.runs = []
+
+    async def run(self, trader_mcp_servers=None, researcher_mcp_servers=None):
+        self.runs.append((trader_mcp_servers, researcher_mcp_servers))
+        await asyncio.sleep(self.seconds)
+
+
+class PoolTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        FakeServer.instances = []
+        patches = [
+            mock.patch.object(trading_floor, "MCPServerStdio", FakeServer),
+            mock.patch.object(trading_floor, "trader_mcp_server_params", [{"command": "accounts", "args": []}]),
+            mock.patch.object(
+                trading_floor, "researcher_mcp_server_params", lambda name: [{"command": f"memory-{name}", "args": []}]
+            ),
+            mock.patch.object(trading_floor, "RUN_EVEN_WHEN_MARKET_IS_CLOSED", True),
+            mock.patch.object(trading_floor, "POOL_CHECK_EVERY_N_MINUTES", 0.05 / 60),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+
+class TestMCPServerPool(PoolTestCase):
+    async def test_shares_servers_with_identical_params(self):
+        pool = trading_floor.MCPServerPool()
+        await pool.start([FakeTrader("Warren"), FakeTrader("George")])
+        self.assertEqual(sorted(server.name for server in pool.servers.values()), ["accounts", "memory-George", "memory-Warren"])
+        with pool.lease(FakeTrader("Warren")) as (trader_servers, researcher_servers):
+            self.assertEqual([server.name for server in trader_servers], ["accounts"])
+            self.assertEqual([server.name for server in researcher_servers], ["memory-Warren"])
+        with pool.lease(FakeTrader("Ray")) as servers:
+            self.assertEqual(servers, (None, None))
+
+    async def test_servers_stay_warm_between_runs_and_failed_ones_are_retried(self):
+        pool = trading_floor.MCPServerPool()
+        broken = {"memory-George"}
+
+        async def connect(server):
+            if server.name in broken:
+                raise ConnectionError("cannot start")
+
+        with mock.patch.object(FakeServer, "connect", connect), mock.patch("builtins.print"):
+            await pool.start([FakeTrader("Warren"), FakeTrader("George")])
+            self.assertEqual(pool.spawns, 2)
+            with pool.lease(FakeTrader("George")) as servers:
+                self.assertEqual(servers, (None, None))
+            broken.clear()
+            await pool.start([FakeTrader("Warren"), FakeTrader("George")])
+        self.assertEqual(pool.spawns, 3)
+        for _ in range(2):
+            with pool.lease(FakeTrader("Warren")):
+                pass
+        self.assertEqual(pool.warm_hits, 4)
+        self.assertIn("3 running, 3 spawned, 4 warm hits, 0 restarts", pool.metrics())
+
+    async def test_health_check_leaves_leased_servers_alone(self):
+        pool = trading_floor.MCPServerPool()
+        await pool.start([FakeTrader("Warren"), FakeTrader("George")])
+        for server in FakeServer.instances:
+            server.healthy = False
+        with pool.lease(FakeTrader("Warren")):
+            await pool.health_check()
+        self.assertEqual(sorted(server.name for server in pool.servers.values()), ["accounts", "memory-Warren"])
+        self.assertEqual(pool.restarts, 1)
+
+
+class TestScheduler(PoolTestCase):
+    async def test_pool_is_maintained_and_closed_in_the_task_that_started_it(self):
+        traders = [FakeTrader("Warren", 0.01), FakeTrader("George", 0.01)]
+        pool = trading_floor.MCPServerPool()
+        scheduler = trading_floor.Scheduler(traders, pool)
+        for schedule in scheduler.schedules:
+            schedule.period = 0.02
+
+        async def break_a_server(stop):
+            await asyncio.sleep(0.03)
+            next(server for server in FakeServer.instances if server.name == "memory-George").healthy = False
+            # Stop once the pool has replaced it and the traders have run on the replacement
+            while len(FakeServer.instances) < 4:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            stop.reschedule(asyncio.get_running_loop().time())
+
+        async def owner():
+            # As run_every_n_minutes does: run the scheduler, then close the pool, in one task
+            try:
+                async with asyncio.timeout(10) as stop:
+                    breaker = asyncio.create_task(break_a_server(stop))
+                    await scheduler.run()
+            except TimeoutError:
+                pass
+            await breaker
+            await pool.close()
+
+        owner_task = asyncio.create_task(owner())
+        await owner_task
+        self.assertEqual(pool.restarts, 1)
+        self.assertEqual(len(FakeServer.instances), 4)
+        for server in FakeServer.instances:
+            self.assertIs(server.connected_in, owner_task)
+            self.assertIs(server.cleaned_up_in, owner_task)
+        for trader in traders:
+            self.assertTrue(trader.runs)
+            self.assertNotIn((None, None), trader.runs)
+
+    async def test_overrunning_runs_skip_ticks_rather_than_queue_them(self):
+        trader = FakeTrader("Warren", 0.05)
+        scheduler = trading_floor.Scheduler([trader], trading_floor.MCPServerPool())
+        scheduler.schedules[0].period = 0.02
+        task = asyncio.create_task(scheduler.run_trader(scheduler.schedules[0]))
+        await asyncio.sleep(0.22)
+        task.cancel()
+        schedule = scheduler.schedules[0]
+        self.assertLessEqual(schedule.runs, 5)
+        self.assertGreater(schedule.skipped_ticks, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
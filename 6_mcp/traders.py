@@ -1,7 +1,7 @@
 from contextlib import AsyncExitStack
 from accounts_client import read_accounts_resource, read_strategy_resource
 from tracers import make_trace_id
-from agents import Agent, Tool, Runner, OpenAIChatCompletionsModel, trace
+from agents import Agent, Tool, Runner, OpenAIChatCompletionsModel, Model, trace
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import os
@@ -49,35 +49,37 @@ def get_model(model_name: str):
         return model_name
 
 
-async def get_researcher(mcp_servers, model_name) -> Agent:
+async def get_researcher(mcp_servers, model_name, model: Model | None = None) -> Agent:
     researcher = Agent(
         name="Researcher",
         instructions=researcher_instructions(),
-        model=get_model(model_name),
+        model=model or get_model(model_name),
         mcp_servers=mcp_servers,
     )
     return researcher
 
 
-async def get_researcher_tool(mcp_servers, model_name) -> Tool:
-    researcher = await get_researcher(mcp_servers, model_name)
+async def get_researcher_tool(mcp_servers, model_name, model: Model | None = None) -> Tool:
+    researcher = await get_researcher(mcp_servers, model_name, model)
     return researcher.as_tool(tool_name="Researcher", tool_description=research_tool())
 
 
 class Trader:
-    def __init__(self, name: str, lastname="Trader", model_name="gpt-4o-mini"):
+    def __init__(self, name: str, lastname="Trader", model_name="gpt-4o-mini", model: Model | None = None):
+        """model, if given, is used in place of model_name's, such as a scripted stand-in for a backtest"""
         self.name = name
         self.lastname = lastname
         self.agent = None
         self.model_name = model_name
+        self.model = model
         self.do_trade = True
 
     async def create_agent(self, trader_mcp_servers, researcher_mcp_servers) -> Agent:
-        tool = await get_researcher_tool(researcher_mcp_servers, self.model_name)
+        tool = await get_researcher_tool(researcher_mcp_servers, self.model_name, self.model)
         self.agent = Agent(
             name=self.name,
             instructions=trader_instructions(self.name),
-            model=get_model(self.model_name),
+            model=self.model or get_model(self.model_name),
             tools=[tool],
             mcp_servers=trader_mcp_servers,
         )
@@ -117,15 +119,19 @@ class Trader:
                 ]
                 await self.run_agent(trader_mcp_servers, researcher_mcp_servers)
 
-    async def run_with_trace(self):
+    async def run_with_trace(self, trader_mcp_servers=None, researcher_mcp_servers=None):
         trace_name = f"{self.name}-trading" if self.do_trade else f"{self.name}-rebalancing"
         trace_id = make_trace_id(f"{self.name.lower()}")
         with trace(trace_name, trace_id=trace_id):
-            await self.run_with_mcp_servers()
+            if trader_mcp_servers is not None and researcher_mcp_servers is not None:
+                await self.run_agent(trader_mcp_servers, researcher_mcp_servers)
+            else:
+                await self.run_with_mcp_servers()
 
-    async def run(self):
+    async def run(self, trader_mcp_servers=None, researcher_mcp_servers=None):
+        """Run one trading or rebalancing session, on already connected MCP servers if given"""
         try:
-            await self.run_with_trace()
+            await self.run_with_trace(trader_mcp_servers, researcher_mcp_servers)
         except Exception as e:
             print(f"Error running trader {self.name}: {e}")
         self.do_trade = not self.do_trade
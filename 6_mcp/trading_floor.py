@@ -1,9 +1,17 @@
 from traders import Trader
 from typing import List
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 import asyncio
+import bisect
+import json
+import time
 from tracers import LogTracer
 from agents import add_trace_processor
 from market import is_market_open
+from agents.mcp import MCPServerStdio
+from mcp_params import trader_mcp_server_params, researcher_mcp_server_params
 from dotenv import load_dotenv
 import os
 
@@ -14,6 +22,10 @@ RUN_EVEN_WHEN_MARKET_IS_CLOSED = (
     os.getenv("RUN_EVEN_WHEN_MARKET_IS_CLOSED", "false").strip().lower() == "true"
 )
 USE_MANY_MODELS = os.getenv("USE_MANY_MODELS", "false").strip().lower() == "true"
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "4"))
+RUN_TIMEOUT_MINUTES = int(os.getenv("RUN_TIMEOUT_MINUTES", "30"))
+POOL_CHECK_EVERY_N_MINUTES = 5
+HEALTH_CHECK_TIMEOUT_SECONDS = 30
 
 names = ["Warren", "George", "Ray", "Cathie"]
 lastnames = ["Patience", "Bold", "Systematic", "Crypto"]
@@ -38,15 +50,233 @@ def create_traders() -> List[Trader]:
     return traders
 
 
+class MCPServerPool:
+    """
+    Keeps the traders' MCP servers running between runs. Servers with identical params, such as
+    accounts, push, market, fetch and search, are started once and shared by every trader; the
+    memory server is keyed by its trader's database so each trader keeps its own warm.
+
+    Servers are connected and cleaned up only from the task that owns the pool, as the MCP
+    client contexts must be exited in the task that entered them; traders just lease them.
+    A server leased by a running trader is left alone by the health check until it is returned.
+    """
+
+    def __init__(self):
+        self.servers: dict[str, MCPServerStdio] = {}
+        self.params: dict[str, dict] = {}
+        self.leased = Counter()
+        self.spawns = 0
+        self.warm_hits = 0
+        self.restarts = 0
+
+    @staticmethod
+    def key(params: dict) -> str:
+        return json.dumps(params, sort_keys=True)
+
+    async def spawn(self, key: str) -> None:
+        server = MCPServerStdio(self.params[key], client_session_timeout_seconds=120)
+        await server.connect()
+        self.servers[key] = server
+        self.spawns += 1
+
+    async def discard(self, key: str) -> None:
+        server = self.servers.pop(key, None)
+        if server:
+            try:
+                await server.cleanup()
+            except Exception as e:
+                print(f"Error stopping MCP server {server.name}: {e}")
+
+    async def start(self, traders: List[Trader]) -> None:
+        """Make sure every server the traders need is running"""
+        for trader in traders:
+            for params in trader_mcp_server_params + researcher_mcp_server_params(trader.name):
+                key = self.key(params)
+                if key not in self.servers:
+                    self.params[key] = params
+                    try:
+                        await self.spawn(key)
+                    except Exception as e:
+                        print(f"Could not start MCP server {params['command']} {' '.join(params['args'])}: {e}")
+
+    async def health_check(self) -> None:
+        """Stop any idle server that no longer answers a list_tools request, so the next start replaces it"""
+        for key, server in list(self.servers.items()):
+            if self.leased[key]:
+                continue
+            try:
+                await asyncio.wait_for(server.list_tools(), HEALTH_CHECK_TIMEOUT_SECONDS)
+            except Exception as e:
+                if self.leased[key]:
+                    # A trader took it while it was being checked; look again next time
+                    continue
+                print(f"MCP server {server.name} failed its health check ({e!r}); restarting")
+                await self.discard(key)
+                self.restarts += 1
+
+    @contextmanager
+    def lease(self, trader: Trader):
+        """
+        Lend the trader its pooled servers for one run, as (trader servers, researcher servers),
+        or (None, None) so that it starts its own if any are missing
+        """
+        trader_keys = [self.key(params) for params in trader_mcp_server_params]
+        researcher_keys = [self.key(params) for params in researcher_mcp_server_params(trader.name)]
+        keys = trader_keys + researcher_keys
+        if any(key not in self.servers for key in keys):
+            yield None, None
+            return
+        self.warm_hits += len(keys)
+        self.leased.update(keys)
+        try:
+            yield [self.servers[key] for key in trader_keys], [self.servers[key] for key in researcher_keys]
+        finally:
+            self.leased.subtract(keys)
+
+    def metrics(self) -> str:
+        return f"MCP servers: {len(self.servers)} running, {self.spawns} spawned, {self.warm_hits} warm hits, {self.restarts} restarts"
+
+    async def close(self) -> None:
+        for key in list(self.servers):
+            await self.discard(key)
+
+
+class LatencyHistogram:
+    """Counts run durations into buckets of up to 30s, 1m, 2m, 5m, 10m, 20m, 30m and over"""
+
+    BUCKETS = [30, 60, 120, 300, 600, 1200, 1800]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def __str__(self) -> str:
+        runs = sum(self.counts)
+        labels = [f"<={bound}s" for bound in self.BUCKETS] + [f">{self.BUCKETS[-1]}s"]
+        buckets = " ".join(f"{label}:{count}" for label, count in zip(labels, self.counts) if count)
+        mean = self.total / runs if runs else 0.0
+        return f"{buckets or 'no runs'} (mean {mean:.0f}s, max {self.max:.0f}s)"
+
+
+@dataclass
+class TraderSchedule:
+    trader: Trader
+    period: float
+    runs: int = 0
+    timeouts: int = 0
+    skipped_ticks: int = 0
+    closed_ticks: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def metrics(self) -> str:
+        return (
+            f"{self.trader.name}: {self.runs} runs, {self.timeouts} timeouts, "
+            f"{self.skipped_ticks} skipped ticks, {self.closed_ticks} market closed; latency {self.latency}"
+        )
+
+
+class Scheduler:
+    """
+    Runs each trader on its own fixed-rate cadence: ticks fall at start + k * period regardless of
+    how long runs take, and a run that overruns skips (and counts) the ticks it missed rather than
+    delaying everything after it. At most MAX_CONCURRENT_RUNS traders run at once, and a run is
+    cancelled after RUN_TIMEOUT_MINUTES.
+    """
+
+    def __init__(self, traders: List[Trader], pool: MCPServerPool):
+        self.pool = pool
+        self.schedules = [
+            TraderSchedule(trader, 60 * float(os.getenv(f"RUN_EVERY_N_MINUTES_{trader.name.upper()}", RUN_EVERY_N_MINUTES)))
+            for trader in traders
+        ]
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+        self.tasks: list[asyncio.Task] = []
+
+    async def market_is_open(self) -> bool:
+        if RUN_EVEN_WHEN_MARKET_IS_CLOSED:
+            return True
+        try:
+            return await asyncio.to_thread(is_market_open)
+        except Exception as e:
+            print(f"Could not check whether the market is open ({e}); treating it as closed")
+            return False
+
+    async def run_once(self, schedule: TraderSchedule) -> None:
+        async with self.semaphore:
+            started = time.monotonic()
+            try:
+                with self.pool.lease(schedule.trader) as servers:
+                    await asyncio.wait_for(schedule.trader.run(*servers), RUN_TIMEOUT_MINUTES * 60)
+            except asyncio.TimeoutError:
+                schedule.timeouts += 1
+                print(f"Run for {schedule.trader.name} timed out after {RUN_TIMEOUT_MINUTES} minutes")
+            schedule.runs += 1
+            schedule.latency.record(time.monotonic() - started)
+        print(schedule.metrics())
+
+    async def run_trader(self, schedule: TraderSchedule) -> None:
+        next_tick = time.monotonic()
+        while True:
+            if await self.market_is_open():
+                await self.run_once(schedule)
+            else:
+                schedule.closed_ticks += 1
+                print(f"Market is closed, skipping run for {schedule.trader.name}")
+            next_tick += schedule.period
+            now = time.monotonic()
+            if now > next_tick:
+                missed = int((now - next_tick) // schedule.period) + 1
+                schedule.skipped_ticks += missed
+                next_tick += missed * schedule.period
+            await asyncio.sleep(next_tick - now)
+
+    async def maintain_pool(self) -> None:
+        """Health-check and top up the shared MCP servers"""
+        await self.pool.health_check()
+        await self.pool.start([schedule.trader for schedule in self.schedules])
+        print(self.pool.metrics())
+
+    def metrics(self) -> str:
+        return "\n".join(schedule.metrics() for schedule in self.schedules)
+
+    async def run(self) -> None:
+        """
+        Run the traders in tasks of their own, while this task, which owns the pool, maintains it
+        every POOL_CHECK_EVERY_N_MINUTES; so every server is connected and cleaned up in the same task
+        """
+        await self.pool.start([schedule.trader for schedule in self.schedules])
+        self.tasks = [asyncio.create_task(self.run_trader(schedule)) for schedule in self.schedules]
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    self.tasks, timeout=POOL_CHECK_EVERY_N_MINUTES * 60, return_when=asyncio.FIRST_EXCEPTION
+                )
+                for task in done:
+                    task.result()
+                await self.maintain_pool()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+
+
 async def run_every_n_minutes():
     add_trace_processor(LogTracer())
-    traders = create_traders()
-    while True:
-        if RUN_EVEN_WHEN_MARKET_IS_CLOSED or is_market_open():
-            await asyncio.gather(*[trader.run() for trader in traders])
-        else:
-            print("Market is closed, skipping run")
-        await asyncio.sleep(RUN_EVERY_N_MINUTES * 60)
+    pool = MCPServerPool()
+    scheduler = Scheduler(create_traders(), pool)
+    try:
+        await scheduler.run()
+    finally:
+        print(scheduler.metrics())
+        await pool.close()
 
 
 if __name__ == "__main__":